@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from KnowledgeIndex import normalizar_texto
+
+MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "256"))
+TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_S", "3600"))
+# Similaridade mínima (Jaccard) para aceitar uma pergunta parecida; 0 desliga
+SIMILARIDADE = float(os.getenv("CACHE_SIMILARIDADE", "0"))
+
+# Palavras que não mudam o sentido da pergunta
+IGNORADAS = frozenset("uhm ah hum eh ne tipo entao a o as os um uma".split())
+
+
+def chave_pergunta(texto):
+    """Forma canônica da pergunta: sem acentos, vícios de fala nem ordem das palavras"""
+    palavras = {p for p in normalizar_texto(texto).split() if p not in IGNORADAS}
+    return " ".join(sorted(palavras))
+
+
+def versao_conteudo(*partes):
+    """Impressão digital do prompt e da base; muda sempre que algum texto muda"""
+    return hashlib.sha256("\0".join(partes).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Cache LRU com TTL de respostas para perguntas repetidas"""
+
+    def __init__(self, max_itens=MAX_ITENS, ttl=TTL_SEGUNDOS, similaridade=SIMILARIDADE):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.similaridade = similaridade
+        self.itens = OrderedDict()
+        self.versao = None
+        self.acertos = 0
+        self.falhas = 0
+        self.lock = threading.Lock()
+
+    def validar_versao(self, versao):
+        """Esvazia o cache se o prompt ou a base de conhecimento mudaram"""
+        if versao != self.versao:
+            self.itens.clear()
+            self.versao = versao
+
+    def buscar(self, pergunta, versao):
+        """Devolve a resposta em cache ou None"""
+        chave = chave_pergunta(pergunta)
+        agora = time.monotonic()
+        with self.lock:
+            self.validar_versao(versao)
+            if chave not in self.itens and self.similaridade > 0:
+                chave = self.mais_parecida(chave) or chave
+            item = self.itens.get(chave)
+            if item and item[1] < agora:
+                del self.itens[chave]
+                item = None
+            if item is None:
+                self.falhas += 1
+                return None
+            self.itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def mais_parecida(self, chave):
+        """Procura uma pergunta em cache com similaridade acima do limite"""
+        palavras = set(chave.split())
+        melhor, melhor_nota = None, self.similaridade
+        for outra in self.itens:
+            outras_palavras = set(outra.split())
+            uniao = palavras | outras_palavras
+            nota = len(palavras & outras_palavras) / len(uniao) if uniao else 0.0
+            if nota >= melhor_nota:
+                melhor, melhor_nota = outra, nota
+        return melhor
+
+    def guardar(self, pergunta, resposta, versao):
+        """Guarda a resposta, descartando a menos usada se o cache estiver cheio"""
+        chave = chave_pergunta(pergunta)
+        if not chave:
+            return
+        with self.lock:
+            self.validar_versao(versao)
+            self.itens[chave] = (resposta, time.monotonic() + self.ttl)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_itens:
+                self.itens.popitem(last=False)
+
+    def estatisticas(self):
+        """Contadores de acertos e falhas"""
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "itens": len(self.itens),
+        }
@@ -0,0 +1,112 @@
+import hashlib
+import io
+import os
+import threading
+import wave
+
+DIRETORIO = os.getenv("CACHE_AUDIO_DIR", "cache_audio")
+MAX_BYTES = int(float(os.getenv("CACHE_AUDIO_MAX_MB", "200")) * 1024 * 1024)
+
+
+def chave_audio(*partes):
+    """Endereço do áudio: hash do texto/SSML, voz e velocidade"""
+    return hashlib.sha256("\0".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Cache em disco de áudio sintetizado, com limite de tamanho e descarte LRU"""
+
+    def __init__(self, diretorio=DIRETORIO, max_bytes=MAX_BYTES):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.wav")
+
+    def temporario(self, chave):
+        """Arquivo de trabalho de uma renderização: não termina em .wav, então `limitar` não o apaga"""
+        return f"{self.caminho(chave)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def ler(self, chave):
+        """Devolve os bytes WAV em cache ou None"""
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, "rb") as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return None
+        # A data de modificação marca o último uso para o descarte LRU
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            pass  # descartado por outro processo depois da leitura; os dados já estão aqui
+        return dados
+
+    def gravar(self, chave, dados):
+        """Grava o áudio de forma atômica e aplica o limite de tamanho"""
+        temporario = self.temporario(chave)
+        with open(temporario, "wb") as f:
+            f.write(dados)
+        return self.adotar(chave, temporario)
+
+    def adotar(self, chave, arquivo):
+        """Move um WAV já renderizado em disco para dentro do cache"""
+        # Lido antes de entrar no cache: depois disso outro processo pode descartá-lo
+        with open(arquivo, "rb") as f:
+            dados = f.read()
+        os.replace(arquivo, self.caminho(chave))
+        self.limitar()
+        return dados
+
+    def limitar(self):
+        """Remove os arquivos usados há mais tempo até caber no limite"""
+        with self.lock:
+            arquivos = []
+            for nome in os.listdir(self.diretorio):
+                if not nome.endswith(".wav"):
+                    continue
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    pass
+                total -= tamanho
+
+
+def tocar_wav(audio, dados, parar=None):
+    """Reproduz bytes WAV em uma instância de PyAudio
+
+    Com `parar` (threading.Event) a reprodução é interrompida no próximo
+    bloco de ~128 ms; devolve False nesse caso.
+    """
+    with wave.open(io.BytesIO(dados), "rb") as wav:
+        stream = audio.open(
+            format=audio.get_format_from_width(wav.getsampwidth()),
+            channels=wav.getnchannels(),
+            rate=wav.getframerate(),
+            output=True,
+        )
+        try:
+            while True:
+                if parar is not None and parar.is_set():
+                    return False
+                quadros = wav.readframes(2048)
+                if not quadros:
+                    break
+                stream.write(quadros)
+        finally:
+            stream.stop_stream()
+            stream.close()
+    return True
@@ -0,0 +1,154 @@
+import os
+import threading
+
+import pyaudio
+
+# "callback" captura continuamente num buffer circular; "bloqueante" usa stream.read como antes
+CAPTURA = os.getenv("CAPTURA", "callback")
+BUFFER_S = float(os.getenv("CAPTURA_BUFFER_S", "10"))
+# Áudio anterior ao início da escuta que ainda vale como começo da próxima fala
+RETER_MS = int(os.getenv("CAPTURA_RETER_MS", "1000"))
+# O fim da fala do agente ainda chega ao microfone depois que o stream de saída fecha
+ECO_MS = int(os.getenv("CAPTURA_ECO_MS", "150"))
+QUADROS_CALLBACK = 1024  # 64 ms a 16 kHz
+MAIOR_LEITURA = 8192  # quadros; maior leitura aceita do consumidor
+
+
+class RingBuffer:
+    """Buffer circular de bytes pré-alocado com um produtor e um consumidor
+
+    `ler` devolve uma cópia dos bytes, feita sob o lock: quando o consumidor
+    atrasa, o áudio mais antigo é descartado e contabilizado, e o escritor
+    passa por cima dele sem corromper o que já foi entregue.
+    """
+
+    def __init__(self, capacidade, maior_leitura):
+        self.capacidade = capacidade
+        self.maior_leitura = maior_leitura
+        self.tamanho = capacidade
+        self.dados = bytearray(self.tamanho)
+        self.visao = memoryview(self.dados)
+        self.escrito = 0  # posições absolutas (só crescem)
+        self.lido = 0
+        self.descartados = 0
+        self.pico = 0
+        self.condicao = threading.Condition()
+
+    def disponivel(self):
+        return self.escrito - self.lido
+
+    def escrever(self, dados):
+        """Chamado pelo callback do áudio: copia o bloco para o buffer e acorda o consumidor"""
+        dados = memoryview(dados)
+        with self.condicao:
+            if len(dados) > self.capacidade:
+                self.descartados += len(dados) - self.capacidade
+                dados = dados[-self.capacidade:]
+            inicio = self.escrito % self.tamanho
+            primeiro = min(len(dados), self.tamanho - inicio)
+            self.visao[inicio:inicio + primeiro] = dados[:primeiro]
+            self.visao[:len(dados) - primeiro] = dados[primeiro:]
+            self.escrito += len(dados)
+
+            excesso = self.disponivel() - self.capacidade
+            if excesso > 0:
+                self.lido += excesso
+                self.descartados += excesso
+            self.pico = max(self.pico, self.disponivel())
+            self.condicao.notify_all()  # consumidor e, com barge-in, o vigia
+
+    def ler(self, tamanho, timeout=None):
+        """Espera `tamanho` bytes e devolve uma cópia deles (None no timeout)
+
+        Uma view para dentro do buffer seria sobrescrita num estouro antes de o
+        consumidor terminar de usá-la; o Vosk só aceita bytes, então a cópia já
+        era feita de qualquer forma.
+        """
+        if tamanho > self.maior_leitura:
+            raise ValueError(f"leitura de {tamanho} bytes maior que a reserva de {self.maior_leitura}")
+        with self.condicao:
+            if not self.condicao.wait_for(lambda: self.disponivel() >= tamanho, timeout):
+                return None
+            inicio = self.lido % self.tamanho
+            self.lido += tamanho
+            primeiro = min(tamanho, self.tamanho - inicio)
+            return bytes(self.visao[inicio:inicio + primeiro]) + bytes(self.visao[:tamanho - primeiro])
+
+    def copiar_desde(self, posicao, timeout=None):
+        """Cópia do que foi gravado a partir da posição absoluta `posicao`, sem consumir
+
+        Devolve (dados, nova_posicao); usado para vigiar o microfone em paralelo
+        com o consumidor principal.
+        """
+        with self.condicao:
+            self.condicao.wait_for(lambda: self.escrito > posicao, timeout)
+            inicio = max(posicao, self.escrito - self.capacidade)
+            tamanho = self.escrito - inicio
+            posicao_fisica = inicio % self.tamanho
+            primeiro = min(tamanho, self.tamanho - posicao_fisica)
+            dados = bytes(self.visao[posicao_fisica:posicao_fisica + primeiro])
+            dados += bytes(self.visao[:tamanho - primeiro])
+            return dados, self.escrito
+
+    def reter_ultimos(self, tamanho, desde=0):
+        """Descarta o que está pendente além dos últimos `tamanho` bytes e antes da
+        posição absoluta `desde` (sem contar como perda)"""
+        with self.condicao:
+            inicio = min(max(self.lido, self.escrito - tamanho, desde), self.escrito)
+            sobra = inicio - self.lido
+            self.lido = inicio
+            return sobra
+
+
+class CallbackCapture:
+    """Microfone em modo callback: o PyAudio grava no RingBuffer o tempo todo,
+    inclusive enquanto o agente está no LLM ou falando.
+
+    Expõe `read` como o stream bloqueante, para o resto do motor não mudar.
+    """
+
+    def __init__(self, audio, taxa=16000, buffer_s=BUFFER_S, reter_ms=RETER_MS):
+        self.taxa = taxa
+        self.reter = int(taxa * reter_ms / 1000) * 2
+        self.eco = int(taxa * ECO_MS / 1000) * 2
+        self.fim_reproducao = 0  # posição no buffer em que a última fala do agente terminou
+        self.buffer = RingBuffer(int(taxa * buffer_s) * 2, MAIOR_LEITURA * 2)
+        self.overflows = 0  # quadros perdidos antes do callback (driver/PortAudio)
+        self.stream = audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=taxa,
+            input=True,
+            frames_per_buffer=QUADROS_CALLBACK,
+            stream_callback=self.callback,
+        )
+
+    def callback(self, dados, quadros, info_tempo, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.buffer.escrever(dados)
+        return None, pyaudio.paContinue
+
+    def marcar_fim_reproducao(self):
+        """A fala do agente terminou: o que foi gravado até aqui é eco dela, não do usuário"""
+        self.fim_reproducao = self.buffer.escrito + self.eco
+
+    def iniciar_escuta(self):
+        """Começa uma nova fala: mantém só o áudio recente que pode ser o início dela,
+        sem voltar para antes do fim da última fala do agente"""
+        self.buffer.reter_ultimos(self.reter, self.fim_reproducao)
+
+    def read(self, quadros, exception_on_overflow=False):
+        return self.buffer.ler(quadros * 2)
+
+    def estatisticas(self):
+        return {
+            "quadros_descartados": self.buffer.descartados // 2,
+            "overflows": self.overflows,
+            "pico_s": self.buffer.pico / 2 / self.taxa,
+            "capacidade_s": self.buffer.capacidade / 2 / self.taxa,
+        }
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
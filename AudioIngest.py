@@ -0,0 +1,235 @@
+"""Entrada de áudio de rede: PCM em qualquer taxa, μ-law e Opus para PCM 16 kHz mono int16.
+
+O conversor trabalha em streaming, um pedaço por vez, sobre buffers NumPy
+reservados de antemão: decodificar, misturar os canais, filtrar e reamostrar
+não criam arrays a cada pacote (os buffers só crescem se chegar um pacote
+maior que todos os anteriores). A reamostragem é polifásica (interpolar por
+`cima`, filtrar e dizimar por `baixo`), calculando só as amostras de saída.
+
+Formatos por nome (VoiceServer --formato):
+  pcm16k   PCM int16 16 kHz, sem conversão
+  pcm48k   PCM int16 48 kHz
+  pcm8k    PCM int16 8 kHz
+  mulaw8k  G.711 μ-law 8 kHz (telefonia)
+  opus     pacotes Opus, cada um precedido do tamanho (uint16 big-endian)
+"""
+import math
+import struct
+
+import numpy as np
+
+TAXA_SAIDA = 16000
+# Cruzamentos por zero de cada lado do filtro: mais = transição mais estreita e mais CPU
+ZEROS = 12
+# Fração da banda de Nyquist preservada pelo filtro anti-aliasing
+BANDA = 0.9
+KAISER_BETA = 8.0
+# Maior quadro Opus (120 ms) decodificado direto em 16 kHz
+QUADROS_OPUS = 120 * TAXA_SAIDA // 1000
+
+FORMATOS = {
+    "pcm16k": ("pcm", 16000),
+    "pcm48k": ("pcm", 48000),
+    "pcm8k": ("pcm", 8000),
+    "mulaw8k": ("mulaw", 8000),
+    "opus": ("opus", 48000),
+}
+
+
+def tabela_mulaw():
+    """Amostra linear de cada um dos 256 códigos G.711 μ-law"""
+    codigos = ~np.arange(256, dtype=np.int32) & 0xFF
+    expoente = (codigos >> 4) & 0x07
+    magnitude = (((codigos & 0x0F) << 3) + 0x84) << expoente
+    amostras = magnitude - 0x84
+    return np.where(codigos & 0x80, -amostras, amostras).astype(np.float32)
+
+
+TABELA_MULAW = tabela_mulaw()
+
+
+def filtro_polifasico(cima, baixo, zeros=ZEROS):
+    """Passa-baixas (sinc com janela de Kaiser) dividido nas `cima` fases, cada uma invertida"""
+    fator = max(cima, baixo)
+    tamanho = 2 * zeros * fator
+    tamanho += -tamanho % cima
+    t = np.arange(tamanho) - (tamanho - 1) / 2
+    corte = 0.5 * BANDA / fator  # em ciclos por amostra na taxa interpolada
+    h = 2 * corte * np.sinc(2 * corte * t) * np.kaiser(tamanho, KAISER_BETA)
+    # Ganho DC de `cima` compensa os zeros inseridos na interpolação
+    h *= cima / h.sum()
+    return np.ascontiguousarray(h.reshape(-1, cima).T[:, ::-1], dtype=np.float32)
+
+
+class AudioIngest:
+    """Converte pedaços de áudio recebidos para PCM 16 kHz mono int16, em streaming"""
+
+    def __init__(self, codificacao="pcm", taxa=TAXA_SAIDA, canais=1, quadros_iniciais=None):
+        if codificacao not in ("pcm", "mulaw", "opus"):
+            raise ValueError(f"Codificação desconhecida: {codificacao}")
+        self.codificacao = codificacao
+        self.canais = canais
+        self.decoder = None
+        if codificacao == "opus":
+            try:
+                import opuslib
+            except ImportError as e:
+                raise RuntimeError("Opus exige o pacote opuslib e a libopus (pip install opuslib)") from e
+            # A libopus decodifica direto em 16 kHz: não sobra reamostragem para fazer
+            self.decoder = opuslib.Decoder(TAXA_SAIDA, canais)
+            self.pacotes = bytearray()
+            taxa = TAXA_SAIDA
+        self.taxa = taxa
+        self.bytes_quadro = canais * (1 if codificacao == "mulaw" else 2)
+        self.tabela = TABELA_MULAW if codificacao == "mulaw" else None
+        # Já está no formato do Vosk: devolve uma view dos próprios bytes recebidos
+        self.direto = codificacao == "pcm" and taxa == TAXA_SAIDA and canais == 1
+
+        divisor = math.gcd(TAXA_SAIDA, taxa)
+        self.cima, self.baixo = TAXA_SAIDA // divisor, taxa // divisor
+        self.reamostrar = (self.cima, self.baixo) != (1, 1)
+        if self.reamostrar:
+            self.fases = filtro_polifasico(self.cima, self.baixo)
+            self.taps = self.fases.shape[1]
+            # Para cada fase de saída r: qual filtro usar e a partir de qual amostra de entrada
+            passos = [r * self.baixo for r in range(self.cima)]
+            self.fase_de = [passo % self.cima for passo in passos]
+            self.deslocamento = [passo // self.cima for passo in passos]
+        else:
+            self.taps = 1
+        self.historico = self.taps - 1
+        self.resto = b""
+        self.capacidade = 0
+        self.saida = np.zeros(0, dtype=np.int16)
+        self.produzidas = 0
+        self.reservar(quadros_iniciais or taxa // 10)
+        self.reiniciar()
+
+    @classmethod
+    def do_formato(cls, nome, **opcoes):
+        """Conversor para um dos FORMATOS por nome"""
+        if nome not in FORMATOS:
+            raise ValueError(f"Formato desconhecido: {nome} (opções: {', '.join(FORMATOS)})")
+        codificacao, taxa = FORMATOS[nome]
+        return cls(codificacao, taxa, **opcoes)
+
+    def reiniciar(self):
+        """Esquece o histórico do filtro e os restos do pedaço anterior (nova chamada)"""
+        self.x[:self.historico] = 0
+        self.cheio = self.historico
+        self.resto = b""
+        if self.decoder is not None:
+            self.pacotes.clear()
+
+    def reservar(self, quadros):
+        """Garante buffers para `quadros` quadros de entrada por pedaço"""
+        if quadros <= self.capacidade:
+            return
+        self.capacidade = quadros
+        pendentes = self.x[:self.cheio].copy() if hasattr(self, "x") else None
+        self.x = np.zeros(self.historico + 2 * self.baixo + quadros, dtype=np.float32)
+        if pendentes is not None:
+            self.x[:len(pendentes)] = pendentes
+        self.intercalado = np.zeros(quadros * self.canais, dtype=np.float32)
+        self.indices = np.zeros(quadros * self.canais if self.tabela is not None else 0, dtype=np.intp)
+        blocos = len(self.x) // self.baixo + 1
+        self.y = np.zeros(blocos * self.cima, dtype=np.float32)
+        self.garantir_saida(self.produzidas + len(self.y))
+        if self.reamostrar:
+            self.janelas = np.zeros((blocos, self.taps), dtype=np.float32)
+            self.por_fase = np.zeros((self.cima, blocos), dtype=np.float32)
+            # Janelas sobrepostas de cada fase como views fixas sobre x (sem cópia); por
+            # pedaço só se fatia o número de blocos
+            passo = self.x.strides[0]
+            maximo = (len(self.x) - self.taps - self.deslocamento[-1]) // self.baixo + 1
+            self.janelas_de = [
+                np.lib.stride_tricks.as_strided(self.x[inicio:], shape=(maximo, self.taps),
+                                                strides=(self.baixo * passo, passo), writeable=False)
+                for inicio in self.deslocamento
+            ]
+
+    def garantir_saida(self, amostras):
+        if len(self.saida) < amostras:
+            maior = np.zeros(max(amostras, 2 * len(self.saida)), dtype=np.int16)
+            maior[:self.produzidas] = self.saida[:self.produzidas]
+            self.saida = maior
+
+    def converter(self, dados):
+        """PCM 16 kHz mono int16 do pedaço (a view vale até a próxima chamada)"""
+        self.produzidas = 0
+        if self.decoder is not None:
+            self.pacotes += dados
+            while len(self.pacotes) >= 2:
+                tamanho = struct.unpack_from("!H", self.pacotes)[0]
+                if len(self.pacotes) < 2 + tamanho:
+                    break
+                pcm = self.decoder.decode(bytes(self.pacotes[2:2 + tamanho]), QUADROS_OPUS)
+                del self.pacotes[:2 + tamanho]
+                self.processar(np.frombuffer(pcm, dtype="<i2"))
+            return self.saida[:self.produzidas]
+
+        if self.resto:
+            dados = self.resto + dados  # só quando a rede corta um quadro ao meio
+        usavel = len(dados) - len(dados) % self.bytes_quadro
+        self.resto = bytes(dados[usavel:]) if usavel < len(dados) else b""
+        if self.direto:
+            return np.frombuffer(dados, dtype="<i2", count=usavel // 2)
+        tipo = np.uint8 if self.tabela is not None else "<i2"
+        self.processar(np.frombuffer(dados, dtype=tipo, count=usavel * self.canais // self.bytes_quadro))
+        return self.saida[:self.produzidas]
+
+    def processar(self, amostras):
+        """Decodifica as amostras (intercaladas) no buffer do filtro e gera a saída possível"""
+        quadros = len(amostras) // self.canais
+        self.reservar(quadros)
+        destino = self.x[self.cheio:self.cheio + quadros]
+        fonte = destino if self.canais == 1 else self.intercalado[:quadros * self.canais]
+        if self.tabela is not None:
+            # O take converteria os códigos uint8 para intp num array novo a cada pacote;
+            # mode="clip" evita o buffer que o modo padrão usa para validar os índices
+            indices = self.indices[:len(amostras)]
+            np.copyto(indices, amostras)
+            np.take(self.tabela, indices, out=fonte, mode="clip")
+        else:
+            fonte[:] = amostras
+        if self.canais > 1:
+            np.mean(fonte.reshape(quadros, self.canais), axis=1, out=destino)
+        self.cheio += quadros
+
+        if not self.reamostrar:
+            self.garantir_saida(self.produzidas + quadros)
+            np.copyto(self.saida[self.produzidas:self.produzidas + quadros], destino, casting="unsafe")
+            self.produzidas += quadros
+            self.cheio = 0
+            return
+        self.filtrar()
+
+    def filtrar(self):
+        """Calcula os blocos completos de `cima` amostras de saída e descarta a entrada consumida"""
+        cima, baixo, taps = self.cima, self.baixo, self.taps
+        # O último bloco precisa de taps amostras a partir de (b * baixo + maior deslocamento)
+        disponiveis = self.cheio - taps - self.deslocamento[-1]
+        if disponiveis < 0:
+            return
+        blocos = disponiveis // baixo + 1
+        novas = blocos * cima
+        y = self.y[:novas]
+        for r in range(cima):
+            # A cópia para um buffer contíguo deixa o produto com o BLAS
+            np.copyto(self.janelas[:blocos], self.janelas_de[r][:blocos])
+            destino = y if cima == 1 else self.por_fase[r, :blocos]
+            np.dot(self.janelas[:blocos], self.fases[self.fase_de[r]], out=destino)
+        if cima > 1:
+            # por_fase é (fase, bloco): a saída intercala as fases de cada bloco
+            np.copyto(y.reshape(blocos, cima), self.por_fase[:, :blocos].T)
+        np.rint(y, out=y)
+        np.maximum(y, -32768, out=y)
+        np.minimum(y, 32767, out=y)
+        self.garantir_saida(self.produzidas + novas)
+        np.copyto(self.saida[self.produzidas:self.produzidas + novas], y, casting="unsafe")
+        self.produzidas += novas
+
+        consumidas = blocos * baixo
+        restantes = self.cheio - consumidas
+        self.x[:restantes] = self.x[consumidas:self.cheio]
+        self.cheio = restantes
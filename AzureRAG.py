@@ -1,97 +1,232 @@
-import azure.cognitiveservices.speech as speechsdk
-import ollama
 import re
+from KnowledgeIndex import KnowledgeIndex
+from ConversationMemory import ConversationMemory, resumidor_ollama
+from StreamingTTS import SpeechQueue, falar_stream
+from AnswerCache import AnswerCache, versao_conteudo
+from AudioCache import AudioCache, chave_audio, tocar_wav
+import Metrics
+from ModelRouter import RoteadorModelos, RAPIDO
+from LLMScheduler import ClienteAgendado, PrazoEsgotado, RESPOSTA_OCUPADA
+from Startup import Adiado, Inicializacao, modulo_em_segundo_plano
+from BargeIn import BARGE_IN, PALAVRAS as BARGE_IN_WORDS, palavras_do_usuario
 from dotenv import load_dotenv
+import pyaudio
 import os
+import queue
+import sys
+import threading
 import time
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Base de Conhecimento ARI
-ARI_KNOWLEDGE_BASE = """
-Sobre a ARI:
-A ARI Área de Recomendações Inteligentes é uma solução inovadora do Banco do Brasil que utiliza Inteligência Artificial Generativa e Analytics para fornecer recomendações personalizadas e insights valiosos para empresas.
-
-Público alvo da ARI:
-A ARI foi projetada inicialmente para empresas clientes do Banco do Brasil, mas em breve atenderá pessoas físicas também. 
-A solução é ideal para negócios que buscam otimizar a gestão financeira, aumentar a eficiência operacional e tomar decisões mais informadas com base em dados.
-
-Como funciona a ARI:
-A ARI utiliza dados brutos de extratos bancários, saldos, créditos, investimentos e transações para criar recomendações únicas para cada cliente. Algoritmos de IA generativa processam esses dados, que passam por curadoria humana para garantir segurança, qualidade e relevância das sugestões.
-
-Quais os tipos de recomendações oferecidas pela ARI:
-* Desempenho Financeiro: Melhorar fluxo de caixa, reduzir custos e otimizar recursos.
-* Segmentação e Comportamento dos Clientes: Insights sobre padrões de consumo e tendências sazonais.
-* Soluções de Crédito e Financeiro: Ofertas personalizadas de crédito (antecipação de recebíveis e linhas de capital de giro).
-* Eficiência Operacional: Otimizar processos internos e melhorar a produtividade.
-* Recomendações Estratégicas: Orientações para crescimento sustentável e expansão de mercado.
-* Relacionamento: Melhoria na interação com clientes e fornecedores.
-* Marketing e Posicionamento de Mercado: Estratégias para aumentar vendas e atrair novos clientes.
-* Educação Financeira Empreendedora: Capacitação e orientações práticas para melhorar a gestão financeira.
-
-Principais Funcionalidades:
-* Análise de Comportamento de Clientes: Insights sobre o comportamento de compra (número de clientes recorrentes no PIX, melhor dia de vendas), análise do ticket médio e sugestões para aumentá-lo.
-* Apoio em Datas Comemorativas e Sazonalidades: Recomendações específicas para períodos de alta demanda (feriados e datas comemorativas) para auxiliar no preparo para picos de vendas.
-* Educação Financeira: Dicas práticas e orientações sobre produtos financeiros para melhorar a compreensão das finanças e a tomada de decisões.
-* Integração com o Painel PJ: Recomendações disponibilizadas no Painel PJ (plataforma do Banco do Brasil que centraliza informações de pagamentos e recebimentos) para uma visão unificada das finanças.
-
-Exemplos de Recomendações:
-* Antecipação de Recebíveis: Converter vendas futuras em capital imediato.
-* Capital de Giro: Alertas para clientes utilizando o limite do cheque especial ou necessitando de crédito adicional.
-* Monitoramento de Transações: Análise detalhada de entradas e saídas de PIX, boletos e cartões.
-* Datas Comemorativas: Sugestões de marketing e promoções alinhadas a feriados e eventos sazonais.
-* Investimentos: Identificação de saldos ociosos que podem ser aplicados em produtos financeiros.
-* Alertas de Custos: Notificações sobre aumentos em contas fixas (água e luz) com dicas para economizar.
-* Open Finance: Incentivos para concentrar operações financeiras no Banco do Brasil, aproveitando benefícios exclusivos.
-
-Porque o Banco do Brasil criou a ARI:
-O Banco do Brasil desenvolveu a ARI para aproximar-se dos pequenos empreendedores, oferecer suporte personalizado e reforçar o compromisso com a educação financeira e a inovação tecnológica, posicionando-se como pioneiro no uso de IA generativa no mercado financeiro brasileiro.
-
-Como acessar a ARI:
-As recomendações da ARI estão disponíveis no Painel PJ (plataforma digital gratuita que consolida informações de vendas, recebimentos e fluxos de caixa). O acesso é destinado a clientes pessoa jurídica do Banco do Brasil que utilizam o Painel PJ via BB Digital PJ.
-
-Impactos da ARI:
-A ARI impacta a gestão e a tomada de decisões dos pequenos negócios, transformando dados em insights práticos, auxiliando os empreendedores a:
-* Melhorar a eficiência operacional.
-* Reduzir custos e otimizar recursos.
-* Aumentar vendas e atrair novos clientes.
-* Fortalecer a saúde financeira do negócio.
-
-A ARI promove mudanças sustentáveis na gestão financeira, contribuindo para o crescimento de longo prazo das micro e pequenas empresas.
+# O SDK do Azure é pesado: importa em segundo plano e só espera por ele no primeiro uso
+speechsdk = modulo_em_segundo_plano("azure.cognitiveservices.speech")
+
+LLM_MODEL = "llama3.2:latest"  # usado sozinho sem ROTEAMENTO_LLM=1
+# "continuo" mantém um reconhecedor e uma conexão abertos na sessão; "unico" usa recognize_once por pergunta
+STT_MODE = os.getenv("AZURE_STT_MODO", "continuo")
+
+SYSTEM_PROMPT = """Seja uma assistente virtual brasileira chamada ARI (Área de Recomendações Inteligentes). 
+Responda de forma clara e concisa, seguindo estas regras:
+1. Respostas curtas (até 300 caracteres)
+2. Gramática brasileira correta
+3. Sem anglicismos ou regionalismos
+4. Formatação simples sem caracteres especiais
+5. Sem emojis ou notação markdown
+6. Use os trechos da Base de Conhecimento da ARI enviados junto de cada pergunta
 """
 
+VOICE_NAME = "pt-BR-FranciscaNeural"
+OUTPUT_FORMAT = "Riff24Khz16BitMonoPcm"  # membro de speechsdk.SpeechSynthesisOutputFormat
+
+GREETING = "Olá! Como posso ajudar hoje?"
+ERROR_RESPONSE = "Houve um problema ao processar sua solicitação"
+# Frases fixas pré-renderizadas no deploy com: python AzureRAG.py --warmup
+STATIC_PHRASES = [GREETING, ERROR_RESPONSE, RESPOSTA_OCUPADA]
+
+# Eventos entregues pela sessão de reconhecimento contínuo
+RECOGNIZING = "recognizing"
+RECOGNIZED = "recognized"
+CANCELED = "canceled"
+
+
+class ContinuousRecognizer:
+    """Um único SpeechRecognizer aberto durante a sessão; as falas chegam por uma fila de eventos"""
+
+    def __init__(self, speech_config):
+        self.events = queue.Queue()
+        self.recognizer = speechsdk.SpeechRecognizer(
+            speech_config=speech_config,
+            audio_config=speechsdk.audio.AudioConfig(use_default_microphone=True)
+        )
+        self.recognizer.recognizing.connect(self.on_recognizing)
+        self.recognizer.recognized.connect(self.on_recognized)
+        self.recognizer.canceled.connect(lambda evt: self.events.put((CANCELED, evt)))
+        self.recognizer.session_started.connect(self.on_session_started)
+        self.sessions = 0
+        self.running = False
+        # Chamado uma vez se o usuário falar enquanto a ARI responde
+        self.barge_in = None
+        # Frases já tocadas na resposta atual: o microfone também as ouve
+        self.echo = []
+        # Do último intermediário ao resultado final: silêncio de fim de fala mais a rede
+        self.last_interim_at = None
+        self.finalization_delay = None
+
+    def on_session_started(self, evt):
+        self.sessions += 1
+
+    def on_recognizing(self, evt):
+        self.last_interim_at = time.perf_counter()
+        self.events.put((RECOGNIZING, evt.result.text))
+        callback = self.barge_in
+        # Só contam as palavras que não vieram da própria fala da ARI
+        if callback and len(palavras_do_usuario(evt.result.text, self.echo)) >= BARGE_IN_WORDS:
+            self.barge_in = None
+            callback()
+
+    def on_recognized(self, evt):
+        # NoMatch (ruído, tosse) não vira pergunta
+        if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech and evt.result.text:
+            if self.last_interim_at:
+                self.finalization_delay = time.perf_counter() - self.last_interim_at
+            self.events.put((RECOGNIZED, evt.result.text))
+
+    def start(self):
+        """Abre a conexão e começa a reconhecer; devolve o tempo gasto"""
+        started = time.perf_counter()
+        self.recognizer.start_continuous_recognition_async().get()
+        self.running = True
+        return time.perf_counter() - started
+
+    def stop(self):
+        self.running = False
+        self.recognizer.stop_continuous_recognition_async().get()
+
+    def discard_pending(self):
+        """Descarta o que foi reconhecido enquanto a ARI falava"""
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def next_utterance(self, on_interim=None, stop=None):
+        """Bloqueia até a próxima fala completa, repassando os resultados intermediários
+
+        Com `stop` (threading.Event) a espera pode ser abandonada; devolve None.
+        """
+        while True:
+            try:
+                kind, payload = self.events.get(timeout=0.1 if stop else None)
+            except queue.Empty:
+                if stop.is_set():
+                    return None
+                continue
+            if kind == RECOGNIZED:
+                return payload
+            if kind == RECOGNIZING and on_interim:
+                on_interim(payload)
+            elif kind == CANCELED:
+                # A conexão caiu: a próxima escuta reabre a sessão
+                self.running = False
+                raise Exception(f"Erro no reconhecimento: {payload.cancellation_details.error_details}")
+
+
 class AzureSpeechClient:
-    def __init__(self):
+    # Criados em segundo plano (ou no primeiro uso); o acesso espera a etapa de mesmo nome
+    speech_config = Adiado()
+    synthesizer = Adiado()
+    audio = Adiado()
+    continuous = Adiado()
+
+    def __init__(self, stt_mode=STT_MODE, playback=True):
+        """`stt_mode` None não prepara o reconhecimento; `playback` False não abre o
+        PyAudio nem a fila de fala (só renderização, como no --warmup)"""
+        self.inicializacao = Inicializacao("azure")
+        self.stt_mode = stt_mode
+        # Preparo do reconhecimento em cada pergunta (conexão nova ou reaproveitada)
+        self.stt_setup_times = []
+        # A última resposta foi interrompida: o que já foi reconhecido é o começo da próxima pergunta
+        self.barged_in = False
+        # Frases tocadas desde o início da resposta, para reconhecer o eco delas
+        self.played = []
+        # Atraso entre o último resultado intermediário e o final, na última fala
+        self.last_delay = None
+        self.inicializacao.iniciar("speech_config", self.create_speech_config)
+        if stt_mode == "continuo":
+            # O handshake com o serviço acontece uma vez, durante a inicialização
+            self.inicializacao.iniciar("continuous", self.start_continuous)
+        # O sintetizador só é necessário na primeira frase que não estiver no cache
+        self.inicializacao.adiar("synthesizer", self.create_synthesizer)
+        self.audio_cache = AudioCache()
+        self.speech_queue = None
+        if playback:
+            self.inicializacao.iniciar("audio", pyaudio.PyAudio)
+            # Fila de frases sintetizadas em paralelo com a geração do LLM
+            self.speech_queue = SpeechQueue(self.synthesize_speech)
+
+    def create_speech_config(self):
         # Configuração do reconhecedor de fala
-        self.speech_config = speechsdk.SpeechConfig(
+        speech_config = speechsdk.SpeechConfig(
             subscription=os.getenv("AZURE_SPEECH_KEY"),
             region=os.getenv("AZURE_SERVICE_REGION")
         )
-        self.speech_config.speech_recognition_language = "pt-BR"
-        
+        speech_config.speech_recognition_language = "pt-BR"
+
         # Configuração da síntese de voz
-        self.speech_config.speech_synthesis_voice_name = "pt-BR-FranciscaNeural"
-        self.synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=self.speech_config
+        speech_config.speech_synthesis_voice_name = VOICE_NAME
+        speech_config.set_speech_synthesis_output_format(
+            getattr(speechsdk.SpeechSynthesisOutputFormat, OUTPUT_FORMAT)
         )
+        return speech_config
+
+    def start_continuous(self):
+        continuous = ContinuousRecognizer(self.speech_config)
+        self.stt_setup_times.append(continuous.start())
+        return continuous
+
+    def create_synthesizer(self):
+        # Sem saída de áudio: o WAV volta em memória, vai para o cache e é tocado localmente
+        return speechsdk.SpeechSynthesizer(
+            speech_config=self.speech_config,
+            audio_config=None
+        )
+
+    def recognize_from_microphone(self, on_interim=None, stop=None):
+        """Reconhecimento de fala usando o microfone padrão
+
+        Devolve None se nada foi entendido (silêncio, tosse, ruído): não é falha do serviço.
+        `stop` só tem efeito no modo contínuo: recognize_once não pode ser abandonado.
+        """
+        if self.stt_mode == "continuo":
+            return self.recognize_continuous(on_interim, stop)
 
-    def recognize_from_microphone(self):
-        """Reconhecimento de fala usando o microfone padrão"""
+        started = time.perf_counter()
         audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
         recognizer = speechsdk.SpeechRecognizer(
             speech_config=self.speech_config,
             audio_config=audio_config
         )
+        # Sem sessão persistente, cada pergunta paga a conexão com o serviço
+        recognizer.session_started.connect(
+            lambda evt: self.stt_setup_times.append(time.perf_counter() - started)
+        )
+        last_interim = []
+        recognizer.recognizing.connect(lambda evt: last_interim.append(time.perf_counter()))
+        if on_interim:
+            recognizer.recognizing.connect(lambda evt: on_interim(evt.result.text))
         
         try:
             print("Ouvindo...")
             result = recognizer.recognize_once_async().get()
             
             if result.reason == speechsdk.ResultReason.RecognizedSpeech:
+                self.last_delay = time.perf_counter() - last_interim[-1] if last_interim else None
                 return result.text
             elif result.reason == speechsdk.ResultReason.NoMatch:
-                raise Exception("Não foi possível entender o áudio")
+                return None
             elif result.reason == speechsdk.ResultReason.Canceled:
                 cancellation = speechsdk.CancellationDetails.from_result(result)
                 raise Exception(f"Erro no reconhecimento: {cancellation.error_details}")
@@ -99,83 +234,229 @@ class AzureSpeechClient:
         except Exception as e:
             raise RuntimeError(f"Erro no STT: {str(e)}")
 
+    def recognize_continuous(self, on_interim=None, stop=None):
+        """Próxima fala da sessão contínua, reabrindo a conexão se ela tiver caído"""
+        continuous = self.continuous
+        if continuous.running:
+            if not self.barged_in:
+                continuous.discard_pending()
+            self.barged_in = False
+            self.stt_setup_times.append(0.0)
+        else:
+            self.stt_setup_times.append(continuous.start())
+        print("Ouvindo...")
+        try:
+            text = continuous.next_utterance(on_interim, stop)
+            self.last_delay = continuous.finalization_delay
+            return text
+        except Exception as e:
+            raise RuntimeError(f"Erro no STT: {str(e)}")
+
+    def listen_for_barge_in(self, on_speech):
+        """Durante a resposta, chama `on_speech` se o reconhecimento contínuo ouvir o usuário"""
+        if not BARGE_IN or self.stt_mode != "continuo" or not self.continuous.running:
+            return False
+        self.barged_in = False
+        self.continuous.discard_pending()
+        self.played = self.continuous.echo = []
+
+        def detected():
+            self.barged_in = True
+            on_speech()
+        self.continuous.barge_in = detected
+        return True
+
+    def stop_barge_in(self):
+        if self.stt_mode == "continuo":
+            self.continuous.barge_in = None
+
     def synthesize_speech(self, text):
         """Síntese de voz com SSML para melhor controle da voz"""
+        try:
+            audio_data = self.render_speech(text)
+        except Exception as e:
+            raise RuntimeError(f"Erro no TTS: {str(e)}")
+        self.played.append(text)
+        # Barge-in: a reprodução para no próximo bloco se o usuário interromper
+        tocar_wav(self.audio, audio_data, self.speech_queue.interrompido)
+
+    def render_speech(self, text):
+        """Devolve o WAV do texto, chamando o Azure só se não estiver no cache"""
         ssml = f"""
         <speak version="1.0" xml:lang="pt-BR">
-            <voice name="pt-BR-FranciscaNeural">
+            <voice name="{VOICE_NAME}">
                 <prosody rate="medium" pitch="default">
                     {text}
                 </prosody>
             </voice>
         </speak>
         """
-        
-        try:
-            result = self.synthesizer.speak_ssml_async(ssml).get()
-            if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
-                raise Exception(f"Erro na síntese de voz: {result.error_details}")
-        except Exception as e:
-            raise RuntimeError(f"Erro no TTS: {str(e)}")
+        key = chave_audio(ssml, OUTPUT_FORMAT)
+        audio_data = self.audio_cache.ler(key)
+        if audio_data is not None:
+            return audio_data
+
+        result = self.synthesizer.speak_ssml_async(ssml).get()
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise Exception(f"Erro na síntese de voz: {result.error_details}")
+        return self.audio_cache.gravar(key, result.audio_data)
 
 class BetterAIVoiceAgent:
-    def __init__(self):
+    def __init__(self, system_prompt=SYSTEM_PROMPT, use_knowledge_base=True):
         self.speech_client = AzureSpeechClient()
-        # Transcrição inicial com instruções de ARI e base de conhecimento incluso
-        self.full_transcript = [
-            {"role": "system", "content": f"""Seja uma assistente virtual brasileira chamada ARI (Área de Recomendações Inteligentes). 
-Responda de forma clara e concisa, seguindo estas regras:
-1. Respostas curtas (até 300 caracteres)
-2. Gramática brasileira correta
-3. Sem anglicismos ou regionalismos
-4. Formatação simples sem caracteres especiais
-5. Sem emojis ou notação markdown
+        # Índice da base de conhecimento: só os trechos relevantes vão para o prompt
+        self.knowledge_index = KnowledgeIndex.carregar() if use_knowledge_base else None
+        # Modelo rápido ou forte por pergunta, cada um com cliente Ollama persistente e aquecido
+        self.models = RoteadorModelos(system_prompt, padrao=LLM_MODEL)
+        # Histórico com orçamento de tokens; turnos antigos viram resumo (pelo modelo rápido)
+        self.full_transcript = ConversationMemory(
+            system_prompt,
+            resumir=resumidor_ollama(
+                self.models.modelos[RAPIDO], ClienteAgendado(self.models.clientes[RAPIDO], self.models.agendador)
+            ),
+        )
+        # Perguntas frequentes são respondidas sem passar pelo Ollama
+        self.answer_cache = AnswerCache()
+        # Marcas de tempo do turno atual (no-op sem METRICAS=1)
+        self.turn = Metrics.novo_turno("azure")
+        self.interrupted = threading.Event()
 
-Base de Conhecimento da ARI:
-{ARI_KNOWLEDGE_BASE}
-"""}
-        ]
+    def interrupt(self):
+        """O usuário começou a falar: para a fala e a geração em andamento"""
+        self.interrupted.set()
+        self.speech_client.speech_queue.interromper()
+        self.turn.marcar("interrompido")
+        print("\n(interrompida pelo usuário)")
 
     def process_request(self):
+        self.turn = Metrics.novo_turno("azure")
         try:
             # Captura de áudio e reconhecimento
-            question = self.speech_client.recognize_from_microphone()
-            print(f"Pergunta: {question}")
+            self.turn.marcar("captura_inicio")
+            question = self.speech_client.recognize_from_microphone(self.show_interim)
+            self.turn.marcar("stt_final")
+            if not question:
+                return
+            if self.speech_client.stt_setup_times:
+                self.turn.anotar(stt_preparo_ms=round(self.speech_client.stt_setup_times[-1] * 1000, 1))
+            print(f"\r\033[KPergunta: {question}")
             
             # Geração da resposta
-            resposta = self.generate_ai_response(question)
+            self.interrupted.clear()
+            self.speech_client.speech_queue.nova_resposta()
+            self.speech_client.listen_for_barge_in(self.interrupt)
+            try:
+                resposta = self.generate_ai_response(question)
+                # A síntese já começou frase a frase; espera a fala terminar (ou ser interrompida)
+                self.speech_client.speech_queue.aguardar()
+            finally:
+                self.speech_client.stop_barge_in()
+            if self.interrupted.is_set():
+                # O histórico guarda só o que o usuário chegou a ouvir
+                resposta = " ".join(self.speech_client.speech_queue.faladas)
+                self.full_transcript.corrigir_ultima("assistant", resposta)
             print(f"Resposta: {resposta}")
-            
-            # Síntese de voz
-            self.speech_client.synthesize_speech(resposta)
+            self.turn.marcar("tts_fim")
+            self.turn.finalizar()
+            if self.models.perguntas and self.models.perguntas % 10 == 0:
+                print(self.models.relatorio())
             
         except Exception as e:
             error_message = f"Desculpe, ocorreu um erro: {str(e)}"
             print(error_message)
-            self.speech_client.synthesize_speech(error_message)
+            self.speak(error_message)
+            self.speech_client.speech_queue.aguardar()
+
+    def show_interim(self, text):
+        """Legenda ao vivo com o resultado intermediário do reconhecimento"""
+        self.turn.marcar("primeira_parcial")
+        print(f"\r\033[K\033[2m{text}\033[0m", end="", flush=True)
 
     def generate_ai_response(self, question):
+        version = self.content_version()
+        cached = self.answer_cache.buscar(question, version)
+        if cached:
+            stats = self.answer_cache.estatisticas()
+            print(f"Resposta em cache ({stats['acertos']} acertos, {stats['falhas']} falhas)")
+            self.full_transcript.adicionar("user", question)
+            self.full_transcript.adicionar("assistant", cached)
+            self.turn.anotar(cache=True)
+            self.speak(cached)
+            return cached
+
         try:
-            self.full_transcript.append({"role": "user", "content": question})
-            
-            stream_response = ollama.chat(
-                model="llama3.2:latest",
-                messages=self.full_transcript,
-                stream=True,
-            )
-            
-            resposta = "".join(chunk['message']['content'] for chunk in stream_response)
-            resposta = self.clean_response(resposta)
+            self.full_transcript.adicionar("user", question)
+
+            messages = self.build_messages(question)
+            tokens = self.full_transcript.tokens(messages)
+            print(f"Contexto: {tokens} tokens, "
+                  f"{len(self.full_transcript)} mensagens no histórico")
+            coverage = self.knowledge_index.cobertura(question) if self.knowledge_index else 0.0
+            # A pergunta atual já está no histórico
+            route = self.models.rotear(question, coverage, em_conversa=len(self.full_transcript) > 1)
+            print(f"Modelo: {route}")
+            self.turn.anotar(prompt_tokens=tokens, historico_mensagens=len(self.full_transcript), modelo=route.nivel,
+                             prioridade=route.prioridade)
+            self.turn.marcar("llm_enviado")
+            stream_response = self.models.chat(route.nivel, messages, route.prioridade)
+            text = falar_stream(stream_response, self.speak_sentence, self.interrupted,
+                                lambda content: self.turn.marcar("primeiro_token"))
+            self.turn.marcar("ultimo_token")
+
+            resposta = self.clean_response(text)
             
+            if self.interrupted.is_set():
+                # Resposta incompleta: não vai para o cache
+                self.full_transcript.adicionar("assistant", resposta)
+                return resposta
+
             if not resposta.strip():
-                return "Olá! Como posso ajudar hoje?"
+                return self.speak_fallback(GREETING)
                 
-            self.full_transcript.append({"role": "assistant", "content": resposta})
+            self.full_transcript.adicionar("assistant", resposta)
+            self.answer_cache.guardar(question, resposta, version)
             return resposta
             
+        except PrazoEsgotado as e:
+            # Ollama ocupado com outros agentes: resposta pronta agora em vez de uma atrasada
+            print(f"LLM ocupado: {str(e)}")
+            self.turn.anotar(prazo_esgotado=True)
+            return self.speak_fallback(RESPOSTA_OCUPADA)
+
         except Exception as e:
             print(f"Erro na geração da resposta: {str(e)}")
-            return "Houve um problema ao processar sua solicitação"
+            return self.speak_fallback(ERROR_RESPONSE)
+
+    def speak(self, text):
+        """Enfileira o texto para síntese, marcando no turno o início do TTS"""
+        turn = self.turn
+        self.speech_client.speech_queue.enfileirar(text, lambda: turn.marcar("tts_inicio"))
+
+    def speak_sentence(self, sentence):
+        """Limpa uma frase pronta do stream e envia para síntese"""
+        sentence = self.clean_response(sentence)
+        if sentence:
+            self.speak(sentence)
+
+    def speak_fallback(self, text):
+        """Fala uma resposta fixa quando o modelo falha ou não produz conteúdo"""
+        self.speak(text)
+        return text
+
+    def content_version(self):
+        """Versão do prompt e da base; recarrega a base se os arquivos mudaram"""
+        knowledge_text = ""
+        if self.knowledge_index:
+            self.knowledge_index = self.knowledge_index.recarregar_se_alterado()
+            knowledge_text = self.knowledge_index.texto
+        return versao_conteudo(self.full_transcript.sistema["content"], knowledge_text)
+
+    def build_messages(self, question):
+        """Insere os trechos relevantes da base antes da pergunta atual"""
+        context = self.knowledge_index.contexto(question) if self.knowledge_index else ""
+        if not context:
+            return self.full_transcript.mensagens()
+        return self.full_transcript.mensagens(f"Base de Conhecimento da ARI:\n{context}")
 
     def clean_response(self, text):
         """Limpeza de formatação e conteúdo indesejado"""
@@ -184,11 +465,24 @@ Base de Conhecimento da ARI:
         return cleaned.strip()
 
     def run(self):
+        Metrics.iniciar_exportador()
+        threading.Thread(target=self.models.manter_quente, daemon=True).start()
+        # Pronto para ouvir quando a configuração do Speech existe
+        self.speech_client.inicializacao.aguardar("speech_config")
+        print(self.speech_client.inicializacao.relatorio(time.perf_counter()))
         print("Sistema inicializado. Aguardando comando de voz...")
         while True:
             self.process_request()
-            time.sleep(1)
+            if STT_MODE == "unico":
+                time.sleep(1)
 
 if __name__ == "__main__":
+    if "--warmup" in sys.argv:
+        # Só a configuração e o sintetizador: sem microfone, sessão de STT nem PyAudio
+        client = AzureSpeechClient(stt_mode=None, playback=False)
+        for phrase in STATIC_PHRASES:
+            client.render_speech(phrase)
+        print(f"{len(STATIC_PHRASES)} frases fixas renderizadas em {client.audio_cache.diretorio}")
+        sys.exit(0)
     agent = BetterAIVoiceAgent()
     agent.run()
@@ -0,0 +1,104 @@
+import os
+import re
+import threading
+
+from VoiceActivity import VADGate, QUADRO_MS, nivel_db
+
+# Desligado por padrão (half-duplex: a ARI só escuta depois de terminar de falar).
+# Não há cancelamento de eco: o microfone também ouve a própria ARI, e a detecção
+# só se protege disso comparando com o que está sendo tocado (abaixo)
+BARGE_IN = os.getenv("BARGE_IN", "0") == "1"
+# A margem sobre o ruído é maior que a do VAD da captura e a fala precisa durar um pouco
+MARGEM_DB = float(os.getenv("BARGE_IN_MARGEM_DB", "15"))
+MINIMO_MS = int(os.getenv("BARGE_IN_MINIMO_MS", "240"))
+# Início da reprodução em que o microfone só mede o eco; depois disso, enquanto a ARI
+# fala, a margem conta a partir desse eco e não do ruído de fundo
+CALIBRAR_MS = int(os.getenv("BARGE_IN_CALIBRAR_MS", "300"))
+# Com reconhecimento em stream (Azure, servidor): palavras no parcial para contar como interrupção
+PALAVRAS = int(os.getenv("BARGE_IN_PALAVRAS", "2"))
+INTERVALO_S = 0.05
+PALAVRA = re.compile(r"\w+")
+
+
+def palavras_do_usuario(parcial, faladas):
+    """Palavras do parcial que não estão nas frases que a ARI falou nesta resposta
+
+    O reconhecedor também transcreve a voz da ARI que volta pelo microfone;
+    esse eco não conta como interrupção.
+    """
+    eco = set(PALAVRA.findall(" ".join(faladas).lower()))
+    return [p for p in PALAVRA.findall(parcial.lower()) if p not in eco]
+
+
+class BargeInMonitor:
+    """Vigia o buffer da captura enquanto a ARI responde e avisa quando o usuário fala
+
+    Lê o RingBuffer sem consumi-lo: o mesmo áudio continua disponível para a
+    próxima captura, que assim começa já com o início da interrupção.
+    """
+
+    def __init__(self, captura, margem_db=MARGEM_DB, minimo_ms=MINIMO_MS):
+        self.captura = captura
+        self.vad = VADGate(captura.taxa, pre_roll_ms=QUADRO_MS, margem_db=margem_db,
+                           quadros_inicio=max(1, minimo_ms // QUADRO_MS))
+        self.parar_evento = threading.Event()
+        self.thread = None
+        self.interrupcoes = 0
+        self.quadros_calibrar = max(1, CALIBRAR_MS // QUADRO_MS)
+        # Ligado pelo motor enquanto a ARI toca uma frase
+        self.tocando = False
+        self.eco_db = None
+        self.medidos = 0
+
+    def iniciar(self, ao_detectar, ruido_db=None):
+        """Começa a vigiar a partir do áudio gravado agora; `ao_detectar` é chamado uma vez"""
+        self.parar()
+        self.parar_evento.clear()
+        self.vad.reiniciar()
+        self.eco_db = None
+        self.medidos = 0
+        if ruido_db is not None:
+            # Parte do ruído de fundo aprendido pela captura, não da voz da própria ARI
+            self.vad.ruido_db = ruido_db
+        posicao = self.captura.buffer.escrito
+        self.thread = threading.Thread(target=self.vigiar, args=(posicao, ao_detectar),
+                                       name="barge-in", daemon=True)
+        self.thread.start()
+
+    def vigiar(self, posicao, ao_detectar):
+        while not self.parar_evento.is_set():
+            dados, posicao = self.captura.buffer.copiar_desde(posicao, INTERVALO_S)
+            if not dados:
+                continue
+            if self.tocando:
+                if self.medidos < self.quadros_calibrar:
+                    dados = self.medir_eco(dados)
+                    if not dados:
+                        continue
+                # O VAD baixa o piso nas pausas da frase; enquanto ela toca, não abaixo do eco
+                self.vad.ruido_db = max(self.vad.ruido_db or self.eco_db, self.eco_db)
+            self.vad.filtrar(dados)
+            if self.vad.em_fala and not self.parar_evento.is_set():
+                self.interrupcoes += 1
+                ao_detectar()
+                return
+
+    def medir_eco(self, dados):
+        """Nível da voz da ARI no microfone: o maior quadro do começo da primeira frase
+
+        Devolve o que sobrou do bloco depois da calibração, para o VAD.
+        """
+        tamanho = self.vad.bytes_quadro
+        inicio = 0
+        while self.medidos < self.quadros_calibrar and inicio + tamanho <= len(dados):
+            db = nivel_db(dados[inicio:inicio + tamanho])
+            self.eco_db = db if self.eco_db is None else max(self.eco_db, db)
+            self.medidos += 1
+            inicio += tamanho
+        return dados[inicio:] if self.medidos >= self.quadros_calibrar else b""
+
+    def parar(self):
+        self.parar_evento.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
@@ -0,0 +1,150 @@
+"""Transcrição em lote de gravações WAV com Vosk.
+
+Uso: python BatchTranscribe.py gravacoes/ outra.wav -o transcricoes.jsonl [-j 4]
+
+O modelo Vosk é carregado uma única vez no processo principal e herdado pelos
+processos do pool via fork (páginas compartilhadas em copy-on-write); cada
+processo mantém seu próprio KaldiRecognizer.
+A saída tem uma linha JSON por arquivo, com o texto e o tempo de cada palavra.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+from vosk import Model, KaldiRecognizer, SetLogLevel
+
+MODELO = "model/pt-small-model"
+BLOCO_SEGUNDOS = 4  # blocos grandes reduzem o custo por chamada ao decoder
+
+_modelo = None
+_recognizers = {}
+
+
+def listar_wavs(caminhos):
+    """Expande diretórios em seus arquivos .wav"""
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            arquivos.extend(sorted(glob.glob(os.path.join(caminho, "**", "*.wav"), recursive=True)))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+def carregar_modelo(caminho_modelo):
+    """Carrega o modelo (no processo principal ou, sem fork, em cada trabalhador)"""
+    global _modelo
+    SetLogLevel(-1)
+    _modelo = Model(caminho_modelo)
+
+
+def obter_recognizer(taxa):
+    """Um KaldiRecognizer por processo e taxa de amostragem, reaproveitado entre arquivos"""
+    if taxa not in _recognizers:
+        recognizer = KaldiRecognizer(_modelo, taxa)
+        recognizer.SetWords(True)
+        _recognizers[taxa] = recognizer
+    return _recognizers[taxa]
+
+
+def transcrever(caminho):
+    """Transcreve um arquivo e devolve o registro JSONL
+
+    Um arquivo truncado, vazio ou que não é WAV vira um registro de erro e o
+    lote continua com os demais.
+    """
+    try:
+        return decodificar(caminho)
+    except Exception as e:
+        return {"arquivo": caminho, "erro": str(e) or type(e).__name__}
+
+
+def decodificar(caminho):
+    inicio = time.process_time()
+    with wave.open(caminho, "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            return {"arquivo": caminho, "erro": "esperado WAV mono 16 bits"}
+        taxa = wav.getframerate()
+        duracao = wav.getnframes() / taxa
+
+        recognizer = obter_recognizer(taxa)
+        segmentos = []
+        try:
+            while True:
+                dados = wav.readframes(taxa * BLOCO_SEGUNDOS)
+                if not dados:
+                    break
+                if recognizer.AcceptWaveform(dados):
+                    segmentos.append(json.loads(recognizer.Result()))
+            segmentos.append(json.loads(recognizer.FinalResult()))
+        finally:
+            # O recognizer é reaproveitado: o próximo arquivo não herda áudio deste
+            recognizer.Reset()
+
+    palavras = [
+        {"palavra": p["word"], "inicio": p["start"], "fim": p["end"], "confianca": p["conf"]}
+        for segmento in segmentos
+        for p in segmento.get("result", [])
+    ]
+    return {
+        "arquivo": caminho,
+        "texto": " ".join(s["text"] for s in segmentos if s.get("text")),
+        "palavras": palavras,
+        "duracao": round(duracao, 3),
+        "cpu": round(time.process_time() - inicio, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("caminhos", nargs="+", help="arquivos .wav ou diretórios")
+    parser.add_argument("-o", "--saida", default="-", help="arquivo JSONL (padrão: stdout)")
+    parser.add_argument("-j", "--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--modelo", default=MODELO)
+    args = parser.parse_args()
+
+    arquivos = listar_wavs(args.caminhos)
+    if "fork" in multiprocessing.get_all_start_methods():
+        contexto, inicializador = multiprocessing.get_context("fork"), None
+        carregar_modelo(args.modelo)
+    else:
+        contexto, inicializador = None, carregar_modelo
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8")
+    inicio = time.perf_counter()
+    audio_total = cpu_total = 0.0
+    erros = 0
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.processos,
+            mp_context=contexto,
+            initializer=inicializador,
+            initargs=(args.modelo,),
+        ) as pool:
+            for registro in pool.map(transcrever, arquivos, chunksize=1):
+                saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                if "erro" in registro:
+                    erros += 1
+                    continue
+                audio_total += registro["duracao"]
+                cpu_total += registro["cpu"]
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+    decorrido = time.perf_counter() - inicio
+    print(f"\033[1;36mArquivos: {len(arquivos)} ({erros} com erro) | "
+          f"Áudio: {audio_total:.1f} s | Tempo: {decorrido:.1f} s\033[0m", file=sys.stderr)
+    if audio_total:
+        print(f"\033[1;36mRTF por processo: {cpu_total / audio_total:.3f} | "
+              f"RTF total: {decorrido / audio_total:.3f} | "
+              f"Arquivos/s: {len(arquivos) / decorrido:.2f}\033[0m", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
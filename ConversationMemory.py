@@ -0,0 +1,139 @@
+import os
+import threading
+
+from Startup import modulo_em_segundo_plano
+
+ollama = modulo_em_segundo_plano("ollama")
+
+MAX_TOKENS = int(os.getenv("MEMORIA_MAX_TOKENS", "2048"))
+TURNOS_RECENTES = int(os.getenv("MEMORIA_TURNOS_RECENTES", "3"))
+
+PROMPT_RESUMO = """Atualize o resumo de uma conversa entre um usuário e a ARI.
+Mantenha apenas fatos úteis para as próximas respostas (nome, empresa, dúvidas e o que já foi respondido).
+Responda somente com o novo resumo, em português do Brasil, com no máximo 3 frases.
+
+Resumo atual:
+{resumo}
+
+Novos trechos da conversa:
+{trechos}"""
+
+
+def contar_tokens(texto):
+    """Estimativa barata de tokens (~4 caracteres por token em português)"""
+    return len(texto) // 4 + 1
+
+
+def resumidor_ollama(modelo, llm=None):
+    """Cria uma função de resumo que usa o mesmo modelo local do agente
+
+    Com `llm` (um LLMClient) o resumo usa o cliente persistente do agente e o
+    mesmo keep_alive, sem derrubar o tempo de permanência do modelo.
+    """
+    def resumir(resumo, trechos):
+        mensagens = [{"role": "user", "content": PROMPT_RESUMO.format(
+            resumo=resumo or "(vazio)", trechos=trechos
+        )}]
+        if llm:
+            resposta = llm.chat(mensagens)
+        else:
+            resposta = ollama.chat(model=modelo, messages=mensagens)
+        return resposta['message']['content'].strip()
+    return resumir
+
+
+def resumo_extrativo(resumo, trechos):
+    """Resumo sem LLM: guarda só o início de cada fala antiga"""
+    linhas = [linha[:120] for linha in trechos.splitlines() if linha.strip()]
+    return " ".join(filter(None, [resumo] + linhas))[-1200:]
+
+
+class ConversationMemory:
+    """Histórico com orçamento de tokens e resumo incremental dos turnos antigos"""
+
+    def __init__(self, system_prompt, max_tokens=MAX_TOKENS,
+                 turnos_recentes=TURNOS_RECENTES, resumir=resumo_extrativo):
+        self.sistema = {"role": "system", "content": system_prompt}
+        self.max_tokens = max_tokens
+        self.turnos_recentes = turnos_recentes
+        self.resumir = resumir
+        self.resumo = ""
+        self.mensagens_turnos = []
+        self.lock = threading.Lock()
+        self.compactando = None
+
+    def __len__(self):
+        return len(self.mensagens_turnos)
+
+    def adicionar(self, role, content):
+        """Registra uma fala e, se passar do orçamento, resume em segundo plano"""
+        with self.lock:
+            self.mensagens_turnos.append({"role": role, "content": content})
+            precisa_compactar = (
+                role == "assistant"
+                and self.tokens() > self.max_tokens
+                and len(self.mensagens_turnos) > 2 * self.turnos_recentes
+            )
+        if precisa_compactar and not (self.compactando and self.compactando.is_alive()):
+            self.compactando = threading.Thread(target=self.compactar, daemon=True)
+            self.compactando.start()
+
+    def corrigir_ultima(self, role, content):
+        """Troca o conteúdo da última fala de `role` (ex.: resposta interrompida no meio)"""
+        with self.lock:
+            for mensagem in reversed(self.mensagens_turnos):
+                if mensagem["role"] == role:
+                    mensagem["content"] = content
+                    return True
+        return False
+
+    def compactar(self):
+        """Dobra os turnos além dos N mais recentes dentro do resumo"""
+        with self.lock:
+            corte = len(self.mensagens_turnos) - 2 * self.turnos_recentes
+            if corte <= 0:
+                return
+            antigas = self.mensagens_turnos[:corte]
+            resumo_atual = self.resumo
+
+        trechos = "\n".join(
+            f"{'Usuário' if m['role'] == 'user' else 'ARI'}: {m['content']}" for m in antigas
+        )
+        try:
+            novo_resumo = self.resumir(resumo_atual, trechos)
+        except Exception as e:
+            print(f"\033[1;31mErro ao resumir histórico: {str(e)}\033[0m")
+            novo_resumo = resumo_extrativo(resumo_atual, trechos)
+
+        with self.lock:
+            # Novas falas podem ter chegado enquanto o resumo era gerado
+            self.mensagens_turnos = self.mensagens_turnos[len(antigas):]
+            self.resumo = novo_resumo
+
+    def mensagens(self, contexto=None, pergunta=None):
+        """Monta a lista enviada ao modelo, com o contexto antes da última pergunta
+
+        Se `pergunta` for informada ela entra no fim da lista sem ser gravada no
+        histórico (usado na geração especulativa).
+        """
+        with self.lock:
+            mensagens = [self.sistema]
+            if self.resumo:
+                mensagens.append({"role": "system", "content": f"Resumo da conversa até aqui: {self.resumo}"})
+            turnos = list(self.mensagens_turnos)
+        if pergunta is not None:
+            turnos.append({"role": "user", "content": pergunta})
+        mensagens.extend(turnos[:-1])
+        if contexto:
+            mensagens.append({"role": "system", "content": contexto})
+        mensagens.extend(turnos[-1:])
+        return mensagens
+
+    def tokens(self, mensagens=None):
+        """Total estimado de tokens do histórico (ou da lista informada)"""
+        if mensagens is None:
+            mensagens = [self.sistema] + self.mensagens_turnos
+            texto = self.resumo + "".join(m["content"] for m in mensagens)
+        else:
+            texto = "".join(m["content"] for m in mensagens)
+        return contar_tokens(texto)
@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import time
+
+from vosk import KaldiRecognizer
+
+from KnowledgeIndex import KnowledgeIndex, DIRETORIO_BASE
+
+# GRAMATICA_VOSK=1 restringe a decodificação às palavras da base de conhecimento
+GRAMATICA_ATIVA = os.getenv("GRAMATICA_VOSK", "0") == "1"
+# Com gramática o Vosk dá conf 1.0 a quase toda palavra reconhecida: o que sinaliza
+# fala fora do domínio é o [unk], e é ele que dispara a redecodificação. A confiança
+# média só entra se calibrada (GRAMATICA_CONFIANCA > 0, veja a distribuição no bench_gramatica)
+CONFIANCA_MINIMA = float(os.getenv("GRAMATICA_CONFIANCA", "0"))
+# Fala guardada para a redecodificação (uma pergunta longa cabe com folga)
+MAXIMO_FALA_S = 30
+DESCONHECIDA = "[unk]"
+
+# Como as perguntas são feitas, mesmo que a base não use essas palavras
+PALAVRAS_CONVERSA = """
+o a os as um uma de do da dos das no na nos nas em para pra por com sem sobre e ou
+que quê qual quais quem onde quando como porque por quanto quanta quantos quantas
+é são ser está estão tem têm ter há pode podem posso consigo preciso quero queria gostaria
+eu você vocês meu minha meus minhas seu sua me se nós
+isso isto esse essa ela ele dela dele
+não sim também só mais menos muito bem já ainda
+me fale fala diga explique explica conte saber entender usar uso acessar acesso
+funciona funcionam serve servem ajuda ajudar ajudam oferece oferecem dá dão faz fazer
+olá oi obrigado obrigada tchau por favor ari
+""".split()
+
+
+def vocabulario(texto, extras=PALAVRAS_CONVERSA):
+    """Palavras da base (em minúsculas, com acentos, como no léxico do Vosk) e as de conversa"""
+    return set(re.findall(r"[^\W\d_]+", texto.lower())) | set(extras)
+
+
+def gramatica(modelo, palavras):
+    """Lista JSON para o KaldiRecognizer e as palavras fora do léxico do modelo
+
+    Palavras que o modelo não conhece seriam ignoradas pelo Vosk com um aviso
+    cada; só entram de volta se o modelo for recompilado com elas.
+    """
+    conhecidas, faltando = [], []
+    for palavra in sorted(palavras):
+        # Model.find_word devolve -1 para palavras fora do léxico
+        if not hasattr(modelo, "find_word") or modelo.find_word(palavra) >= 0:
+            conhecidas.append(palavra)
+        else:
+            faltando.append(palavra)
+    return json.dumps(conhecidas + [DESCONHECIDA], ensure_ascii=False), faltando
+
+
+def gramatica_da_base(modelo, caminho=DIRETORIO_BASE):
+    """Gramática montada com o texto da base de conhecimento"""
+    return gramatica(modelo, vocabulario(KnowledgeIndex.carregar(caminho).texto))
+
+
+class RecognizerDominio:
+    """Mesma interface do KaldiRecognizer, decodificando com o vocabulário da base
+
+    A fala da frase atual fica guardada; se o resultado vier com palavra
+    desconhecida ([unk]), ou abaixo de `confianca_minima` quando ela for
+    configurada, ela é decodificada de novo sem a gramática e esse resultado
+    é o devolvido.
+    """
+
+    def __init__(self, modelo, gramatica_json, taxa=16000, confianca_minima=CONFIANCA_MINIMA):
+        self.restrito = KaldiRecognizer(modelo, taxa, gramatica_json)
+        self.livre = KaldiRecognizer(modelo, taxa)
+        # As palavras do resultado (o [unk] e a confiança) decidem a volta ao vocabulário completo
+        self.restrito.SetWords(True)
+        self.livre.SetWords(True)
+        self.confianca_minima = confianca_minima
+        self.maximo_bytes = MAXIMO_FALA_S * taxa * 2
+        self.fala = bytearray()
+        self.resultados = 0
+        # Média por resultado restrito, só para calibrar confianca_minima: quem quer
+        # a distribuição (bench_gramatica) troca por uma lista
+        self.confiancas = None
+        self.redecodificados = 0
+        self.cpu_redecodificacao = 0.0
+
+    def SetWords(self, ativo):
+        self.livre.SetWords(ativo)
+
+    def AcceptWaveform(self, dados):
+        self.fala += dados
+        if len(self.fala) > self.maximo_bytes:
+            del self.fala[:len(self.fala) - self.maximo_bytes]
+        return self.restrito.AcceptWaveform(dados)
+
+    def PartialResult(self):
+        return self.restrito.PartialResult()
+
+    def Result(self):
+        return self.conferir(self.restrito.Result())
+
+    def FinalResult(self):
+        return self.conferir(self.restrito.FinalResult())
+
+    def Reset(self):
+        self.restrito.Reset()
+        self.livre.Reset()
+        self.fala.clear()
+
+    def conferir(self, bruto):
+        """Devolve o resultado restrito ou, se ele não for confiável, o do vocabulário completo"""
+        fala, self.fala = bytes(self.fala), bytearray()
+        palavras = json.loads(bruto).get("result") or []
+        if not palavras:
+            return bruto
+        self.resultados += 1
+        confianca = sum(p["conf"] for p in palavras) / len(palavras)
+        if self.confiancas is not None:
+            self.confiancas.append(confianca)
+        if confianca >= self.confianca_minima and all(p["word"] != DESCONHECIDA for p in palavras):
+            return bruto
+        self.redecodificados += 1
+        inicio = time.process_time()
+        self.livre.AcceptWaveform(fala)
+        bruto = self.livre.FinalResult()
+        self.cpu_redecodificacao += time.process_time() - inicio
+        return bruto
+
+    def relatorio(self):
+        return (f"Gramática: {self.redecodificados} de {self.resultados} falas redecodificadas "
+                f"com o vocabulário completo ({self.cpu_redecodificacao:.1f} s de CPU)")
@@ -0,0 +1,90 @@
+import os
+import queue
+import threading
+
+from KnowledgeIndex import normalizar_texto
+
+# Tempo com o parcial estável para encerrar a fala / para começar a especular
+ENDPOINT_SILENCIO_MS = int(os.getenv("ENDPOINT_SILENCIO_MS", "450"))
+ESPECULAR_MS = int(os.getenv("ESPECULAR_MS", "200"))
+
+FINAL = "final"
+ESPECULAR = "especular"
+_FIM = object()
+
+
+class EndpointDetector:
+    """Decide o fim da fala pela estabilidade do PartialResult() do Vosk"""
+
+    def __init__(self, silencio_ms=ENDPOINT_SILENCIO_MS, especular_ms=ESPECULAR_MS):
+        self.silencio_ms = silencio_ms
+        self.especular_ms = especular_ms
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Prepara o detector para uma nova fala"""
+        self.parcial = ""
+        self.desde = 0.0
+        self.especulado = False
+
+    def alimentar(self, parcial, tempo):
+        """Recebe o parcial atual e o tempo de áudio (s); devolve FINAL, ESPECULAR ou None"""
+        if parcial != self.parcial:
+            self.parcial, self.desde, self.especulado = parcial, tempo, False
+            return None
+        if not parcial:
+            return None
+
+        estavel_ms = (tempo - self.desde) * 1000
+        if estavel_ms >= self.silencio_ms:
+            return FINAL
+        if not self.especulado and estavel_ms >= self.especular_ms:
+            self.especulado = True
+            return ESPECULAR
+        return None
+
+
+class SpeculativeGeneration:
+    """Começa a gerar a resposta a partir de um parcial estável, antes do resultado final"""
+
+    def __init__(self, texto, iniciar_stream):
+        self.texto = texto
+        self.pedacos = queue.Queue()
+        self.cancelado = threading.Event()
+        self.thread = threading.Thread(target=self.executar, args=(iniciar_stream,), daemon=True)
+        self.thread.start()
+
+    def executar(self, iniciar_stream):
+        """Guarda os pedaços do stream até alguém consumir ou cancelar"""
+        stream = None
+        try:
+            stream = iniciar_stream(self.texto)
+            for pedaco in stream:
+                if self.cancelado.is_set():
+                    break
+                self.pedacos.put(pedaco)
+        except Exception as e:
+            self.pedacos.put(e)
+        finally:
+            # Fechar o gerador encerra a conexão e a geração no servidor
+            if self.cancelado.is_set() and hasattr(stream, "close"):
+                stream.close()
+            self.pedacos.put(_FIM)
+
+    def confere(self, texto_final):
+        """A especulação vale se o texto final for o mesmo do parcial usado"""
+        return normalizar_texto(texto_final) == normalizar_texto(self.texto)
+
+    def cancelar(self):
+        """Descarta a geração especulativa"""
+        self.cancelado.set()
+
+    def consumir(self):
+        """Itera sobre os pedaços já gerados e os que ainda vão chegar"""
+        while True:
+            pedaco = self.pedacos.get()
+            if pedaco is _FIM:
+                return
+            if isinstance(pedaco, Exception):
+                raise pedaco
+            yield pedaco
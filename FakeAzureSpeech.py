@@ -0,0 +1,212 @@
+"""Substituto local do azure.cognitiveservices.speech para testes e benchmarks.
+
+Implementa só o que o AzureSpeechClient usa: SpeechConfig, audio.AudioConfig,
+SpeechRecognizer (recognize_once_async e reconhecimento contínuo com os eventos
+recognizing/recognized/canceled/session_*), SpeechSynthesizer.speak_ssml_async,
+ResultReason e CancellationDetails. O "microfone" é a função `falar(texto)`;
+cada conexão nova paga LATENCIA_CONEXAO, como o handshake com o serviço.
+
+Para simular degradação, altere em tempo de execução SILENCIO_FINAL (fim de
+fala mais lento), LATENCIA_SINTESE ou INDISPONIVEL (serviço fora do ar: as
+sessões caem com `canceled` e as sínteses voltam canceladas).
+
+Uso:
+  import AzureRAG, FakeAzureSpeech
+  AzureRAG.speechsdk = FakeAzureSpeech
+  FakeAzureSpeech.falar("o que é a ari")
+"""
+import enum
+import io
+import queue
+import threading
+import time
+import wave
+from types import SimpleNamespace
+
+LATENCIA_CONEXAO = 0.25  # segundos por handshake
+PALAVRAS_POR_SEGUNDO = 3.0
+SILENCIO_FINAL = 0.5  # o serviço fecha a fala depois desse silêncio
+LATENCIA_SINTESE = 0.15  # segundos por frase sintetizada
+INDISPONIVEL = False
+
+conexoes = 0
+_falas = queue.Queue()
+_lock = threading.Lock()
+
+
+def falar(texto):
+    """Coloca uma fala no microfone falso"""
+    _falas.put(texto)
+
+
+def reiniciar():
+    """Zera o contador de conexões e descarta falas pendentes"""
+    global conexoes
+    with _lock:
+        conexoes = 0
+    while not _falas.empty():
+        _falas.get_nowait()
+
+
+def _conectar():
+    global conexoes
+    time.sleep(LATENCIA_CONEXAO)
+    with _lock:
+        conexoes += 1
+
+
+def _cancelamento():
+    return SimpleNamespace(cancellation_details=SimpleNamespace(error_details="serviço indisponível"))
+
+
+class ResultReason(enum.Enum):
+    RecognizingSpeech = 2
+    RecognizedSpeech = 3
+    NoMatch = 0
+    Canceled = 1
+    SynthesizingAudioCompleted = 10
+
+
+class CancellationDetails:
+    def __init__(self, motivo):
+        self.error_details = motivo
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(result.cancellation)
+
+
+class SpeechConfig:
+    def __init__(self, subscription=None, region=None):
+        self.speech_recognition_language = None
+        self.speech_synthesis_voice_name = None
+
+    def set_speech_synthesis_output_format(self, formato):
+        self.output_format = formato
+
+
+class SpeechSynthesisOutputFormat(enum.Enum):
+    Riff24Khz16BitMonoPcm = 1
+
+
+audio = SimpleNamespace(AudioConfig=lambda use_default_microphone=True: SimpleNamespace())
+
+
+class _Futuro:
+    def __init__(self, funcao):
+        self.resultado = {}
+        self.thread = threading.Thread(target=lambda: self.resultado.setdefault("v", funcao()), daemon=True)
+        self.thread.start()
+
+    def get(self):
+        self.thread.join()
+        return self.resultado.get("v")
+
+
+class EventSignal:
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def emitir(self, evento):
+        for callback in self.callbacks:
+            callback(evento)
+
+
+def _resultado(texto, razao, offset=0, cancelamento=None):
+    return SimpleNamespace(text=texto, reason=razao, offset=offset,
+                           duration=int(len(texto.split()) / PALAVRAS_POR_SEGUNDO * 1e7),
+                           cancellation=cancelamento)
+
+
+class SpeechRecognizer:
+    def __init__(self, speech_config=None, audio_config=None):
+        self.recognizing = EventSignal()
+        self.recognized = EventSignal()
+        self.canceled = EventSignal()
+        self.session_started = EventSignal()
+        self.session_stopped = EventSignal()
+        self.parar = threading.Event()
+        self.thread = None
+        self.inicio = None
+
+    def recognize_once_async(self):
+        def reconhecer():
+            _conectar()
+            self.session_started.emitir(SimpleNamespace(session_id="falso"))
+            texto = _falas.get()
+            self.falar_palavras(texto)
+            time.sleep(SILENCIO_FINAL)
+            return _resultado(texto, ResultReason.RecognizedSpeech)
+        return _Futuro(reconhecer)
+
+    def start_continuous_recognition_async(self):
+        def iniciar():
+            _conectar()
+            if INDISPONIVEL:
+                self.canceled.emitir(_cancelamento())
+                return
+            self.parar.clear()
+            self.inicio = time.monotonic()
+            self.session_started.emitir(SimpleNamespace(session_id="falso"))
+            self.thread = threading.Thread(target=self.executar, daemon=True)
+            self.thread.start()
+        return _Futuro(iniciar)
+
+    def stop_continuous_recognition_async(self):
+        def parar():
+            self.parar.set()
+            if self.thread:
+                self.thread.join()
+            self.session_stopped.emitir(SimpleNamespace(session_id="falso"))
+        return _Futuro(parar)
+
+    def executar(self):
+        while not self.parar.is_set():
+            if INDISPONIVEL:
+                self.canceled.emitir(_cancelamento())
+                return
+            try:
+                texto = _falas.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            offset = int((time.monotonic() - self.inicio) * 1e7)
+            self.falar_palavras(texto, offset)
+            time.sleep(SILENCIO_FINAL)
+            self.recognized.emitir(SimpleNamespace(
+                result=_resultado(texto, ResultReason.RecognizedSpeech, offset)
+            ))
+
+    def falar_palavras(self, texto, offset=0):
+        """Simula a fala em tempo real, emitindo resultados intermediários a cada palavra"""
+        palavras = texto.split()
+        for i in range(1, len(palavras) + 1):
+            time.sleep(1 / PALAVRAS_POR_SEGUNDO)
+            self.recognizing.emitir(SimpleNamespace(
+                result=_resultado(" ".join(palavras[:i]), ResultReason.RecognizingSpeech, offset)
+            ))
+
+
+class SpeechSynthesizer:
+    def __init__(self, speech_config=None, audio_config=None):
+        self.speech_config = speech_config
+
+    def speak_ssml_async(self, ssml):
+        def sintetizar():
+            time.sleep(LATENCIA_SINTESE)
+            if INDISPONIVEL:
+                return SimpleNamespace(reason=ResultReason.Canceled, audio_data=b"",
+                                       error_details="serviço indisponível")
+            # Silêncio com a duração aproximada da frase, no formato Riff24Khz16BitMonoPcm
+            segundos = len(ssml.split()) / PALAVRAS_POR_SEGUNDO
+            saida = io.BytesIO()
+            with wave.open(saida, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(24000)
+                wav.writeframes(b"\0\0" * int(24000 * segundos))
+            return SimpleNamespace(reason=ResultReason.SynthesizingAudioCompleted,
+                                   audio_data=saida.getvalue())
+        return _Futuro(sintetizar)
@@ -0,0 +1,207 @@
+"""Servidor falso da API do Ollama para testes locais e benchmarks.
+
+Uso: python FakeOllama.py [--porta 11435] [--tokens-por-segundo 25] [--atraso-inicial 0.2]
+                          [--carga-fria 0] [--compartilhar]
+Depois: OLLAMA_HOST=http://127.0.0.1:11435 python OfflineRAG.py
+
+Responde /api/chat e /api/generate com uma resposta fixa, em stream NDJSON,
+no ritmo configurado, sem precisar de GPU nem de modelo baixado. Com
+--carga-fria, o primeiro pedido a um modelo (ou o primeiro depois do
+keep_alive vencer) espera esse tempo a mais e informa `load_duration`. Com
+--compartilhar, as gerações simultâneas dividem o ritmo, como numa GPU só:
+com N pedidos ativos, cada um recebe tokens N vezes mais devagar.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPOSTA_PADRAO = (
+    "A ARI é a Área de Recomendações Inteligentes do Banco do Brasil. "
+    "Ela transforma os dados financeiros da sua empresa em dicas práticas. "
+    "Você encontra as recomendações no Painel PJ, pelo BB Digital PJ."
+)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.responder_json({"models": [{"name": m} for m in sorted(self.server.modelos_vistos)]})
+        else:
+            self.responder_json({"status": "ok"})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+        modelo = pedido.get("model", "")
+        with self.server.lock:
+            self.server.pedidos += 1
+            self.server.modelos_vistos.add(modelo)
+        if self.path not in ("/api/chat", "/api/generate"):
+            self.send_error(404)
+            return
+        chat = self.path == "/api/chat"
+
+        with self.server.lock:
+            self.server.ativos += 1
+            self.server.pico_ativos = max(self.server.pico_ativos, self.server.ativos)
+        try:
+            self.gerar(pedido, modelo, chat)
+        finally:
+            with self.server.lock:
+                self.server.ativos -= 1
+
+    def gerar(self, pedido, modelo, chat):
+        carga = self.server.carregar(modelo, pedido.get("keep_alive"))
+        tokens = re.findall(r"\S+\s*", self.server.resposta)
+        if not pedido.get("messages", True) or pedido.get("prompt") == "":
+            # Pedido vazio só carrega o modelo (usado no aquecimento)
+            tokens = []
+
+        time.sleep(self.server.ritmo(self.server.atraso_inicial) + carga)
+        opcoes = pedido.get("options") or {}
+        if opcoes.get("num_predict"):
+            tokens = tokens[:opcoes["num_predict"]]
+        if pedido.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                try:
+                    self.enviar_pedaco(self.montar(modelo, chat, token, False))
+                except (BrokenPipeError, ConnectionResetError):
+                    # Como o Ollama: cliente desconectou (barge-in), a geração para
+                    with self.server.lock:
+                        self.server.cancelados += 1
+                    return
+                with self.server.lock:
+                    self.server.tokens_gerados += 1
+                time.sleep(self.server.ritmo(1 / self.server.tokens_por_segundo))
+            self.enviar_pedaco(self.montar(modelo, chat, "", True, carga))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            time.sleep(self.server.ritmo(len(tokens) / self.server.tokens_por_segundo))
+            self.responder_json(self.montar(modelo, chat, "".join(tokens), True, carga))
+
+    def montar(self, modelo, chat, conteudo, fim, carga=0.0):
+        """Mensagem no mesmo formato das respostas do Ollama"""
+        mensagem = {
+            "model": modelo,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": fim,
+        }
+        if chat:
+            mensagem["message"] = {"role": "assistant", "content": conteudo}
+        else:
+            mensagem["response"] = conteudo
+        if fim:
+            mensagem["done_reason"] = "stop"
+            mensagem["load_duration"] = int(carga * 1e9)
+        return mensagem
+
+    def enviar_pedaco(self, mensagem):
+        linha = (json.dumps(mensagem, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(linha):x}\r\n".encode() + linha + b"\r\n")
+        self.wfile.flush()
+
+    def responder_json(self, mensagem):
+        corpo = json.dumps(mensagem, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def duracao_keep_alive(valor, padrao=300.0):
+    """Converte o keep_alive do Ollama ("30m", "1h", 90, -1) em segundos"""
+    if valor is None or valor == "":
+        return padrao
+    if isinstance(valor, (int, float)):
+        return float("inf") if valor < 0 else float(valor)
+    unidades = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    numero = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", valor.strip())
+    if not numero:
+        return padrao
+    segundos = float(numero.group(1)) * unidades[numero.group(2) or "s"]
+    return float("inf") if segundos < 0 else segundos
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """Servidor HTTP em thread própria, pronto para usar dentro de testes e benchmarks"""
+
+    daemon_threads = True
+
+    def __init__(self, porta=0, tokens_por_segundo=25.0, atraso_inicial=0.2, resposta=RESPOSTA_PADRAO,
+                 carga_fria=0.0, compartilhar=False):
+        super().__init__(("127.0.0.1", porta), FakeOllamaHandler)
+        self.tokens_por_segundo = tokens_por_segundo
+        self.atraso_inicial = atraso_inicial
+        self.resposta = resposta
+        self.pedidos = 0
+        self.tokens_gerados = 0
+        self.cancelados = 0
+        self.modelos_vistos = set()
+        self.carga_fria = carga_fria
+        self.compartilhar = compartilhar
+        self.ativos = 0
+        self.pico_ativos = 0
+        self.carregados = {}  # modelo -> instante em que o keep_alive vence
+        self.lock = threading.Lock()
+
+    def carregar(self, modelo, keep_alive):
+        """Simula a carga do modelo; devolve os segundos gastos carregando"""
+        agora = time.monotonic()
+        with self.lock:
+            frio = self.carregados.get(modelo, 0) <= agora
+            self.carregados[modelo] = agora + self.carga_fria + duracao_keep_alive(keep_alive)
+        return self.carga_fria if frio else 0.0
+
+    def ritmo(self, segundos):
+        """Tempo de uma etapa da geração, dividido entre os pedidos ativos se compartilhado"""
+        return segundos * max(1, self.ativos) if self.compartilhar else segundos
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def iniciar(self):
+        """Atende em segundo plano e devolve a URL para OLLAMA_HOST"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=11435)
+    parser.add_argument("--tokens-por-segundo", type=float, default=25.0)
+    parser.add_argument("--atraso-inicial", type=float, default=0.2, help="segundos até o primeiro token")
+    parser.add_argument("--resposta", default=RESPOSTA_PADRAO)
+    parser.add_argument("--carga-fria", type=float, default=0.0, help="segundos para carregar um modelo frio")
+    parser.add_argument("--compartilhar", action="store_true", help="pedidos simultâneos dividem o ritmo")
+    args = parser.parse_args()
+
+    servidor = FakeOllama(
+        args.porta, args.tokens_por_segundo, args.atraso_inicial, args.resposta, args.carga_fria,
+        args.compartilhar,
+    )
+    print(f"\033[1;36mOllama falso em {servidor.url}\033[0m")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
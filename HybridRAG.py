@@ -0,0 +1,79 @@
+"""ARI híbrida: Azure quando está rápido e no ar, Vosk/pyttsx3 offline quando não.
+
+Uso: python HybridRAG.py
+
+O LLM, a base de conhecimento, o cache e o barge-in são os do OfflineRAG; só
+o STT e o TTS passam pelo RoteadorFala (ver SpeechRouter.py para os ajustes
+por variável de ambiente). Com ROTEADOR_HEDGE=1 o Azure e o Vosk escutam a
+mesma fala em paralelo; isso exige AZURE_STT_MODO=continuo e um sistema de
+áudio que permita dois leitores do microfone (PulseAudio, CoreAudio, WASAPI).
+Sem hedge o Azure usa recognize_once e só abre o microfone quando é ele quem escuta.
+"""
+import AzureRAG
+from OfflineRAG import AssistenteVirtual, OfflineSpeechEngine
+from SpeechRouter import BackendAzure, BackendOffline, RoteadorFala, HEDGE, ORDEM
+from StreamingTTS import SpeechQueue
+
+
+class HybridSpeechEngine:
+    """Mesma interface do OfflineSpeechEngine, com STT e TTS escolhidos pelo roteador"""
+
+    def __init__(self, hedge=HEDGE):
+        if hedge and AzureRAG.STT_MODE != "continuo":
+            # recognize_once não pode ser abandonado e roubaria a fala seguinte
+            print("\033[1;33mHedge desligado: exige AZURE_STT_MODO=continuo\033[0m")
+            hedge = False
+        self.offline = OfflineSpeechEngine()
+        # A sessão contínua mantém um segundo leitor do microfone aberto: só vale a pena com hedge.
+        # A reprodução é a do motor offline, então o cliente não abre PyAudio nem fila de fala
+        self.azure = AzureRAG.AzureSpeechClient(stt_mode="continuo" if hedge else "unico", playback=False)
+        backends = {
+            BackendOffline.nome: BackendOffline(self.offline),
+            BackendAzure.nome: BackendAzure(self.azure),
+        }
+        self.roteador = RoteadorFala([backends[nome] for nome in ORDEM if nome in backends], hedge)
+        self.fila_fala = SpeechQueue(self.sintetizar_voz)
+        self.turnos = 0
+
+    def capturar_audio(self, ao_parcial_estavel=None):
+        transcricao = self.roteador.reconhecer(ao_parcial_estavel)
+        if transcricao is None:
+            return None
+        print(f"\033[2mSTT: {transcricao.backend}\033[0m")
+        return transcricao.texto
+
+    def sintetizar_voz(self, texto):
+        try:
+            dados = self.roteador.sintetizar(texto)
+            self.offline.tocar(dados, self.fila_fala.interrompido)
+        except Exception as e:
+            print(f"\033[1;31mErro na síntese: {str(e)}\033[0m")
+
+    def relatorio_captura(self):
+        self.offline.relatorio_captura()
+        self.turnos += 1
+        if self.turnos % 5 == 0:
+            print(f"\033[2m{self.roteador.relatorio()}\033[0m")
+
+    def vigiar_interrupcao(self, ao_detectar):
+        # O barge-in usa a captura local, qualquer que seja o backend de STT
+        return self.offline.vigiar_interrupcao(ao_detectar)
+
+    def parar_vigia(self):
+        self.offline.parar_vigia()
+
+    def aguardar_microfone(self):
+        return self.offline.aguardar_microfone()
+
+    def relatar_inicializacao(self, pronto):
+        self.offline.relatar_inicializacao(pronto)
+        try:
+            self.azure.inicializacao.aguardar()
+        except Exception as e:
+            print(f"\033[1;33mAzure indisponível na inicialização: {str(e)}\033[0m")
+        print(f"\033[2m{self.azure.inicializacao.relatorio(pronto)}\033[0m")
+
+
+if __name__ == "__main__":
+    assistente = AssistenteVirtual(HybridSpeechEngine())
+    assistente.executar()
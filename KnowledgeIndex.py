@@ -0,0 +1,177 @@
+import glob
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+DIRETORIO_BASE = os.getenv("RAG_BASE_DIR", "conhecimento")
+TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+
+# Palavras muito frequentes que não ajudam a distinguir os trechos
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas ao aos
+por pelo pela pelos pelas para pra com sem sobre entre e ou mas nem que
+se como qual quais quando onde porque por que quem isso isto esse essa
+eu voce voces ele ela eles elas meu minha seu sua me te lhe
+ser sao foi esta estao ter tem tenho ha pode posso vai
+mais muito muita ja tambem so nao sim
+""".split())
+
+Trecho = namedtuple("Trecho", "titulo texto origem")
+
+
+def normalizar_texto(texto):
+    """Remove acentos, pontuação e caixa alta"""
+    sem_acento = unicodedata.normalize("NFKD", texto)
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", sem_acento.lower()).strip()
+
+
+def tokenizar(texto):
+    """Normaliza, remove stopwords e reduz cada palavra ao seu radical"""
+    # Truncar em 5 letras aproxima um stemmer e junta singular/plural
+    # ("recomendação"/"recomendações", "acesso"/"acessar")
+    return [
+        palavra[:5]
+        for palavra in normalizar_texto(texto).split()
+        if palavra not in STOPWORDS
+    ]
+
+
+def eh_titulo(linha):
+    """Títulos de seção são linhas curtas terminadas em ':' fora de listas"""
+    return linha.endswith(":") and not linha.startswith("*") and len(linha) <= 80
+
+
+def dividir_em_secoes(texto, origem=""):
+    """Divide o documento em trechos usando os títulos de seção"""
+    trechos = []
+    titulo, linhas = "", []
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if not linha:
+            continue
+        if eh_titulo(linha):
+            if linhas:
+                trechos.append(Trecho(titulo, "\n".join(linhas), origem))
+            titulo, linhas = linha.rstrip(":"), []
+        else:
+            linhas.append(linha)
+    if linhas:
+        trechos.append(Trecho(titulo, "\n".join(linhas), origem))
+    return trechos
+
+
+class KnowledgeIndex:
+    """Índice lexical BM25 sobre os trechos da base de conhecimento"""
+
+    def __init__(self, trechos, k1=1.5, b=0.75):
+        self.trechos = list(trechos)
+        self.k1 = k1
+        self.b = b
+        self.frequencias = []
+        for trecho in self.trechos:
+            # O título entra duas vezes para pesar mais que o corpo
+            tokens = tokenizar(trecho.titulo) * 2 + tokenizar(trecho.texto)
+            self.frequencias.append(Counter(tokens))
+        self.tamanhos = [sum(freq.values()) for freq in self.frequencias]
+        self.tamanho_medio = sum(self.tamanhos) / max(len(self.tamanhos), 1)
+
+        documentos_por_termo = Counter()
+        for freq in self.frequencias:
+            documentos_por_termo.update(freq.keys())
+        total = len(self.trechos)
+        self.idf = {
+            termo: math.log(1 + (total - n + 0.5) / (n + 0.5))
+            for termo, n in documentos_por_termo.items()
+        }
+
+        # Texto integral indexado; serve de versão da base para caches
+        self.texto = "\n\n".join(f"{t.titulo}:\n{t.texto}" for t in self.trechos)
+        self.caminho = None
+        self.modificacoes = {}
+
+    @staticmethod
+    def listar_arquivos(caminho):
+        """Arquivos de documento de um diretório (ou o próprio arquivo)"""
+        if os.path.isdir(caminho):
+            return sorted(
+                glob.glob(os.path.join(caminho, "*.txt"))
+                + glob.glob(os.path.join(caminho, "*.md"))
+            )
+        return [caminho]
+
+    @classmethod
+    def carregar(cls, caminho=DIRETORIO_BASE):
+        """Carrega um arquivo ou todos os .txt/.md de um diretório"""
+        arquivos = cls.listar_arquivos(caminho)
+        trechos = []
+        for arquivo in arquivos:
+            with open(arquivo, encoding="utf-8") as f:
+                trechos.extend(dividir_em_secoes(f.read(), origem=arquivo))
+        if not trechos:
+            raise FileNotFoundError(f"Nenhum documento encontrado em {caminho}")
+        indice = cls(trechos)
+        indice.caminho = caminho
+        indice.modificacoes = {a: os.path.getmtime(a) for a in arquivos}
+        return indice
+
+    def recarregar_se_alterado(self):
+        """Relê os documentos se algum arquivo foi criado, removido ou editado"""
+        if self.caminho is None:
+            return self
+        try:
+            atuais = {a: os.path.getmtime(a) for a in self.listar_arquivos(self.caminho)}
+        except OSError:
+            return self
+        if atuais == self.modificacoes:
+            return self
+        try:
+            return KnowledgeIndex.carregar(self.caminho)
+        except (OSError, UnicodeDecodeError) as e:
+            # Base vazia ou arquivo pego no meio da gravação: segue com a versão anterior
+            # e só tenta de novo na próxima alteração
+            print(f"\033[1;33mBase de conhecimento não recarregada: {str(e)}\033[0m")
+            self.modificacoes = atuais
+            return self
+
+    def pontuar(self, tokens, indice):
+        """Pontuação BM25 de um trecho para os termos da pergunta"""
+        freq = self.frequencias[indice]
+        norma = self.k1 * (1 - self.b + self.b * self.tamanhos[indice] / self.tamanho_medio)
+        pontuacao = 0.0
+        for termo in tokens:
+            tf = freq.get(termo)
+            if tf:
+                pontuacao += self.idf[termo] * tf * (self.k1 + 1) / (tf + norma)
+        return pontuacao
+
+    def buscar(self, pergunta, k=TOP_K):
+        """Retorna até k pares (pontuação, trecho) mais relevantes"""
+        tokens = set(tokenizar(pergunta))
+        if not tokens:
+            return []
+        resultados = [
+            (self.pontuar(tokens, i), trecho)
+            for i, trecho in enumerate(self.trechos)
+        ]
+        resultados = [r for r in resultados if r[0] > 0]
+        resultados.sort(key=lambda r: r[0], reverse=True)
+        return resultados[:k]
+
+    def cobertura(self, pergunta):
+        """Fração (0 a 1) dos termos da pergunta presentes no trecho mais relevante"""
+        tokens = set(tokenizar(pergunta))
+        if not tokens or not self.trechos:
+            return 0.0
+        melhor = max(range(len(self.trechos)), key=lambda i: self.pontuar(tokens, i))
+        frequencias = self.frequencias[melhor]
+        return sum(termo in frequencias for termo in tokens) / len(tokens)
+
+    def contexto(self, pergunta, k=TOP_K):
+        """Monta o texto dos trechos relevantes para injetar no prompt"""
+        return "\n\n".join(
+            f"{trecho.titulo}:\n{trecho.texto}" if trecho.titulo else trecho.texto
+            for _, trecho in self.buscar(pergunta, k)
+        )
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+import Metrics
+from Startup import Adiado, Inicializacao, modulo_em_segundo_plano
+
+# ollama puxa o pydantic (centenas de ms): importa em paralelo com o resto da inicialização
+httpx = modulo_em_segundo_plano("httpx")
+ollama = modulo_em_segundo_plano("ollama")
+
+# Quanto tempo o Ollama mantém o modelo na memória depois de cada pedido
+KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+# Ocioso por mais que isso, um pedido mínimo mantém o modelo e o prefixo quentes (0 desliga)
+MANTER_QUENTE_S = float(os.getenv("LLM_MANTER_QUENTE_S", "240"))
+CONEXOES = int(os.getenv("LLM_CONEXOES", "4"))
+# load_duration acima disso indica que o modelo teve de ser carregado
+CARGA_FRIA_S = 0.1
+
+
+class LLMClient:
+    """Cliente Ollama persistente: pool de conexões, keep_alive, aquecimento e manter-quente"""
+
+    cliente = Adiado()
+    cliente_async = Adiado()
+
+    def __init__(self, modelo, prompt_sistema, keep_alive=KEEP_ALIVE,
+                 manter_quente_s=MANTER_QUENTE_S, host=None):
+        self.modelo = modelo
+        self.prompt_sistema = prompt_sistema
+        self.keep_alive = keep_alive
+        self.manter_quente_s = manter_quente_s
+        self.inicializacao = Inicializacao("llm")
+        self.inicializacao.iniciar("cliente", lambda: self.criar_cliente(host))
+        # Só o servidor asyncio usa: criado no primeiro pedido
+        self.inicializacao.adiar("cliente_async", lambda: self.criar_cliente(host, assincrono=True))
+        self.ultimo_uso = time.monotonic()
+        self.parar = threading.Event()
+        self.vigia = None
+
+    def criar_cliente(self, host, assincrono=False):
+        # Um único httpx.Client reaproveita as conexões TCP entre os pedidos
+        return (ollama.AsyncClient if assincrono else ollama.Client)(
+            host=host,
+            limits=httpx.Limits(max_connections=CONEXOES, max_keepalive_connections=CONEXOES),
+        )
+
+    def chat(self, messages, stream=False, **opcoes):
+        """Mesmo contrato do ollama.chat, com o modelo e o keep_alive do cliente"""
+        self.ultimo_uso = time.monotonic()
+        resposta = self.cliente.chat(
+            model=self.modelo, messages=messages, stream=stream, keep_alive=self.keep_alive, **opcoes
+        )
+        return self.medir(resposta) if stream else resposta
+
+    async def chat_async(self, messages, **opcoes):
+        """Stream de `chat` para código asyncio, com as mesmas medidas de `medir`"""
+        self.ultimo_uso = time.monotonic()
+        inicio = time.perf_counter()
+        stream = await self.cliente_async.chat(
+            model=self.modelo, messages=messages, stream=True, keep_alive=self.keep_alive, **opcoes
+        )
+        primeiro_token = None
+        try:
+            async for pedaco in stream:
+                if primeiro_token is None:
+                    primeiro_token = time.perf_counter() - inicio
+                if pedaco.get('done'):
+                    carga = (pedaco.get('load_duration') or 0) / 1e9
+                    Metrics.observar_primeiro_token(primeiro_token, carga > CARGA_FRIA_S)
+                yield pedaco
+        finally:
+            self.ultimo_uso = time.monotonic()
+            # Cancelada a tarefa (barge-in), fechar o stream derruba o pedido e o Ollama para de gerar
+            await stream.aclose()
+
+    def medir(self, stream):
+        """Repassa o stream medindo o tempo até o primeiro token, separado em frio/quente"""
+        # O pedido HTTP só sai na primeira iteração do gerador do ollama
+        inicio = time.perf_counter()
+        primeiro_token = None
+        try:
+            for pedaco in stream:
+                if primeiro_token is None:
+                    primeiro_token = time.perf_counter() - inicio
+                if pedaco.get('done'):
+                    carga = (pedaco.get('load_duration') or 0) / 1e9
+                    Metrics.observar_primeiro_token(primeiro_token, carga > CARGA_FRIA_S)
+                yield pedaco
+        finally:
+            self.ultimo_uso = time.monotonic()
+            # Fechar este gerador fecha o do ollama e, com ele, a conexão
+            if hasattr(stream, "close"):
+                stream.close()
+
+    def aquecer(self):
+        """Carrega o modelo e deixa o prompt de sistema no cache KV do Ollama"""
+        inicio = time.perf_counter()
+        try:
+            # Só o prefixo fixo e um token de saída: o pedido real reaproveita o prefill
+            resposta = self.cliente.chat(
+                model=self.modelo,
+                messages=[{"role": "system", "content": self.prompt_sistema},
+                          {"role": "user", "content": "Olá"}],
+                options={"num_predict": 1},
+                keep_alive=self.keep_alive,
+            )
+        except Exception as e:
+            print(f"\033[1;31mFalha ao aquecer o modelo {self.modelo}: {str(e)}\033[0m")
+            return None
+        self.ultimo_uso = time.monotonic()
+        carga = (resposta.get('load_duration') or 0) / 1e9
+        decorrido = time.perf_counter() - inicio
+        Metrics.observar_aquecimento(decorrido, carga > CARGA_FRIA_S)
+        print(f"\033[2mModelo {self.modelo} aquecido em {decorrido:.1f} s "
+              f"(carga {carga:.1f} s)\033[0m")
+        return decorrido
+
+    def manter_quente(self):
+        """Aquece agora e, em segundo plano, sempre que o cliente ficar ocioso demais"""
+        self.aquecer()
+        if self.manter_quente_s <= 0 or self.vigia:
+            return
+        self.vigia = threading.Thread(target=self.vigiar, daemon=True)
+        self.vigia.start()
+
+    def vigiar(self):
+        while not self.parar.wait(min(self.manter_quente_s, 30)):
+            if time.monotonic() - self.ultimo_uso >= self.manter_quente_s:
+                self.aquecer()
+
+    def fechar(self):
+        self.parar.set()
+        self.cliente.close()
@@ -0,0 +1,214 @@
+"""Agendador dos pedidos ao Ollama compartilhado por todos os agentes do processo.
+
+No máximo LLM_CONCORRENCIA gerações rodam ao mesmo tempo; as outras esperam
+numa fila por prioridade (continuações curtas antes de primeiras perguntas,
+tarefas de fundo por último) e, dentro da prioridade, pelo prazo mais próximo.
+Quem não consegue vaga até o prazo recebe PrazoEsgotado e o agente fala
+RESPOSTA_OCUPADA em vez de uma resposta atrasada.
+
+O limite vale só dentro de um processo. OfflineRAG, AzureRAG e VoiceServer
+rodando como processos separados no mesmo host têm cada um o seu agendador, e
+o Ollama recebe até N × LLM_CONCORRENCIA gerações. Para vários agentes
+dividirem um Ollama, rode-os no mesmo processo (as sessões do VoiceServer já
+compartilham o agendador) ou limite também no servidor com OLLAMA_NUM_PARALLEL;
+nesse caso o excedente espera dentro do Ollama, sem prioridade nem prazo.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import Metrics
+
+# Gerações simultâneas no Ollama (0 = sem limite, como antes)
+CONCORRENCIA = int(os.getenv("LLM_CONCORRENCIA", "2"))
+# Espera máxima na fila antes da resposta pronta
+PRAZO_S = float(os.getenv("LLM_PRAZO_MS", "4000")) / 1000
+JANELA = 200
+
+# Menor número passa na frente
+URGENTE = 0  # continuação curta de uma conversa em andamento
+NORMAL = 1  # primeira pergunta ou pergunta longa
+FUNDO = 2  # resumos do histórico
+NOMES = {URGENTE: "urgente", NORMAL: "normal", FUNDO: "fundo"}
+PALAVRAS_CURTA = 8
+
+RESPOSTA_OCUPADA = "Estou atendendo muitas perguntas agora. Pode repetir daqui a pouquinho?"
+
+
+class PrazoEsgotado(Exception):
+    """O pedido não conseguiu vaga no LLM antes do prazo"""
+
+
+def prioridade_da_pergunta(pergunta, em_conversa):
+    """Continuações curtas de uma conversa passam na frente das demais perguntas"""
+    return URGENTE if em_conversa and len(pergunta.split()) <= PALAVRAS_CURTA else NORMAL
+
+
+class Pedido:
+    """Um lugar na fila do agendador; `concedido` abre quando a vaga sai"""
+
+    def __init__(self, prioridade, prazo, ordem, ao_conceder=None):
+        self.prioridade = prioridade
+        self.prazo = prazo
+        self.ordem = ordem
+        self.chegada = time.perf_counter()
+        self.concedido = threading.Event()
+        self.ao_conceder = ao_conceder
+        self.desistiu = False
+
+    def __lt__(self, outro):
+        return (self.prioridade, self.prazo, self.ordem) < (outro.prioridade, outro.prazo, outro.ordem)
+
+
+class AgendadorLLM:
+    """Controle de admissão das gerações: limite de concorrência, prioridade e prazo"""
+
+    def __init__(self, concorrencia=CONCORRENCIA, prazo_s=PRAZO_S):
+        self.concorrencia = concorrencia or math.inf
+        self.prazo_s = prazo_s
+        self.em_geracao = 0
+        self.fila = []
+        self.esperando = Counter()
+        self.ordem = itertools.count()
+        self.esperas = {prioridade: deque(maxlen=JANELA) for prioridade in NOMES}
+        self.atendidos = Counter()
+        self.expirados = Counter()
+        self.lock = threading.Lock()
+
+    def entrar(self, prioridade=NORMAL, prazo_s=None, ao_conceder=None):
+        """Entra na fila (ou já recebe a vaga); `prazo_s` None usa o padrão, math.inf espera sempre"""
+        prazo_s = self.prazo_s if prazo_s is None else prazo_s
+        with self.lock:
+            pedido = Pedido(prioridade, time.perf_counter() + prazo_s, next(self.ordem), ao_conceder)
+            if self.em_geracao < self.concorrencia and not sum(self.esperando.values()):
+                self.conceder(pedido)
+            else:
+                heapq.heappush(self.fila, pedido)
+                self.esperando[prioridade] += 1
+            self.publicar()
+        return pedido
+
+    def conceder(self, pedido):
+        # Chamado com o lock
+        self.em_geracao += 1
+        espera = time.perf_counter() - pedido.chegada
+        self.esperas[pedido.prioridade].append(espera)
+        self.atendidos[pedido.prioridade] += 1
+        Metrics.observar_espera_llm(NOMES[pedido.prioridade], espera)
+        pedido.concedido.set()
+        if pedido.ao_conceder:
+            pedido.ao_conceder()
+
+    def desistir(self, pedido):
+        """Tira da fila quem estourou o prazo; devolve False se a vaga saiu nesse meio-tempo"""
+        with self.lock:
+            if pedido.concedido.is_set():
+                return False
+            if not pedido.desistiu:
+                # Fica no heap marcado; sai quando chegar ao topo
+                pedido.desistiu = True
+                self.esperando[pedido.prioridade] -= 1
+            self.publicar()
+        return True
+
+    def sair(self, pedido):
+        """Devolve a vaga de um pedido atendido e a passa ao próximo da fila ainda no prazo"""
+        with self.lock:
+            self.em_geracao -= 1
+            agora = time.perf_counter()
+            while self.fila and self.em_geracao < self.concorrencia:
+                proximo = heapq.heappop(self.fila)
+                if proximo.desistiu:
+                    continue
+                self.esperando[proximo.prioridade] -= 1
+                if proximo.prazo <= agora:
+                    # Vencido: quem espera acorda pelo prazo e responde com a frase pronta
+                    proximo.desistiu = True
+                    continue
+                self.conceder(proximo)
+            self.publicar()
+
+    def admitir(self, prioridade=NORMAL, prazo_s=None):
+        """Bloqueia até a vaga; PrazoEsgotado se o prazo passar antes"""
+        pedido = self.entrar(prioridade, prazo_s)
+        if not pedido.concedido.wait(self.restante(pedido)) and self.desistir(pedido):
+            self.expirar(pedido)
+        return pedido
+
+    async def admitir_async(self, prioridade=NORMAL, prazo_s=None):
+        """Versão asyncio de `admitir`; se a tarefa for cancelada na fila, o lugar é liberado"""
+        loop = asyncio.get_running_loop()
+        liberado = asyncio.Event()
+        pedido = self.entrar(prioridade, prazo_s, ao_conceder=lambda: loop.call_soon_threadsafe(liberado.set))
+        try:
+            await asyncio.wait_for(liberado.wait(), self.restante(pedido))
+        except asyncio.TimeoutError:
+            if self.desistir(pedido):
+                self.expirar(pedido)
+        except asyncio.CancelledError:
+            # Barge-in enquanto esperava: a vaga, se já saiu, volta para a fila
+            if not self.desistir(pedido):
+                self.sair(pedido)
+            raise
+        return pedido
+
+    @staticmethod
+    def restante(pedido):
+        """Segundos até o prazo (None para quem espera sem prazo)"""
+        return None if math.isinf(pedido.prazo) else max(0.0, pedido.prazo - time.perf_counter())
+
+    def expirar(self, pedido):
+        self.expirados[pedido.prioridade] += 1
+        Metrics.observar_expirado_llm(NOMES[pedido.prioridade])
+        raise PrazoEsgotado(f"sem vaga no LLM em {self.prazo_ms(pedido):.0f} ms")
+
+    @staticmethod
+    def prazo_ms(pedido):
+        return (pedido.prazo - pedido.chegada) * 1000
+
+    def publicar(self):
+        # Chamado com o lock
+        Metrics.observar_fila_llm({NOMES[p]: self.esperando[p] for p in NOMES}, self.em_geracao)
+
+    def relatorio(self):
+        """Ocupação, fila e espera por prioridade"""
+        with self.lock:
+            limite = "sem limite" if self.concorrencia == math.inf else self.concorrencia
+            linhas = [f"Agendador LLM: {self.em_geracao} em geração (limite {limite}), "
+                      f"{sum(self.esperando.values())} na fila"]
+            for prioridade, nome in NOMES.items():
+                esperas = sorted(self.esperas[prioridade])
+                if not esperas and not self.expirados[prioridade]:
+                    continue
+                espera = (f"espera p50 {esperas[int(0.5 * (len(esperas) - 1))] * 1000:.0f} ms, "
+                          f"p90 {esperas[int(0.9 * (len(esperas) - 1))] * 1000:.0f} ms") if esperas else "-"
+                linhas.append(f"  {nome:<8}{self.atendidos[prioridade]:5d} atendidos "
+                              f"{self.expirados[prioridade]:4d} expirados  {espera}")
+        return "\n".join(linhas)
+
+
+class ClienteAgendado:
+    """LLMClient cujos pedidos sem stream passam pelo agendador (resumos do histórico)"""
+
+    def __init__(self, cliente, agendador, prioridade=FUNDO, prazo_s=math.inf):
+        self.cliente = cliente
+        self.agendador = agendador
+        self.prioridade = prioridade
+        self.prazo_s = prazo_s
+
+    def chat(self, messages, **opcoes):
+        pedido = self.agendador.admitir(self.prioridade, self.prazo_s)
+        try:
+            return self.cliente.chat(messages, **opcoes)
+        finally:
+            self.agendador.sair(pedido)
+
+
+# Um único agendador por processo: os agentes e sessões deste processo disputam as vagas.
+# Outros processos no mesmo Ollama não são contados (ver o docstring do módulo)
+AGENDADOR = AgendadorLLM()
@@ -0,0 +1,310 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ATIVAS = os.getenv("METRICAS", "0") == "1"
+LOG_JSON = os.getenv("METRICAS_LOG")  # arquivo JSONL com um registro por turno
+PORTA = int(os.getenv("METRICAS_PORTA", "0"))  # 0 = sem endpoint /metrics
+
+BUCKETS_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 8, 13, 20, 30)
+BUCKETS_TOKENS = (128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192)
+BUCKETS_MENSAGENS = (1, 2, 4, 6, 8, 12, 16, 24, 32, 64)
+
+# Etapas derivadas das marcas de tempo de cada turno: (nome, início, fim)
+ETAPAS = (
+    ("stt", "captura_inicio", "stt_final"),
+    ("preparo_prompt", "stt_final", "llm_enviado"),
+    ("primeiro_token", "llm_enviado", "primeiro_token"),
+    ("geracao", "primeiro_token", "ultimo_token"),
+    ("primeiro_audio", "stt_final", "tts_inicio"),
+    ("tts", "tts_inicio", "tts_fim"),
+    ("turno", "stt_final", "tts_fim"),
+    # Barge-in: da fala do usuário detectada até a ARI ficar em silêncio
+    ("parada_barge_in", "interrompido", "tts_fim"),
+)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus"""
+
+    def __init__(self, nome, ajuda, buckets, rotulo=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = tuple(buckets)
+        self.rotulo = rotulo
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observar(self, valor, rotulo=""):
+        with self.lock:
+            contagens, soma = self.series.get(rotulo, ([0] * (len(self.buckets) + 1), 0.0))
+            contagens[bisect.bisect_left(self.buckets, valor)] += 1
+            self.series[rotulo] = (contagens, soma + valor)
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self.lock:
+            for rotulo, (contagens, soma) in sorted(self.series.items()):
+                base = f'{self.rotulo}="{rotulo}",' if self.rotulo else ""
+                acumulado = 0
+                for limite, contagem in zip(self.buckets, contagens):
+                    acumulado += contagem
+                    linhas.append(f'{self.nome}_bucket{{{base}le="{limite}"}} {acumulado}')
+                acumulado += contagens[-1]
+                linhas.append(f'{self.nome}_bucket{{{base}le="+Inf"}} {acumulado}')
+                sufixo = f"{{{base.rstrip(',')}}}" if base else ""
+                linhas.append(f"{self.nome}_sum{sufixo} {soma}")
+                linhas.append(f"{self.nome}_count{sufixo} {acumulado}")
+        return "\n".join(linhas)
+
+
+class Counter:
+    """Contador monotônico com um rótulo opcional"""
+
+    def __init__(self, nome, ajuda, rotulo=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def incrementar(self, rotulo="", quantidade=1):
+        with self.lock:
+            self.valores[rotulo] = self.valores.get(rotulo, 0) + quantidade
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        with self.lock:
+            for rotulo, valor in sorted(self.valores.items()):
+                serie = f'{{{self.rotulo}="{rotulo}"}}' if self.rotulo else ""
+                linhas.append(f"{self.nome}{serie} {valor}")
+        return "\n".join(linhas)
+
+
+class Gauge:
+    """Valor instantâneo com um rótulo opcional"""
+
+    def __init__(self, nome, ajuda, rotulo=None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def definir(self, valor, rotulo=""):
+        with self.lock:
+            self.valores[rotulo] = valor
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} gauge"]
+        with self.lock:
+            for rotulo, valor in sorted(self.valores.items()):
+                serie = f'{{{self.rotulo}="{rotulo}"}}' if self.rotulo else ""
+                linhas.append(f"{self.nome}{serie} {valor}")
+        return "\n".join(linhas)
+
+
+ETAPA_SEGUNDOS = Histogram(
+    "ari_etapa_segundos", "Duração de cada etapa do turno de voz", BUCKETS_SEGUNDOS, rotulo="etapa"
+)
+PROMPT_TOKENS = Histogram("ari_prompt_tokens", "Tamanho estimado do prompt enviado ao LLM", BUCKETS_TOKENS)
+HISTORICO_MENSAGENS = Histogram(
+    "ari_historico_mensagens", "Mensagens no histórico a cada chamada ao LLM", BUCKETS_MENSAGENS
+)
+TURNOS = Counter("ari_turnos_total", "Turnos concluídos por agente", rotulo="agente")
+LLM_PRIMEIRO_TOKEN = Histogram(
+    "ari_llm_primeiro_token_segundos",
+    "Tempo até o primeiro token do Ollama, com o modelo frio (carregando) ou quente",
+    BUCKETS_SEGUNDOS,
+    rotulo="estado",
+)
+LLM_AQUECIMENTO = Histogram(
+    "ari_llm_aquecimento_segundos",
+    "Duração do pedido de aquecimento (carga do modelo e prefill do prompt de sistema)",
+    BUCKETS_SEGUNDOS,
+    rotulo="estado",
+)
+
+BACKEND_SEGUNDOS = Histogram(
+    "ari_backend_segundos",
+    "Atraso de cada backend de fala por operação (STT: fim da fala ao texto; TTS: frase ao áudio)",
+    BUCKETS_SEGUNDOS,
+    rotulo="backend",
+)
+BACKEND_FALHAS = Counter("ari_backend_falhas_total", "Falhas por backend de fala e operação", rotulo="backend")
+LLM_ROTEAMENTO = Counter(
+    "ari_llm_roteamento_total", "Perguntas por nível de modelo e motivo da escolha", rotulo="decisao"
+)
+LLM_NIVEL_PRIMEIRO_TOKEN = Histogram(
+    "ari_llm_nivel_primeiro_token_segundos",
+    "Tempo até o primeiro token por nível de modelo (rápido/forte), depois da vaga no agendador",
+    BUCKETS_SEGUNDOS,
+    rotulo="nivel",
+)
+
+LLM_FILA = Gauge("ari_llm_fila", "Pedidos esperando vaga no agendador do LLM", rotulo="prioridade")
+LLM_EM_GERACAO = Gauge("ari_llm_em_geracao", "Gerações em andamento admitidas pelo agendador")
+LLM_ESPERA = Histogram(
+    "ari_llm_espera_segundos", "Espera na fila do agendador até a vaga", BUCKETS_SEGUNDOS, rotulo="prioridade"
+)
+LLM_EXPIRADOS = Counter(
+    "ari_llm_expirados_total", "Pedidos sem vaga até o prazo, respondidos com a frase pronta", rotulo="prioridade"
+)
+
+REGISTRO = [
+    ETAPA_SEGUNDOS, PROMPT_TOKENS, HISTORICO_MENSAGENS, TURNOS, LLM_PRIMEIRO_TOKEN, LLM_AQUECIMENTO,
+    BACKEND_SEGUNDOS, BACKEND_FALHAS, LLM_ROTEAMENTO, LLM_NIVEL_PRIMEIRO_TOKEN,
+    LLM_FILA, LLM_EM_GERACAO, LLM_ESPERA, LLM_EXPIRADOS,
+]
+
+
+def exportar_prometheus():
+    """Todas as métricas no formato texto do Prometheus"""
+    return "\n".join(metrica.exportar() for metrica in REGISTRO) + "\n"
+
+
+def observar_primeiro_token(segundos, frio):
+    """Registra o tempo até o primeiro token de um pedido ao LLM"""
+    if ATIVAS and segundos is not None:
+        LLM_PRIMEIRO_TOKEN.observar(segundos, "frio" if frio else "quente")
+
+
+def observar_aquecimento(segundos, frio):
+    """Registra a duração de um aquecimento, fora do histograma de primeiro token"""
+    if ATIVAS:
+        LLM_AQUECIMENTO.observar(segundos, "frio" if frio else "quente")
+
+
+class Turno:
+    """Marcas de tempo e atributos de um turno (pergunta + resposta)"""
+
+    def __init__(self, agente):
+        self.agente = agente
+        self.inicio = time.time()
+        self.marcas = {}
+        self.atributos = {}
+
+    def marcar(self, evento):
+        """Registra o instante do evento; só a primeira marca de cada evento vale"""
+        self.marcas.setdefault(evento, time.perf_counter())
+
+    def anotar(self, **atributos):
+        self.atributos.update(atributos)
+
+    def finalizar(self):
+        """Alimenta os histogramas e, se configurado, grava o log JSON do turno"""
+        duracoes = {}
+        for etapa, de, ate in ETAPAS:
+            # Com especulação o LLM pode ser chamado antes do texto final: etapa sem duração
+            if de in self.marcas and ate in self.marcas and self.marcas[ate] >= self.marcas[de]:
+                duracoes[etapa] = self.marcas[ate] - self.marcas[de]
+                ETAPA_SEGUNDOS.observar(duracoes[etapa], etapa)
+        if "prompt_tokens" in self.atributos:
+            PROMPT_TOKENS.observar(self.atributos["prompt_tokens"])
+        if "historico_mensagens" in self.atributos:
+            HISTORICO_MENSAGENS.observar(self.atributos["historico_mensagens"])
+        TURNOS.incrementar(self.agente)
+
+        if LOG_JSON:
+            origem = self.marcas.get("captura_inicio", min(self.marcas.values(), default=0))
+            registro = {
+                "agente": self.agente,
+                "inicio": self.inicio,
+                "marcas_ms": {k: round((v - origem) * 1000, 1) for k, v in self.marcas.items()},
+                "duracoes_ms": {k: round(v * 1000, 1) for k, v in duracoes.items()},
+                **self.atributos,
+            }
+            with _lock_log:
+                with open(LOG_JSON, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class TurnoNulo:
+    """Usado com as métricas desligadas: todas as operações são no-op"""
+
+    def marcar(self, evento):
+        pass
+
+    def anotar(self, **atributos):
+        pass
+
+    def finalizar(self):
+        pass
+
+
+_lock_log = threading.Lock()
+_TURNO_NULO = TurnoNulo()
+_exportador = None
+
+
+def observar_backend(backend, operacao, segundos, ok):
+    """Registra uma chamada a um backend de fala (rótulo "azure_stt", "offline_tts"...)"""
+    if not ATIVAS:
+        return
+    rotulo = f"{backend}_{operacao}"
+    if not ok:
+        BACKEND_FALHAS.incrementar(rotulo)
+    elif segundos is not None:
+        BACKEND_SEGUNDOS.observar(segundos, rotulo)
+
+
+def observar_roteamento_llm(nivel, motivo):
+    if ATIVAS:
+        LLM_ROTEAMENTO.incrementar(f"{nivel}_{motivo}")
+
+
+def observar_nivel_llm(nivel, primeiro_token):
+    if ATIVAS and primeiro_token is not None:
+        LLM_NIVEL_PRIMEIRO_TOKEN.observar(primeiro_token, nivel)
+
+
+def observar_fila_llm(fila, em_geracao):
+    """Profundidade da fila por prioridade e gerações em andamento"""
+    if ATIVAS:
+        for prioridade, quantidade in fila.items():
+            LLM_FILA.definir(quantidade, prioridade)
+        LLM_EM_GERACAO.definir(em_geracao)
+
+
+def observar_espera_llm(prioridade, segundos):
+    if ATIVAS:
+        LLM_ESPERA.observar(segundos, prioridade)
+
+
+def observar_expirado_llm(prioridade):
+    if ATIVAS:
+        LLM_EXPIRADOS.incrementar(prioridade)
+
+
+def novo_turno(agente):
+    """Abre o registro de um turno (ou um no-op se METRICAS não estiver ligado)"""
+    return Turno(agente) if ATIVAS else _TURNO_NULO
+
+
+class _MetricasHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        corpo = exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_exportador(porta=PORTA):
+    """Sobe o endpoint /metrics em segundo plano (uma única vez por processo)"""
+    global _exportador
+    if not ATIVAS or not porta or _exportador:
+        return
+    _exportador = ThreadingHTTPServer(("0.0.0.0", porta), _MetricasHandler)
+    threading.Thread(target=_exportador.serve_forever, daemon=True).start()
+    print(f"\033[1;36mMétricas em http://0.0.0.0:{porta}/metrics\033[0m")
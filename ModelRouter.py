@@ -0,0 +1,216 @@
+"""Escolha do modelo local por pergunta: um modelo rápido e um mais forte.
+
+Perguntas curtas e bem cobertas pela base (FAQ) vão para o modelo rápido;
+perguntas longas, com comparação, justificativa ou planejamento, ou fora da
+base, vão para o forte. Se a estimativa de espera do modelo forte (tempo até o
+primeiro token vezes os pedidos já em andamento) estourar o orçamento do
+turno, a pergunta desce para o rápido.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+import Metrics
+from KnowledgeIndex import normalizar_texto
+from LLMClient import LLMClient
+from LLMScheduler import AGENDADOR, NORMAL, prioridade_da_pergunta
+
+# Desligado, cada agente usa só o seu modelo padrão, como antes. ROTEAMENTO_LLM=1 exige
+# os dois modelos baixados no Ollama e os mantém carregados (o dobro de memória)
+ATIVO = os.getenv("ROTEAMENTO_LLM", "0") == "1"
+MODELO_RAPIDO = os.getenv("LLM_RAPIDO", "gemma2:2b")
+MODELO_FORTE = os.getenv("LLM_FORTE", "llama3.2:latest")
+# Tempo máximo aceitável até o primeiro token do turno
+ORCAMENTO_S = float(os.getenv("LLM_ORCAMENTO_MS", "2500")) / 1000
+# Pontos a partir dos quais a pergunta vai para o modelo forte
+LIMIAR_FORTE = 2
+PALAVRAS_CURTA = 8
+PALAVRAS_LONGA = 16
+# Fração dos termos da pergunta presentes no melhor trecho da base
+COBERTURA_FAQ = 0.6
+COBERTURA_FORA = 0.3
+JANELA = 50
+
+RAPIDO = "rapido"
+FORTE = "forte"
+
+# Pedidos de raciocínio: comparação, justificativa, recomendação personalizada, planejamento
+MARCADORES_COMPLEXOS = re.compile(
+    r"\b(por que|porque|compar\w*|diferenc\w*|explic\w*|vale a pena|devo|deveria|melhor|pior|"
+    r"estrategi\w*|planej\w*|analis\w*|vantage\w*|desvantage\w*|se eu|simul\w*|calcul\w*|"
+    r"quanto (?:eu )?(?:devo|preciso)|o que fazer)\b"
+)
+# Perguntas de consulta direta
+MARCADORES_SIMPLES = re.compile(r"^(o que e|onde|quando|quem|qual (?:e|o|a)|como (?:acesso|acessar|entro|entrar))\b")
+
+
+class Rota(namedtuple("Rota", "nivel motivo modelo prioridade")):
+    """Decisão de `RoteadorModelos.rotear` para uma pergunta"""
+
+    def __str__(self):
+        return f"{self.modelo} ({self.nivel}: {self.motivo})"
+
+
+class RoteadorModelos:
+    """Classifica a pergunta, aplica o orçamento de latência e mede cada modelo"""
+
+    def __init__(self, prompt_sistema, padrao=MODELO_RAPIDO, rapido=MODELO_RAPIDO, forte=MODELO_FORTE,
+                 orcamento_s=ORCAMENTO_S, ativo=ATIVO, agendador=AGENDADOR):
+        if not ativo:
+            rapido = forte = padrao
+        self.ativo = ativo
+        self.modelos = {RAPIDO: rapido, FORTE: forte}
+        # Um cliente (pool, keep_alive, aquecimento) por modelo distinto
+        clientes = {}
+        self.clientes = {
+            nivel: clientes.setdefault(modelo, LLMClient(modelo, prompt_sistema))
+            for nivel, modelo in self.modelos.items()
+        }
+        self.orcamento_s = orcamento_s
+        # Vagas de geração compartilhadas com os outros agentes do processo
+        self.agendador = agendador
+        self.em_andamento = Counter()
+        self.primeiro_token = {nivel: deque(maxlen=JANELA) for nivel in self.modelos}
+        self.total = {nivel: deque(maxlen=JANELA) for nivel in self.modelos}
+        self.decisoes = Counter()
+        self.perguntas = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def classificar(pergunta, cobertura):
+        """Nível sugerido pelas características da pergunta e os motivos"""
+        texto = normalizar_texto(pergunta)
+        palavras = len(texto.split())
+        pontos, motivos = 0, []
+        if palavras > PALAVRAS_LONGA:
+            pontos += 2
+            motivos.append("longa")
+        elif palavras <= PALAVRAS_CURTA:
+            pontos -= 1
+            motivos.append("curta")
+        complexos = MARCADORES_COMPLEXOS.findall(texto)
+        if complexos:
+            pontos += 2 * min(len(complexos), 2)
+            motivos.append("raciocinio")
+        if MARCADORES_SIMPLES.search(texto):
+            pontos -= 1
+            motivos.append("consulta")
+        if cobertura >= COBERTURA_FAQ:
+            pontos -= 1
+            motivos.append("faq")
+        elif cobertura < COBERTURA_FORA:
+            pontos += 1
+            motivos.append("fora_da_base")
+        return (FORTE if pontos >= LIMIAR_FORTE else RAPIDO), "+".join(motivos) or "neutra"
+
+    def estimar(self, nivel):
+        """Espera prevista até o primeiro token: a mediana recente vezes a fila do modelo"""
+        with self.lock:
+            amostras = sorted(self.primeiro_token[nivel])
+            if not amostras:
+                return None
+            return amostras[len(amostras) // 2] * (1 + self.em_andamento[nivel])
+
+    def escolher(self, pergunta, cobertura):
+        """Nível e motivo para a pergunta; registra a decisão nas estatísticas"""
+        if not self.ativo:
+            nivel, motivo = RAPIDO, "desligado"
+        else:
+            nivel, motivo = self.classificar(pergunta, cobertura)
+            estimativa = self.estimar(FORTE) if nivel == FORTE else None
+            if estimativa is not None and estimativa > self.orcamento_s:
+                # Sob carga o modelo forte não cabe no orçamento: responde rápido
+                nivel, motivo = RAPIDO, f"orcamento ({estimativa * 1000:.0f} ms)"
+        with self.lock:
+            self.decisoes[(nivel, motivo.split(" ")[0])] += 1
+            self.perguntas += 1
+        Metrics.observar_roteamento_llm(nivel, motivo.split(" ")[0])
+        return nivel, motivo
+
+    def rotear(self, pergunta, cobertura, em_conversa):
+        """Modelo e prioridade no agendador para a pergunta (a mesma decisão em todos os agentes)"""
+        nivel, motivo = self.escolher(pergunta, cobertura)
+        return Rota(nivel, motivo, self.modelos[nivel], prioridade_da_pergunta(pergunta, em_conversa))
+
+    def iniciar(self, nivel):
+        """Marca um pedido em andamento no nível (entra na estimativa de fila)"""
+        with self.lock:
+            self.em_andamento[nivel] += 1
+        return time.perf_counter()
+
+    def terminar(self, nivel, inicio, primeiro_token=None):
+        """Fecha um pedido iniciado com `iniciar`, registrando as latências"""
+        total = time.perf_counter() - inicio
+        with self.lock:
+            self.em_andamento[nivel] -= 1
+            if primeiro_token is not None:
+                self.primeiro_token[nivel].append(primeiro_token)
+                self.total[nivel].append(total)
+        Metrics.observar_nivel_llm(nivel, primeiro_token)
+
+    def chat(self, nivel, mensagens, prioridade=NORMAL):
+        """Stream do modelo do nível, contado como em andamento até terminar ou ser fechado
+
+        A vaga no agendador é pedida na primeira iteração (como o pedido HTTP do
+        ollama): um stream descartado sem ser lido não ocupa vaga. Sem vaga até
+        o prazo, a primeira iteração levanta PrazoEsgotado.
+        """
+        pedido = self.agendador.admitir(prioridade)
+        inicio = self.iniciar(nivel)
+        primeiro_token = None
+        stream = None
+        try:
+            stream = self.clientes[nivel].chat(mensagens, stream=True)
+            for pedaco in stream:
+                if primeiro_token is None:
+                    primeiro_token = time.perf_counter() - inicio
+                yield pedaco
+        finally:
+            if stream is not None:
+                stream.close()
+            self.terminar(nivel, inicio, primeiro_token)
+            self.agendador.sair(pedido)
+
+    async def chat_async(self, nivel, mensagens, prioridade=NORMAL):
+        """Versão asyncio de `chat`: mesma vaga no agendador e mesmas medidas
+
+        Se a tarefa for cancelada na fila ou no meio do stream, a vaga é devolvida
+        e o pedido ao Ollama, fechado.
+        """
+        pedido = await self.agendador.admitir_async(prioridade)
+        inicio = self.iniciar(nivel)
+        primeiro_token = None
+        stream = None
+        try:
+            stream = self.clientes[nivel].chat_async(mensagens)
+            async for pedaco in stream:
+                if primeiro_token is None:
+                    primeiro_token = time.perf_counter() - inicio
+                yield pedaco
+        finally:
+            if stream is not None:
+                await stream.aclose()
+            self.terminar(nivel, inicio, primeiro_token)
+            self.agendador.sair(pedido)
+
+    def manter_quente(self):
+        """Aquece os modelos distintos e os mantém carregados"""
+        for cliente in {id(c): c for c in self.clientes.values()}.values():
+            cliente.manter_quente()
+
+    def relatorio(self):
+        """Decisões por nível e motivo e latências recentes de cada modelo"""
+        linhas = ["Roteamento de modelos:"]
+        with self.lock:
+            for nivel, modelo in self.modelos.items():
+                primeiros = sorted(self.primeiro_token[nivel])
+                totais = sorted(self.total[nivel])
+                decisoes = sum(n for (n_nivel, _), n in self.decisoes.items() if n_nivel == nivel)
+                latencia = (f"1º token p50 {primeiros[len(primeiros) // 2] * 1000:.0f} ms, "
+                            f"total p50 {totais[len(totais) // 2] * 1000:.0f} ms") if primeiros else "sem amostras"
+                linhas.append(f"  {nivel:<7}{modelo:<18}{decisoes:4d} perguntas  {latencia}")
+            for (nivel, motivo), n in self.decisoes.most_common():
+                linhas.append(f"    {nivel:<7}{motivo:<32}{n:4d}")
+        return "\n".join(linhas + [self.agendador.relatorio()])
@@ -4,66 +4,127 @@ import time
 from vosk import Model, KaldiRecognizer  # STT
 import pyaudio
 import pyttsx3  # TTS
-import ollama
+from KnowledgeIndex import KnowledgeIndex  # Recuperação de trechos da base
+from ConversationMemory import ConversationMemory, resumidor_ollama
+from StreamingTTS import SpeechQueue, falar_stream  # Fala frase a frase
+from Endpointing import EndpointDetector, SpeculativeGeneration, FINAL, ESPECULAR
+from AnswerCache import AnswerCache, versao_conteudo  # Respostas de perguntas repetidas
+from AudioCache import AudioCache, chave_audio, tocar_wav, DIRETORIO as DIRETORIO_AUDIO  # Áudio já sintetizado
+import Metrics  # Latência por etapa (METRICAS=1)
+from ModelRouter import RoteadorModelos, RAPIDO  # Modelo rápido ou forte conforme a pergunta
+from LLMScheduler import ClienteAgendado, PrazoEsgotado, RESPOSTA_OCUPADA  # Vagas no Ollama com prioridade e prazo
+from Startup import Adiado, Inicializacao  # Componentes sobem em paralelo
+from VoiceActivity import VADGate, VAD_ATIVO  # Só decodifica trechos com fala
+from AudioCapture import CallbackCapture, CAPTURA  # Microfone sempre gravando
+from BargeIn import BargeInMonitor, BARGE_IN  # Usuário pode interromper a resposta
+from DomainGrammar import RecognizerDominio, gramatica_da_base, GRAMATICA_ATIVA  # Vocabulário da base
 from dotenv import load_dotenv
 import os
+import platform
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Configurações iniciais
 load_dotenv()
 
-BASE_DE_CONHECIMENTO = """
-O que é a ARI:
-A ARI Área de Recomendações Inteligentes é uma solução inovadora do Banco do Brasil que utiliza Inteligência Artificial Generativa e Analytics para fornecer recomendações personalizadas e insights valiosos para empresas.
-Como funciona a ARI: 
-A ARI transforma dados financeiros brutos (extratos, saldos, transações e fluxo de caixa) em dicas práticas e personalizadas, auxiliando empreendedores na gestão financeira e operacional de seus negócios.
-Público alvo da ARI:
-A ARI foi projetada inicialmente para empresas clientes do Banco do Brasil, mas em breve atenderá pessoas físicas também. 
-A solução é ideal para negócios que buscam otimizar a gestão financeira, aumentar a eficiência operacional e tomar decisões mais informadas com base em dados.
-Como funciona a ARI:
-A ARI utiliza dados brutos de extratos bancários, saldos, créditos, investimentos e transações para criar recomendações únicas para cada cliente. Algoritmos de IA generativa processam esses dados, que passam por curadoria humana para garantir segurança, qualidade e relevância das sugestões.
-Quais os tipos de recomendações oferecidas pela ARI:
-* Desempenho Financeiro: Melhorar fluxo de caixa, reduzir custos e otimizar recursos.
-* Segmentação e Comportamento dos Clientes: Insights sobre padrões de consumo e tendências sazonais.
-* Soluções de Crédito e Financeiro: Ofertas personalizadas de crédito (antecipação de recebíveis e linhas de capital de giro).
-* Eficiência Operacional: Otimizar processos internos e melhorar a produtividade.
-* Recomendações Estratégicas: Orientações para crescimento sustentável e expansão de mercado.
-* Relacionamento: Melhoria na interação com clientes e fornecedores.
-* Marketing e Posicionamento de Mercado: Estratégias para aumentar vendas e atrair novos clientes.
-* Educação Financeira Empreendedora: Capacitação e orientações práticas para melhorar a gestão financeira.
-Principais Funcionalidades:
-* Análise de Comportamento de Clientes: Insights sobre o comportamento de compra (número de clientes recorrentes no PIX, melhor dia de vendas), análise do ticket médio e sugestões para aumentá-lo.
-* Apoio em Datas Comemorativas e Sazonalidades: Recomendações específicas para períodos de alta demanda (feriados e datas comemorativas) para auxiliar no preparo para picos de vendas.
-* Educação Financeira: Dicas práticas e orientações sobre produtos financeiros para melhorar a compreensão das finanças e a tomada de decisões.
-* Integração com o Painel PJ: Recomendações disponibilizadas no Painel PJ (plataforma do Banco do Brasil que centraliza informações de pagamentos e recebimentos) para uma visão unificada das finanças.
-Exemplos de Recomendações:
-* Antecipação de Recebíveis: Converter vendas futuras em capital imediato.
-* Capital de Giro: Alertas para clientes utilizando o limite do cheque especial ou necessitando de crédito adicional.
-* Monitoramento de Transações: Análise detalhada de entradas e saídas de PIX, boletos e cartões.
-* Datas Comemorativas: Sugestões de marketing e promoções alinhadas a feriados e eventos sazonais.
-* Investimentos: Identificação de saldos ociosos que podem ser aplicados em produtos financeiros.
-* Alertas de Custos: Notificações sobre aumentos em contas fixas (água e luz) com dicas para economizar.
-* Open Finance: Incentivos para concentrar operações financeiras no Banco do Brasil, aproveitando benefícios exclusivos.
-Porque o Banco do Brasil criou a ARI:
-O Banco do Brasil desenvolveu a ARI para aproximar-se dos pequenos empreendedores, oferecer suporte personalizado e reforçar o compromisso com a educação financeira e a inovação tecnológica, posicionando-se como pioneiro no uso de IA generativa no mercado financeiro brasileiro.
-Como acessar a ARI:
-As recomendações da ARI estão disponíveis no Painel PJ (plataforma digital gratuita que consolida informações de vendas, recebimentos e fluxos de caixa). O acesso é destinado a clientes pessoa jurídica do Banco do Brasil que utilizam o Painel PJ via BB Digital PJ.
-Impactos da ARI:
-A ARI impacta a gestão e a tomada de decisões dos pequenos negócios, transformando dados em insights práticos, auxiliando os empreendedores a:
-* Melhorar a eficiência operacional.
-* Reduzir custos e otimizar recursos.
-* Aumentar vendas e atrair novos clientes.
-* Fortalecer a saúde financeira do negócio.
-A ARI promove mudanças sustentáveis na gestão financeira, contribuindo para o crescimento de longo prazo das micro e pequenas empresas.
-"""
+MODELO_LLM = "gemma2:2b"  # usado sozinho sem ROTEAMENTO_LLM=1
+# "vosk" espera o endpoint padrão do Vosk; "parcial" encerra pela estabilidade do parcial
+ENDPOINTING = os.getenv("ENDPOINTING", "vosk")
+ESPECULAR_LLM = os.getenv("ESPECULAR_LLM", "0") == "1"
+BLOCO_PARCIAL = 1600  # 100 ms de áudio por leitura no modo parcial
+
+RESPOSTA_ERRO = "Houve um problema ao processar sua solicitação"
+# Frases fixas pré-renderizadas no deploy com: python OfflineRAG.py --aquecer
+FRASES_FIXAS = [RESPOSTA_ERRO, RESPOSTA_OCUPADA]
+
+PROMPT_SISTEMA = """Você é a ARI - Área de Recomendações inteligêntes que apoia pequenos empreendedores na gestão do seu negócio!
+            Sua principal função é utilizar os trechos da base de conhecimento fornecidos junto de cada pergunta para responder às perguntas dos usuários da forma mais clara e concisa possível.
+            Responda em português do Brasil, seguindo estas regras:
+            1. Responda uma única vez de forma objetiva e com no máximo 300 caracteres.
+            2. Linguagem natural, sem termos técnicos.
+            3. Evite falar "Segundo a ARI".
+            4. Não leia as pontuações das frases ("," "." ":" ";" "?" "!")
+            4. Concentre-se em resolver problemas cotidianos dos empreendedores, usando exemplos da base de conhecimento sempre que possível."""
+
+# Voz do pyttsx3 escolhida na primeira execução, para não varrer todas as vozes a cada início
+VOZ_CACHE = os.path.join(DIRETORIO_AUDIO, "voz_tts.json")
+
+
+def ler_voz_em_cache():
+    """ID da voz salva nesta máquina, ou None"""
+    try:
+        with open(VOZ_CACHE, encoding="utf-8") as f:
+            salvo = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return salvo.get("voz") if salvo.get("maquina") == platform.platform() else None
+
+
+def gravar_voz_em_cache(voz):
+    os.makedirs(os.path.dirname(VOZ_CACHE) or ".", exist_ok=True)
+    with open(VOZ_CACHE, "w", encoding="utf-8") as f:
+        json.dump({"maquina": platform.platform(), "voz": voz}, f)
+
 
 class OfflineSpeechEngine:
-    def __init__(self):
+    # Componentes lentos sobem em threads; o primeiro acesso espera só o que faltar
+    model = Adiado()
+    recognizer = Adiado()
+    audio = Adiado()
+    captura = Adiado()
+    stream = Adiado()
+    tts = Adiado()
+
+    def __init__(self, microfone=True):
+        self.inicializacao = Inicializacao("offline")
         # Modelo Vosk atualizado para melhor desempenho
-        self.model = Model("model/pt-small-model")
-        self.recognizer = KaldiRecognizer(self.model, 16000)
-        # Configuração de áudio otimizada
-        self.audio = pyaudio.PyAudio()
-        self.stream = self.audio.open(
+        self.inicializacao.iniciar("model", lambda: Model("model/pt-small-model"))
+        self.inicializacao.iniciar("recognizer", self.criar_recognizer)
+        self.endpoint = EndpointDetector()
+        # Do último resultado: confiança média das palavras e instante da última voz (VAD)
+        self.confianca = None
+        self.ultima_voz = None
+        # Silêncio entre turnos não passa pelo decodificador
+        self.vad = VADGate() if VAD_ATIVO else None
+        if microfone:
+            # Configuração de áudio otimizada
+            self.inicializacao.iniciar("audio", pyaudio.PyAudio)
+            self.inicializacao.iniciar("captura", self.abrir_captura)
+            self.inicializacao.iniciar("stream", lambda: self.captura or self.abrir_stream())
+        else:
+            # Sem microfone (servidor, aquecimento) o motor só fornece o modelo e o TTS
+            self.inicializacao.adiar("audio", pyaudio.PyAudio)
+            self.captura = self.stream = None
+        # O pyttsx3 não é thread-safe (e o driver SAPI5/COM fica preso ao apartment em que
+        # nasceu): o motor é criado e usado sempre na mesma thread
+        self.thread_tts = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+        self.voz_tts = None
+        self.inicializacao.iniciar("tts", lambda: self.thread_tts.submit(self.iniciar_tts).result())
+        self.cache_audio = AudioCache()
+        # Frases são faladas por uma thread enquanto o LLM ainda gera o resto
+        self.fila_fala = SpeechQueue(self.sintetizar_voz)
+        self.vigia = None
+
+    def criar_recognizer(self):
+        if GRAMATICA_ATIVA:
+            gramatica, faltando = gramatica_da_base(self.model)
+            if faltando:
+                print(f"\033[2mGramática: {len(faltando)} palavra(s) da base fora do modelo "
+                      f"({', '.join(faltando[:8])})\033[0m")
+            recognizer = RecognizerDominio(self.model, gramatica)
+        else:
+            recognizer = KaldiRecognizer(self.model, 16000)
+        # Palavras com confiança no resultado: usadas para decidir entre backends
+        recognizer.SetWords(True)
+        return recognizer
+
+    def abrir_captura(self):
+        """Grava continuamente (CAPTURA=callback), inclusive durante o LLM e o TTS"""
+        return CallbackCapture(self.audio) if CAPTURA == "callback" else None
+
+    def abrir_stream(self):
+        return self.audio.open(
             format=pyaudio.paInt16,
             channels=1,
             rate=16000,
@@ -72,19 +133,55 @@ class OfflineSpeechEngine:
             input_device_index=None,
             stream_callback=None
         )
-        # Configuração TTS original mantida
-        self.tts = pyttsx3.init()
-        self.configurar_voz()
 
-    def configurar_voz(self):
+    def iniciar_tts(self):
+        tts = pyttsx3.init()
+        self.configurar_voz(tts)
+        # Lidas aqui, na thread do motor: a chave do cache de áudio não precisa passar por ela
+        self.voz_tts = (tts.getProperty('voice'), tts.getProperty('rate'), tts.getProperty('volume'))
+        return tts
+
+    def no_tts(self, funcao, *args):
+        """Roda `funcao(tts, *args)` na thread dona do pyttsx3 e devolve o resultado"""
+        tts = self.tts  # espera a criação do motor
+        return self.thread_tts.submit(funcao, tts, *args).result()
+
+    @staticmethod
+    def gravar_fala(tts, texto, arquivo):
+        tts.save_to_file(texto, arquivo)
+        tts.runAndWait()
+
+    def configurar_voz(self, tts):
         """Configura propriedades da voz sintetizada"""
-        self.tts.setProperty('rate', 195)  # Velocidade da fala
-        self.tts.setProperty('volume', 1.0)  # Volume da fala
-        for voz in self.tts.getProperty('voices'):
+        tts.setProperty('rate', 195)  # Velocidade da fala
+        tts.setProperty('volume', 1.0)  # Volume da fala
+        voz_salva = ler_voz_em_cache()
+        if voz_salva:
+            try:
+                tts.setProperty('voice', voz_salva)
+                return
+            except Exception:
+                pass  # Voz removida do sistema: procura de novo
+        for voz in tts.getProperty('voices'):
             if 'portugues' in voz.id.lower():
-                self.tts.setProperty('voice', voz.id)
+                tts.setProperty('voice', voz.id)
+                gravar_voz_em_cache(voz.id)
                 break
 
+    def aguardar_microfone(self):
+        """Espera o microfone abrir; com a captura em callback o áudio já fica guardado
+        enquanto o modelo Vosk e o TTS terminam de carregar"""
+        self.inicializacao.aguardar("stream")
+        return time.perf_counter()
+
+    def relatar_inicializacao(self, pronto):
+        """Espera as etapas restantes e mostra quanto cada uma levou"""
+        try:
+            self.inicializacao.aguardar()
+        except Exception as e:
+            print(f"\033[1;31mFalha na inicialização: {str(e)}\033[0m")
+        print(f"\033[2m{self.inicializacao.relatorio(pronto)}\033[0m")
+
     def processar_pontuacao(self, texto):
         """
         Insere pausas no texto com base nas pontuações.
@@ -106,101 +203,352 @@ class OfflineSpeechEngine:
 
         return texto
     
-    def capturar_audio(self):
-        """Captura áudio com tratamento de overflow aprimorado"""
+    def capturar_audio(self, ao_parcial_estavel=None, parar=None):
+        """Captura áudio com tratamento de overflow aprimorado
+
+        Com `parar` (threading.Event) a escuta pode ser abandonada de fora,
+        por exemplo quando outro backend de STT respondeu antes; devolve None.
+        """
         print("\033[1;33mPergunte sobre a ARI...\033[0m")
+        if self.captura:
+            # O que foi gravado durante a resposta anterior fica de fora, exceto o final
+            self.captura.iniciar_escuta()
+        if self.vad:
+            self.vad.reiniciar()
+        self.ultima_voz = None
+        if ENDPOINTING == "parcial":
+            return self.capturar_com_parciais(ao_parcial_estavel, parar)
         while True:
+            if parar is not None and parar.is_set():
+                return self.abandonar_escuta()
             dados = self.stream.read(4096, exception_on_overflow=False)
-            if self.recognizer.AcceptWaveform(dados):
-                resultado = json.loads(self.recognizer.Result())
-                texto = resultado.get('text', '').strip()
-                return self.limpar_transcricao(texto)
+            final, fim_fala = self.decodificar(dados)
+            if final:
+                return self.limpar_transcricao(self.ler_texto(self.recognizer.Result()))
+            if fim_fala:
+                # O VAD fechou a fala antes do Vosk; ruído curto não vira pergunta
+                texto = self.ler_texto(self.recognizer.FinalResult())
+                if texto:
+                    return self.limpar_transcricao(texto)
+
+    def ler_texto(self, bruto):
+        """Texto de um resultado do Vosk; guarda a confiança média das palavras"""
+        resultado = json.loads(bruto)
+        palavras = resultado.get('result') or []
+        self.confianca = sum(p['conf'] for p in palavras) / len(palavras) if palavras else None
+        return resultado.get('text', '').strip()
+
+    def abandonar_escuta(self):
+        """Descarta a fala em andamento para a próxima escuta começar limpa"""
+        self.recognizer.Reset()
+        return None
+
+    def atraso_final(self):
+        """Segundos entre a última voz detectada pelo VAD e agora (None sem VAD)"""
+        return time.perf_counter() - self.ultima_voz if self.ultima_voz else None
+
+    def vigiar_interrupcao(self, ao_detectar):
+        """Durante a resposta, chama `ao_detectar` se o usuário começar a falar
+
+        Só funciona com a captura em callback, que continua gravando enquanto
+        a ARI fala; devolve False se o barge-in não estiver disponível.
+        """
+        if not BARGE_IN or not self.captura:
+            return False
+        if self.vigia is None:
+            self.vigia = BargeInMonitor(self.captura)
+        self.vigia.iniciar(ao_detectar, self.vad.ruido_db if self.vad else None)
+        return True
+
+    def parar_vigia(self):
+        if self.vigia:
+            self.vigia.parar()
+
+    def decodificar(self, dados):
+        """Passa o bloco pelo VAD e só a fala pelo Vosk; devolve (resultado_final, fim_da_fala)"""
+        if not self.vad:
+            return self.recognizer.AcceptWaveform(dados), False
+        fala, fim_fala = self.vad.filtrar(dados)
+        if not fala:
+            return False, fim_fala
+        if self.vad.em_fala and self.vad.silencio_seguido == 0:
+            self.ultima_voz = time.perf_counter()
+        inicio = time.process_time()
+        final = self.recognizer.AcceptWaveform(fala)
+        self.vad.contabilizar(len(fala), time.process_time() - inicio)
+        return final, fim_fala
+
+    def relatorio_captura(self):
+        """Mostra perdas e ocupação do buffer de captura e a CPU economizada pelo VAD"""
+        if self.captura:
+            c = self.captura.estatisticas()
+            print(f"\033[2mCaptura: pico de {c['pico_s']:.1f}/{c['capacidade_s']:.0f} s no buffer, "
+                  f"{c['quadros_descartados']} quadros descartados, {c['overflows']} overflows\033[0m")
+        if self.vad:
+            r = self.vad.relatorio()
+            print(f"\033[2mVAD: {r['ignorado_s']:.0f} de {r['audio_s']:.0f} s de áudio ignorados, "
+                  f"~{r['cpu_economizada_s']:.1f} s de CPU economizados "
+                  f"(VAD {r['cpu_vad_s']:.2f} s, Vosk {r['cpu_decodificacao_s']:.1f} s)\033[0m")
+        if isinstance(self.recognizer, RecognizerDominio):
+            print(f"\033[2m{self.recognizer.relatorio()}\033[0m")
 
-    def limpar_transcricao(self, texto):
+    def capturar_com_parciais(self, ao_parcial_estavel=None, parar=None):
+        """Encerra a fala quando o parcial fica estável, sem esperar o silêncio do Vosk"""
+        self.endpoint.reiniciar()
+        tempo, parcial = 0.0, ""
+        while True:
+            if parar is not None and parar.is_set():
+                return self.abandonar_escuta()
+            dados = self.stream.read(BLOCO_PARCIAL, exception_on_overflow=False)
+            tempo += BLOCO_PARCIAL / 16000
+            final, fim_fala = self.decodificar(dados)
+            if final:
+                return self.limpar_transcricao(self.ler_texto(self.recognizer.Result()))
+
+            # Sem áudio novo o parcial não muda e não precisa ser consultado
+            if not self.vad or self.vad.em_fala or fim_fala:
+                parcial = json.loads(self.recognizer.PartialResult()).get('partial', '').strip()
+            evento = self.endpoint.alimentar(parcial, tempo)
+            if evento == FINAL or (fim_fala and parcial):
+                return self.limpar_transcricao(self.ler_texto(self.recognizer.FinalResult()))
+            if evento == ESPECULAR and ao_parcial_estavel:
+                ao_parcial_estavel(self.limpar_transcricao(parcial))
+
+    @staticmethod
+    def limpar_transcricao(texto):
         """Remove artefatos comuns em transcrições"""
         return re.sub(r'\b(uhm|ah|hum)\b', '', texto, flags=re.IGNORECASE)
 
     def sintetizar_voz(self, texto):
         """Sintetiza o texto com pausas adicionadas"""
         try:
-            # Processa o texto para adicionar pausas
-            texto_com_pausas = self.processar_pontuacao(texto)
-
-            # Limpa caracteres especiais desnecessários
-            texto_limpo = re.sub(r'[^\w\sà-úÀ-Ú.,!?;:]', '', texto_com_pausas)
-
-            # Sintetiza o texto com pausas
-            self.tts.say(texto_limpo)
-            self.tts.runAndWait()
+            dados = self.renderizar_voz(texto)
+            self.tocar(dados, self.fila_fala.interrompido)
         except Exception as e:
             print(f"\033[1;31mErro na síntese: {str(e)}\033[0m")
+
+    def tocar(self, dados, parar):
+        """Reproduz a fala e marca no buffer de captura onde ela terminou"""
+        vigia = self.vigia
+        if vigia:
+            # O vigia de barge-in compara o microfone com o eco da ARI enquanto ela fala
+            vigia.tocando = True
+        try:
+            # Barge-in: a reprodução para no próximo bloco se o usuário interromper
+            completa = tocar_wav(self.audio, dados, parar)
+        finally:
+            if vigia:
+                vigia.tocando = False
+        if completa and self.captura:
+            # Interrompida, o usuário já está falando: aí o áudio retido é o começo da fala dele
+            self.captura.marcar_fim_reproducao()
+
+    def renderizar_voz(self, texto):
+        """Renderiza o texto em WAV, reaproveitando o cache de áudio em disco"""
+        # Processa o texto para adicionar pausas
+        texto_com_pausas = self.processar_pontuacao(texto)
+
+        # Limpa caracteres especiais desnecessários
+        texto_limpo = re.sub(r'[^\w\sà-úÀ-Ú.,!?;:]', '', texto_com_pausas)
+
+        self.tts  # a voz configurada entra na chave
+        chave = chave_audio(texto_limpo, *self.voz_tts)
+        dados = self.cache_audio.ler(chave)
+        if dados is None:
+            temporario = self.cache_audio.temporario(chave)
+            self.no_tts(self.gravar_fala, texto_limpo, temporario)
+            dados = self.cache_audio.adotar(chave, temporario)
+        return dados
 class AssistenteVirtual:
-    def __init__(self):
-        self.engine = OfflineSpeechEngine()
-        self.historico = [
-            {"role": "system", "content": f"""Você é a ARI - Área de Recomendações inteligêntes que apoia pequenos empreendedores na gestão do seu negócio!
-            Sua principal função é utilizar a base de conhecimento {BASE_DE_CONHECIMENTO} fornecida para responder às perguntas dos usuários da forma mais clara e concisa possível.
-            Responda em português do Brasil, seguindo estas regras:
-            1. Responda uma única vez de forma objetiva e com no máximo 300 caracteres.
-            2. Linguagem natural, sem termos técnicos.
-            3. Evite falar "Segundo a ARI".
-            4. Não leia as pontuações das frases ("," "." ":" ";" "?" "!")
-            4. Concentre-se em resolver problemas cotidianos dos empreendedores, usando exemplos da base de conhecimento sempre que possível."""}
-        ]
+    def __init__(self, engine=None):
+        self.engine = engine or OfflineSpeechEngine()
+        self.indice = KnowledgeIndex.carregar()
+        # Clientes Ollama persistentes e aquecidos, um por modelo
+        self.modelos = RoteadorModelos(PROMPT_SISTEMA, padrao=MODELO_LLM)
+        self.historico = ConversationMemory(
+            PROMPT_SISTEMA,
+            # Resumos esperam na prioridade de fundo, sem prazo
+            resumir=resumidor_ollama(
+                self.modelos.modelos[RAPIDO],
+                ClienteAgendado(self.modelos.clientes[RAPIDO], self.modelos.agendador),
+            ),
+        )
+        self.especulacao = None
+        self.cache = AnswerCache()
+        self.turno = Metrics.novo_turno("offline")
+        self.interrompido = threading.Event()
+
+    def interromper(self):
+        """Chamado pelo vigia de barge-in: cala a ARI e corta a geração em andamento"""
+        self.interrompido.set()
+        self.engine.fila_fala.interromper()
+        self.turno.marcar("interrompido")
+        print("\n\033[1;33m(interrompida pelo usuário)\033[0m")
 
     def gerar_resposta(self, pergunta):
-        """Gera resposta usando modelo local Ollama"""
-        self.historico.append({"role": "user", "content": pergunta})
+        """Gera resposta usando modelo local Ollama, falando cada frase assim que fica pronta"""
+        especulacao, self.especulacao = self.especulacao, None
+
+        # A versão muda se a base em disco ou o prompt mudarem, invalidando o cache
+        self.indice = self.indice.recarregar_se_alterado()
+        versao = versao_conteudo(self.historico.sistema["content"], self.indice.texto)
+        resposta_cache = self.cache.buscar(pergunta, versao)
+        if resposta_cache:
+            if especulacao:
+                especulacao.cancelar()
+            return self.responder_do_cache(pergunta, resposta_cache)
 
         try:
-            resposta_stream = ollama.chat(
-                model="gemma2:2b",
-                messages=self.historico,
-                stream=True,
-            )
-
-            resposta_completa = []
-            for pedaco in resposta_stream:
-                conteudo = pedaco['message']['content']
-                resposta_completa.append(conteudo)
-                print(conteudo, end='', flush=True)
+            if especulacao and especulacao.confere(pergunta):
+                print("\033[2mGeração especulativa aproveitada\033[0m")
+                resposta_stream = especulacao.consumir()
+            else:
+                if especulacao:
+                    especulacao.cancelar()
+                resposta_stream = self.iniciar_stream(pergunta)
+            self.historico.adicionar("user", pergunta)
+
+            texto = falar_stream(resposta_stream, self.falar_trecho, self.interrompido, self.mostrar_pedaco)
+            if self.interrompido.is_set() and especulacao:
+                especulacao.cancelar()
+            self.turno.marcar("ultimo_token")
 
             print()  # Nova linha após o stream
-            resposta_final = self.limpar_resposta(''.join(resposta_completa))
-            self.historico.append({"role": "assistant", "content": resposta_final})
+            resposta_final = self.limpar_resposta(texto)
+            self.historico.adicionar("assistant", resposta_final)
+            if resposta_final and not self.interrompido.is_set():
+                self.cache.guardar(pergunta, resposta_final, versao)
             return resposta_final
 
+        except PrazoEsgotado as e:
+            # Ollama ocupado com outros agentes: resposta pronta agora em vez de uma atrasada
+            print(f"\033[1;33mLLM ocupado: {str(e)}\033[0m")
+            self.turno.anotar(prazo_esgotado=True)
+            self.falar(RESPOSTA_OCUPADA)
+            return RESPOSTA_OCUPADA
+
         except Exception as e:
             print(f"\033[1;31mErro no modelo: {str(e)}\033[0m")
-            return "Houve um problema ao processar sua solicitação"
+            self.falar(RESPOSTA_ERRO)
+            return RESPOSTA_ERRO
+
+    def mostrar_pedaco(self, conteudo):
+        self.turno.marcar("primeiro_token")
+        print(conteudo, end='', flush=True)
+
+    def responder_do_cache(self, pergunta, resposta):
+        """Fala uma resposta já conhecida sem chamar o Ollama"""
+        stats = self.cache.estatisticas()
+        print(f"\033[2mResposta em cache ({stats['acertos']} acertos, {stats['falhas']} falhas)\033[0m")
+        self.historico.adicionar("user", pergunta)
+        self.historico.adicionar("assistant", resposta)
+        self.turno.anotar(cache=True)
+        self.falar(resposta)
+        return resposta
+
+    def iniciar_stream(self, pergunta):
+        """Abre o stream do Ollama para a pergunta, sem gravá-la no histórico"""
+        mensagens = self.montar_mensagens(pergunta)
+        tokens = self.historico.tokens(mensagens)
+        print(f"\033[2mContexto: {tokens} tokens, "
+              f"{len(self.historico)} mensagens no histórico\033[0m")
+        rota = self.modelos.rotear(pergunta, self.indice.cobertura(pergunta), em_conversa=len(self.historico) > 0)
+        print(f"\033[2mModelo: {rota}\033[0m")
+        self.turno.anotar(prompt_tokens=tokens, historico_mensagens=len(self.historico), modelo=rota.nivel,
+                          prioridade=rota.prioridade)
+        self.turno.marcar("llm_enviado")
+        return self.modelos.chat(rota.nivel, mensagens, rota.prioridade)
+
+    def especular(self, parcial):
+        """Começa a gerar a partir de um parcial estável (ESPECULAR_LLM=1)"""
+        self.descartar_especulacao()
+        self.especulacao = SpeculativeGeneration(parcial, self.iniciar_stream)
+
+    def descartar_especulacao(self):
+        """Cancela a geração especulativa pendente, se houver"""
+        if self.especulacao:
+            self.especulacao.cancelar()
+            self.especulacao = None
+
+    def falar(self, texto):
+        """Envia o texto para a fila de fala, marcando no turno o início do TTS"""
+        turno = self.turno
+        self.engine.fila_fala.enfileirar(texto, lambda: turno.marcar("tts_inicio"))
+
+    def falar_trecho(self, frase):
+        """Aplica a limpeza da resposta na frase e a envia para a fila de fala"""
+        frase = self.limpar_resposta(frase)
+        if frase:
+            self.falar(frase)
+
+    def montar_mensagens(self, pergunta):
+        """Injeta apenas os trechos relevantes da base antes da pergunta atual"""
+        contexto = self.indice.contexto(pergunta)
+        if not contexto:
+            return self.historico.mensagens(pergunta=pergunta)
+        return self.historico.mensagens(f"Base de conhecimento relevante:\n{contexto}", pergunta=pergunta)
 
-    def limpar_resposta(self, texto):
+    @staticmethod
+    def limpar_resposta(texto):
         """Remove caracteres especiais e formatação indesejada"""
         texto_limpo = re.sub(r'[\*\_\[\]\(\)]', '', texto)
         return re.sub(r'\s+', ' ', texto_limpo).strip()
 
     def executar(self):
             """Loop principal de execução"""
+            Metrics.iniciar_exportador()
+            # Carrega o modelo e o prompt de sistema enquanto o microfone já escuta
+            threading.Thread(target=self.modelos.manter_quente, daemon=True).start()
+            pronto = self.engine.aguardar_microfone()
+            threading.Thread(target=self.engine.relatar_inicializacao, args=(pronto,), daemon=True).start()
             print("\033[1;36mSistema inicializado. Aguardando comandos...\033[0m")
             while True:
                 self.processar_comando()
-                time.sleep(0.5)
+                if not self.interrompido.is_set():
+                    time.sleep(0.5)
     
     def processar_comando(self):  # ★ Método obrigatório
+        self.turno = Metrics.novo_turno("offline")
         try:
-            pergunta = self.engine.capturar_audio()
+            self.turno.marcar("captura_inicio")
+            pergunta = self.engine.capturar_audio(self.especular if ESPECULAR_LLM else None)
+            self.turno.marcar("stt_final")
+            self.engine.relatorio_captura()
             if not pergunta:
+                self.descartar_especulacao()
                 return
 
             print(f"\033[1;34mUsuário:\033[0m {pergunta}")
-            resposta = self.gerar_resposta(pergunta)
+            self.interrompido.clear()
+            self.engine.fila_fala.nova_resposta()
+            self.engine.vigiar_interrupcao(self.interromper)
+            try:
+                resposta = self.gerar_resposta(pergunta)
+                # A resposta já está sendo falada; espera terminar (ou ser interrompida)
+                self.engine.fila_fala.aguardar()
+            finally:
+                self.engine.parar_vigia()
+            if self.interrompido.is_set():
+                # O histórico guarda só o que o usuário chegou a ouvir
+                resposta = " ".join(self.engine.fila_fala.faladas)
+                self.historico.corrigir_ultima("assistant", resposta)
             print(f"\033[1;32mARI:\033[0m {resposta}")
-            self.engine.sintetizar_voz(resposta)
+            self.turno.marcar("tts_fim")
+            self.turno.finalizar()
+            if self.modelos.perguntas and self.modelos.perguntas % 10 == 0:
+                print(f"\033[2m{self.modelos.relatorio()}\033[0m")
 
         except Exception as e:
             erro = f"Desculpe, ocorreu um erro: {str(e)}"
             print(f"\033[1;31mERRO:\033[0m {erro}")
-            self.engine.sintetizar_voz(erro)
+            self.falar(erro)
+            self.engine.fila_fala.aguardar()
 if __name__ == "__main__":
+    if "--aquecer" in sys.argv:
+        engine = OfflineSpeechEngine(microfone=False)
+        for frase in FRASES_FIXAS:
+            engine.renderizar_voz(frase)
+        print(f"\033[1;36m{len(FRASES_FIXAS)} frases fixas renderizadas em {engine.cache_audio.diretorio}\033[0m")
+        sys.exit(0)
     assistente = AssistenteVirtual()
     assistente.executar()
@@ -0,0 +1,305 @@
+"""Roteamento de STT/TTS entre backends (Azure e offline) por latência e taxa de erro.
+
+Cada backend implementa o contrato de BackendFala. O RoteadorFala mantém, por
+backend e operação, uma janela móvel de atrasos e falhas: quando o backend
+preferido erra demais, fica lento (p90 acima do limite) ou cai, as chamadas
+vão para o próximo da lista até ele ser testado de novo depois de ESPERA_S.
+Com hedge, os dois STT escutam a mesma fala e vale o primeiro resultado
+confiante; o outro é abandonado.
+"""
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import Metrics
+
+# Ordem de preferência dos backends
+ORDEM = os.getenv("ROTEADOR_ORDEM", "azure,offline").split(",")
+HEDGE = os.getenv("ROTEADOR_HEDGE", "0") == "1"
+JANELA = int(os.getenv("ROTEADOR_JANELA", "20"))
+MINIMO_AMOSTRAS = 5
+ERRO_MAX = float(os.getenv("ROTEADOR_ERRO_MAX", "0.3"))
+FALHAS_SEGUIDAS = 3
+# Atraso aceitável no p90: do fim da fala ao texto (STT) e da frase ao áudio pronto (TTS)
+LIMITE_S = {
+    "stt": float(os.getenv("ROTEADOR_STT_MS", "1500")) / 1000,
+    "tts": float(os.getenv("ROTEADOR_TTS_MS", "1500")) / 1000,
+}
+# Tempo fora da rota antes de o backend ser testado de novo
+ESPERA_S = float(os.getenv("ROTEADOR_ESPERA_S", "30"))
+TIMEOUT_TTS_S = float(os.getenv("ROTEADOR_TTS_TIMEOUT_S", "5"))
+# Confiança média das palavras para aceitar um resultado sem esperar o outro STT
+CONFIANCA_MIN = float(os.getenv("ROTEADOR_CONFIANCA", "0.6"))
+# Com um resultado pouco confiante em mãos, quanto esperar pelo outro STT
+ESPERA_HEDGE_S = 1.0
+
+Transcricao = namedtuple("Transcricao", "texto confianca atraso backend")
+
+
+class BackendFala:
+    """Contrato de um backend para o RoteadorFala
+
+    reconhecer(ao_parcial_estavel, parar) devolve uma Transcricao, ou None se nada
+    foi entendido (silêncio, ruído) ou se `parar` (threading.Event) foi acionado
+    antes do fim da fala; None não conta como falha do backend. `atraso` é o
+    tempo entre o fim da fala e o texto, quando o backend sabe medir.
+    sintetizar(texto) devolve o WAV da frase. Falhas são exceções.
+    """
+
+    nome = None
+
+    def reconhecer(self, ao_parcial_estavel=None, parar=None):
+        raise NotImplementedError
+
+    def sintetizar(self, texto):
+        raise NotImplementedError
+
+
+class BackendOffline(BackendFala):
+    """Vosk e pyttsx3 de um OfflineSpeechEngine"""
+
+    nome = "offline"
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def reconhecer(self, ao_parcial_estavel=None, parar=None):
+        texto = self.engine.capturar_audio(ao_parcial_estavel, parar)
+        if texto is None:
+            return None
+        return Transcricao(texto, self.engine.confianca, self.engine.atraso_final(), self.nome)
+
+    def sintetizar(self, texto):
+        return self.engine.renderizar_voz(texto)
+
+
+class BackendAzure(BackendFala):
+    """Azure Speech de um AzureSpeechClient (o parcial estável não é suportado)"""
+
+    nome = "azure"
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def reconhecer(self, ao_parcial_estavel=None, parar=None):
+        texto = self.cliente.recognize_from_microphone(stop=parar)
+        if texto is None:
+            return None
+        return Transcricao(texto, None, self.cliente.last_delay, self.nome)
+
+    def sintetizar(self, texto):
+        return self.cliente.render_speech(texto)
+
+
+class EstatisticasBackend:
+    """Janela móvel de atrasos e falhas de um backend numa operação, com disjuntor"""
+
+    def __init__(self, limite_s, janela=JANELA):
+        self.limite_s = limite_s
+        self.amostras = deque(maxlen=janela)  # (ok, atraso ou None)
+        self.falhas_seguidas = 0
+        self.fora_ate = 0.0
+        # Depois da espera, a primeira chamada decide se o backend volta
+        self.em_prova = False
+        self.chamadas = 0
+        self.falhas = 0
+        self.desvios = 0
+        self.lock = threading.Lock()
+
+    def disponivel(self, agora=None):
+        return (agora or time.monotonic()) >= self.fora_ate
+
+    def registrar(self, ok, atraso=None):
+        """Registra uma chamada; devolve o motivo se o backend saiu da rota"""
+        with self.lock:
+            self.chamadas += 1
+            self.amostras.append((ok, atraso))
+            if ok:
+                self.falhas_seguidas = 0
+            else:
+                self.falhas += 1
+                self.falhas_seguidas += 1
+            motivo = self.motivo_para_desviar(ok, atraso)
+            if self.em_prova and not motivo:
+                self.fora_ate = 0.0  # passou no teste: volta para a rota
+            self.em_prova = bool(motivo)
+            if motivo:
+                self.fora_ate = time.monotonic() + ESPERA_S
+                self.amostras.clear()
+                self.desvios += 1
+            return motivo
+
+    def motivo_para_desviar(self, ok, atraso):
+        lento = atraso is not None and atraso > self.limite_s
+        if self.em_prova and (not ok or lento):
+            return "falhou no teste de volta" if not ok else f"ainda lento ({atraso * 1000:.0f} ms)"
+        if self.falhas_seguidas >= FALHAS_SEGUIDAS:
+            return f"{self.falhas_seguidas} falhas seguidas"
+        if len(self.amostras) < MINIMO_AMOSTRAS:
+            return None
+        if self.taxa_erro() > ERRO_MAX:
+            return f"taxa de erro {self.taxa_erro():.0%}"
+        p90 = self.percentil(0.9)
+        if p90 is not None and p90 > self.limite_s:
+            return f"p90 {p90 * 1000:.0f} ms"
+        return None
+
+    def taxa_erro(self):
+        return sum(not ok for ok, _ in self.amostras) / len(self.amostras) if self.amostras else 0.0
+
+    def percentil(self, p):
+        atrasos = sorted(atraso for ok, atraso in self.amostras if ok and atraso is not None)
+        if not atrasos:
+            return None
+        return atrasos[int(p * (len(atrasos) - 1))]
+
+    def relatorio(self):
+        with self.lock:
+            p50, p90 = self.percentil(0.5), self.percentil(0.9)
+            return {
+                "chamadas": self.chamadas,
+                "falhas": self.falhas,
+                "taxa_erro": self.taxa_erro(),
+                "p50_ms": p50 * 1000 if p50 is not None else None,
+                "p90_ms": p90 * 1000 if p90 is not None else None,
+                "disponivel": self.disponivel(),
+                "desvios": self.desvios,
+            }
+
+
+class RoteadorFala:
+    """Escolhe o backend de cada chamada de STT/TTS pela ordem de preferência e pela saúde recente"""
+
+    def __init__(self, backends, hedge=HEDGE):
+        self.backends = backends
+        self.hedge = hedge and len(backends) > 1
+        self.estatisticas = {
+            (backend.nome, operacao): EstatisticasBackend(LIMITE_S[operacao])
+            for backend in backends
+            for operacao in LIMITE_S
+        }
+        # Uma thread por backend: uma síntese travada não bloqueia os outros
+        self.executores = {
+            backend.nome: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tts-{backend.nome}")
+            for backend in backends
+        }
+        # Síntese que estourou TIMEOUT_TTS_S e ainda ocupa a thread do backend: até ela
+        # terminar, as frases seguintes vão para os outros em vez de esperar na fila dela
+        self.travadas = {}
+        self.executor_stt = ThreadPoolExecutor(max_workers=len(backends), thread_name_prefix="stt")
+        self.abandonados = []  # STT perdedores do hedge ainda saindo da escuta
+        self.vitorias = {backend.nome: 0 for backend in backends}
+
+    def ordenar(self, operacao):
+        """Backends disponíveis primeiro, na ordem de preferência; os fora da rota ficam como último recurso"""
+        agora = time.monotonic()
+        return sorted(self.backends, key=lambda b: not self.estatisticas[(b.nome, operacao)].disponivel(agora))
+
+    def registrar(self, backend, operacao, ok, atraso):
+        Metrics.observar_backend(backend.nome, operacao, atraso, ok)
+        motivo = self.estatisticas[(backend.nome, operacao)].registrar(ok, atraso)
+        if motivo:
+            print(f"\033[1;33mRoteador: {backend.nome}/{operacao} fora da rota por {ESPERA_S:.0f} s "
+                  f"({motivo})\033[0m")
+
+    def chamar_stt(self, backend, ao_parcial_estavel=None, parar=None):
+        try:
+            transcricao = backend.reconhecer(ao_parcial_estavel, parar)
+        except Exception:
+            self.registrar(backend, "stt", False, None)
+            raise
+        if transcricao is not None:
+            self.registrar(backend, "stt", True, transcricao.atraso)
+        return transcricao
+
+    def reconhecer(self, ao_parcial_estavel=None):
+        """Próxima fala do usuário pelo melhor backend (ou pelos dois, com hedge)"""
+        # O perdedor da fala anterior precisa soltar o microfone/recognizer antes
+        wait(self.abandonados)
+        self.abandonados = []
+        candidatos = self.ordenar("stt")
+        if self.hedge:
+            return self.reconhecer_em_paralelo(candidatos[:2], ao_parcial_estavel)
+        erro = None
+        for backend in candidatos:
+            try:
+                return self.chamar_stt(backend, ao_parcial_estavel)
+            except Exception as e:
+                erro = e
+                print(f"\033[1;31mSTT {backend.nome} falhou: {str(e)}\033[0m")
+        raise RuntimeError(f"Nenhum backend de STT respondeu: {erro}")
+
+    def reconhecer_em_paralelo(self, backends, ao_parcial_estavel):
+        """Hedge: os dois escutam; vale o primeiro resultado confiante"""
+        parar = threading.Event()
+        pendentes = {
+            self.executor_stt.submit(self.chamar_stt, backend, ao_parcial_estavel, parar)
+            for backend in backends
+        }
+        melhor, erro, limite = None, None, None
+        while pendentes:
+            espera = None if limite is None else max(0.0, limite - time.monotonic())
+            prontos, pendentes = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+            if not prontos:
+                break  # o outro STT não respondeu a tempo: fica o resultado pouco confiante
+            for futuro in prontos:
+                try:
+                    transcricao = futuro.result()
+                except Exception as e:
+                    erro = e
+                    continue
+                if not transcricao or not transcricao.texto:
+                    continue
+                if transcricao.confianca is None or transcricao.confianca >= CONFIANCA_MIN:
+                    melhor = transcricao
+                    pendentes = set()
+                    break
+                if melhor is None or (transcricao.confianca or 0) > (melhor.confianca or 0):
+                    melhor = transcricao
+                    limite = time.monotonic() + ESPERA_HEDGE_S
+        parar.set()
+        self.abandonados = list(pendentes)
+        if melhor is None:
+            raise RuntimeError(f"Nenhum backend de STT respondeu: {erro}")
+        self.vitorias[melhor.backend] += 1
+        return melhor
+
+    def sintetizar(self, texto):
+        """WAV da frase pelo melhor backend; se ele falhar ou demorar demais, pelo próximo"""
+        erro = None
+        for backend in self.ordenar("tts"):
+            travada = self.travadas.get(backend.nome)
+            if travada is not None and not travada.done():
+                erro = erro or RuntimeError(f"síntese anterior do {backend.nome} ainda travada")
+                continue
+            inicio = time.perf_counter()
+            futuro = self.executores[backend.nome].submit(backend.sintetizar, texto)
+            try:
+                dados = futuro.result(TIMEOUT_TTS_S)
+            except Exception as e:
+                if not futuro.done():
+                    self.travadas[backend.nome] = futuro
+                erro = e
+                self.registrar(backend, "tts", False, None)
+                print(f"\033[1;31mTTS {backend.nome} falhou: {str(e) or type(e).__name__}\033[0m")
+                continue
+            self.registrar(backend, "tts", True, time.perf_counter() - inicio)
+            return dados
+        raise RuntimeError(f"Nenhum backend de TTS respondeu: {erro}")
+
+    def relatorio(self):
+        """Uma linha por backend e operação com a janela atual"""
+        linhas = ["Roteador de fala" + (" (hedge)" if self.hedge else "") + ":"]
+        for (nome, operacao), estatisticas in self.estatisticas.items():
+            r = estatisticas.relatorio()
+            p50 = f"{r['p50_ms']:.0f}" if r['p50_ms'] is not None else "-"
+            p90 = f"{r['p90_ms']:.0f}" if r['p90_ms'] is not None else "-"
+            estado = "ativo" if r["disponivel"] else "fora"
+            linhas.append(f"  {nome:<8}{operacao:<4} {estado:<6} {r['chamadas']:4d} chamadas "
+                          f"{r['taxa_erro']:5.0%} erro  p50 {p50:>5} ms  p90 {p90:>5} ms  "
+                          f"{r['desvios']} desvios")
+        if self.hedge:
+            linhas.append("  hedge: " + ", ".join(f"{nome} {n}" for nome, n in self.vitorias.items()))
+        return "\n".join(linhas)
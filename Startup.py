@@ -0,0 +1,124 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# "paralela" sobe os componentes em threads; "sequencial" faz tudo na hora, como antes
+MODO = os.getenv("INICIALIZACAO", "paralela")
+# Referência do relatório: importar este módulo é uma das primeiras coisas que os agentes fazem
+INICIO_PROCESSO = time.perf_counter()
+
+_importacoes = {}
+_lock_importacoes = threading.Lock()
+
+
+class ModuloAdiado:
+    """Módulo importado numa thread; o primeiro atributo acessado espera a importação"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.futuro = Future()
+        if MODO == "paralela":
+            threading.Thread(target=self.importar, name=f"import-{nome}", daemon=True).start()
+
+    def importar(self):
+        try:
+            self.futuro.set_result(importlib.import_module(self.nome))
+        except BaseException as e:
+            self.futuro.set_exception(e)
+
+    def __getattr__(self, atributo):
+        if not self.futuro.done() and MODO != "paralela":
+            self.importar()
+        return getattr(self.futuro.result(), atributo)
+
+
+def modulo_em_segundo_plano(nome):
+    """Começa a importar `nome` (SDKs pesados como ollama/pydantic e o Azure Speech)"""
+    with _lock_importacoes:
+        if nome not in _importacoes:
+            _importacoes[nome] = ModuloAdiado(nome)
+        return _importacoes[nome]
+
+
+class Inicializacao:
+    """Etapas de inicialização de um componente, em paralelo ou sob demanda, com os tempos de cada uma"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.etapas = {}
+        self.sob_demanda = {}
+        self.tempos = {}  # etapa -> (início relativo ao processo, duração)
+        self.lock = threading.Lock()
+
+    def iniciar(self, etapa, funcao):
+        """Dispara a etapa agora, numa thread própria"""
+        futuro = self.etapas[etapa] = Future()
+        if MODO == "paralela":
+            threading.Thread(
+                target=self.executar, args=(etapa, funcao, futuro), name=f"init-{etapa}", daemon=True
+            ).start()
+        else:
+            self.executar(etapa, funcao, futuro)
+
+    def adiar(self, etapa, funcao):
+        """Registra uma etapa que só roda no primeiro uso"""
+        self.sob_demanda[etapa] = funcao
+
+    def executar(self, etapa, funcao, futuro):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            self.tempos[etapa] = (inicio - INICIO_PROCESSO, time.perf_counter() - inicio)
+            futuro.set_exception(e)
+        else:
+            self.tempos[etapa] = (inicio - INICIO_PROCESSO, time.perf_counter() - inicio)
+            futuro.set_result(resultado)
+
+    def obter(self, etapa):
+        """Resultado da etapa, esperando por ela (ou rodando-a, se for sob demanda)"""
+        with self.lock:
+            if etapa not in self.etapas:
+                futuro = self.etapas[etapa] = Future()
+                funcao = self.sob_demanda.pop(etapa)
+            else:
+                futuro = funcao = None
+        if funcao:
+            self.executar(etapa, funcao, futuro)
+        return self.etapas[etapa].result()
+
+    def aguardar(self, *etapas):
+        """Espera as etapas indicadas (ou todas as já disparadas)"""
+        for etapa in etapas or list(self.etapas):
+            self.obter(etapa)
+
+    def relatorio(self, pronto=None):
+        """Linha a linha: quando cada etapa começou, quanto levou e quando o componente ficou pronto"""
+        linhas = [f"Inicialização {self.nome} ({MODO}):"]
+        for etapa, (inicio, duracao) in sorted(self.tempos.items(), key=lambda item: item[1][0]):
+            linhas.append(f"  {etapa:<12} +{inicio * 1000:6.0f} ms  {duracao * 1000:6.0f} ms")
+        for etapa in self.sob_demanda:
+            linhas.append(f"  {etapa:<12} sob demanda")
+        if pronto is not None:
+            linhas.append(f"  pronto em {(pronto - INICIO_PROCESSO) * 1000:.0f} ms")
+        return "\n".join(linhas)
+
+
+class Adiado:
+    """Atributo que vem de uma etapa de `instancia.inicializacao`
+
+    O primeiro acesso espera a etapa de mesmo nome; depois o valor fica no
+    __dict__ da instância, que também pode ser sobrescrito normalmente.
+    """
+
+    def __set_name__(self, dono, nome):
+        self.nome = nome
+
+    def __get__(self, instancia, dono=None):
+        if instancia is None:
+            return self
+        valor = instancia.inicializacao.obter(self.nome)
+        instancia.__dict__[self.nome] = valor
+        return valor
@@ -0,0 +1,137 @@
+import queue
+import re
+import threading
+
+# Fim de frase só é confirmado quando chega o espaço seguinte ("1.5" não quebra)
+FIM_DE_FRASE = re.compile(r'(?:[.!?…]+["\')\]]*|\n)\s+')
+BLOCO_THINK = re.compile(r'<think>.*?</think>', flags=re.DOTALL)
+
+
+class SentenceSegmenter:
+    """Segmenta incrementalmente o stream de tokens do LLM em frases completas"""
+
+    def __init__(self, min_caracteres=12):
+        # Frases muito curtas ("1.", "Sim.") são juntadas à seguinte
+        self.min_caracteres = min_caracteres
+        self.buffer = ""
+
+    def alimentar(self, pedaco):
+        """Recebe um pedaço do stream e devolve as frases que ficaram prontas"""
+        self.buffer = BLOCO_THINK.sub("", self.buffer + pedaco)
+        # Nada depois de um <think> aberto pode ser falado ainda
+        limite = self.buffer.find("<think>")
+        visivel = self.buffer if limite < 0 else self.buffer[:limite]
+
+        frases, inicio = [], 0
+        for fim in FIM_DE_FRASE.finditer(visivel):
+            frase = visivel[inicio:fim.end()].strip()
+            if len(frase) >= self.min_caracteres:
+                frases.append(frase)
+                inicio = fim.end()
+        self.buffer = self.buffer[inicio:]
+        return frases
+
+    def finalizar(self):
+        """Devolve o que sobrou no buffer ao fim do stream"""
+        resto = BLOCO_THINK.sub("", self.buffer).split("<think>")[0].strip()
+        self.buffer = ""
+        return [resto] if resto else []
+
+
+def falar_stream(stream, ao_frase, interrompido=None, ao_pedaco=None):
+    """Consome o stream do LLM entregando cada frase pronta a `ao_frase`; devolve o texto gerado
+
+    Se `interrompido` (threading.Event) abrir, o stream é fechado e o Ollama
+    para de gerar tokens que ninguém vai ouvir.
+    """
+    partes = []
+    segmentador = SentenceSegmenter()
+    for pedaco in stream:
+        if interrompido is not None and interrompido.is_set():
+            stream.close()
+            return "".join(partes)
+        conteudo = pedaco['message']['content']
+        if ao_pedaco:
+            ao_pedaco(conteudo)
+        partes.append(conteudo)
+        for frase in segmentador.alimentar(conteudo):
+            ao_frase(frase)
+    for frase in segmentador.finalizar():
+        ao_frase(frase)
+    return "".join(partes)
+
+
+async def falar_stream_async(stream, ao_frase):
+    """Versão asyncio de `falar_stream`; `ao_frase` é uma corrotina
+
+    A interrupção é o cancelamento da tarefa: o stream é fechado do mesmo jeito.
+    """
+    partes = []
+    segmentador = SentenceSegmenter()
+    try:
+        async for pedaco in stream:
+            conteudo = pedaco['message']['content']
+            partes.append(conteudo)
+            for frase in segmentador.alimentar(conteudo):
+                await ao_frase(frase)
+    finally:
+        await stream.aclose()
+    for frase in segmentador.finalizar():
+        await ao_frase(frase)
+    return "".join(partes)
+
+
+class SpeechQueue:
+    """Fila de frases consumida por uma thread que sintetiza enquanto o LLM gera"""
+
+    def __init__(self, sintetizar):
+        self.sintetizar = sintetizar
+        self.fila = queue.Queue()
+        # Barge-in: a reprodução confere este evento entre blocos de áudio
+        self.interrompido = threading.Event()
+        self.faladas = []  # frases da resposta atual reproduzidas até o fim
+        self.trabalhador = threading.Thread(target=self.executar, daemon=True)
+        self.trabalhador.start()
+
+    def enfileirar(self, texto, ao_iniciar=None):
+        """Agenda uma frase para ser falada assim que as anteriores terminarem
+
+        `ao_iniciar` é chamado pela thread de reprodução logo antes da síntese.
+        """
+        self.fila.put((texto, ao_iniciar))
+
+    def aguardar(self):
+        """Bloqueia até todas as frases enfileiradas terem sido faladas"""
+        self.fila.join()
+
+    def nova_resposta(self):
+        """Começa uma resposta nova: limpa a interrupção e as frases faladas"""
+        self.interrompido.clear()
+        self.faladas = []
+
+    def interromper(self):
+        """Para a frase em reprodução e descarta as que ainda não começaram"""
+        self.interrompido.set()
+        while True:
+            try:
+                self.fila.get_nowait()
+            except queue.Empty:
+                return
+            self.fila.task_done()
+
+    def executar(self):
+        """Loop da thread de reprodução"""
+        while True:
+            texto, ao_iniciar = self.fila.get()
+            try:
+                if self.interrompido.is_set():
+                    continue
+                if ao_iniciar:
+                    ao_iniciar()
+                self.sintetizar(texto)
+                if not self.interrompido.is_set():
+                    self.faladas.append(texto)
+            except Exception as e:
+                print(f"\033[1;31mErro na síntese: {str(e)}\033[0m")
+            finally:
+                self.fila.task_done()
@@ -0,0 +1,124 @@
+import math
+import os
+import time
+from collections import deque
+
+# VAD=0 manda todo o áudio do microfone para o Vosk, como antes
+VAD_ATIVO = os.getenv("VAD", "1") == "1"
+QUADRO_MS = 30
+PRE_ROLL_MS = int(os.getenv("VAD_PRE_ROLL_MS", "300"))
+# Silêncio mantido depois da fala: o Vosk precisa dele para fechar o resultado
+SEGURAR_MS = int(os.getenv("VAD_SEGURAR_MS", "600"))
+MARGEM_DB = float(os.getenv("VAD_MARGEM_DB", "9"))
+# Fricativas ("s", "f", "x") têm pouca energia e muitos cruzamentos por zero
+ZCR_FRICATIVA = 0.25
+
+
+def nivel_db(quadro):
+    """Energia média de um quadro PCM 16 bits, em dB"""
+    amostras = memoryview(quadro).cast("h")
+    return 10 * math.log10(sum(a * a for a in amostras) / len(amostras) + 1)
+
+
+class VADGate:
+    """Deixa passar para o reconhecedor só os trechos com fala, com pré-roll e margem final"""
+
+    def __init__(self, taxa=16000, pre_roll_ms=PRE_ROLL_MS, segurar_ms=SEGURAR_MS,
+                 margem_db=MARGEM_DB, quadros_inicio=3):
+        self.taxa = taxa
+        self.bytes_quadro = taxa * QUADRO_MS // 1000 * 2
+        self.pre_roll = deque(maxlen=max(1, math.ceil(pre_roll_ms / QUADRO_MS)))
+        self.segurar = max(1, segurar_ms // QUADRO_MS)
+        self.margem_db = margem_db
+        # Quadros de voz seguidos para abrir: estalos isolados não acordam o decodificador
+        self.quadros_inicio = quadros_inicio
+        self.ruido_db = None
+        # Contabilidade para o relatório de CPU economizada
+        self.bytes_recebidos = 0
+        self.bytes_liberados = 0
+        self.cpu_vad = 0.0
+        self.cpu_decodificacao = 0.0
+        self.bytes_decodificados = 0
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Prepara o portão para uma nova fala (o nível de ruído aprendido é mantido)"""
+        self.resto = b""
+        self.pre_roll.clear()
+        self.em_fala = False
+        self.voz_seguida = 0
+        self.silencio_seguido = 0
+
+    def classificar(self, quadro):
+        """Energia acima do ruído de fundo, ou energia moderada com muitos cruzamentos por zero"""
+        amostras = memoryview(quadro).cast("h")
+        db = nivel_db(quadro)
+        if self.ruido_db is None:
+            self.ruido_db = db
+        acima = db - self.ruido_db
+        voz = acima >= self.margem_db
+        if not voz and acima >= self.margem_db / 2:
+            cruzamentos = sum((a < 0) != (b < 0) for a, b in zip(amostras, amostras[1:]))
+            voz = cruzamentos / len(amostras) >= ZCR_FRICATIVA
+        if not voz:
+            # O ruído de fundo cai rápido e sobe devagar
+            peso = 0.5 if db < self.ruido_db else 0.05
+            self.ruido_db += (db - self.ruido_db) * peso
+        return voz
+
+    def filtrar(self, dados):
+        """Recebe um bloco do microfone; devolve (áudio a decodificar, fim_da_fala)
+
+        Quando a fala termina o processamento para ali e o resto do bloco
+        fica guardado para a próxima chamada.
+        """
+        inicio = time.process_time()
+        self.bytes_recebidos += len(dados)
+        # A concatenação copia o bloco: os quadros guardados no pré-roll não dependem
+        # do buffer de onde ele veio
+        dados = self.resto + dados
+        tamanho = len(dados) - len(dados) % self.bytes_quadro
+        self.resto = dados[tamanho:]
+        saida, fim = [], False
+
+        for posicao in range(0, tamanho, self.bytes_quadro):
+            quadro = dados[posicao:posicao + self.bytes_quadro]
+            voz = self.classificar(quadro)
+            if self.em_fala:
+                saida.append(quadro)
+                self.silencio_seguido = 0 if voz else self.silencio_seguido + 1
+                if self.silencio_seguido >= self.segurar:
+                    self.em_fala, self.voz_seguida, fim = False, 0, True
+                    self.resto = dados[posicao + self.bytes_quadro:]
+                    break
+            else:
+                self.pre_roll.append(quadro)
+                self.voz_seguida = self.voz_seguida + 1 if voz else 0
+                if self.voz_seguida >= self.quadros_inicio:
+                    self.em_fala, self.silencio_seguido = True, 0
+                    saida.extend(self.pre_roll)
+                    self.pre_roll.clear()
+
+        liberado = b"".join(saida)
+        self.bytes_liberados += len(liberado)
+        self.cpu_vad += time.process_time() - inicio
+        return liberado, fim
+
+    def contabilizar(self, bytes_decodificados, cpu):
+        """Registra o custo de CPU de um trecho que passou pelo reconhecedor"""
+        self.bytes_decodificados += bytes_decodificados
+        self.cpu_decodificacao += cpu
+
+    def relatorio(self):
+        """Áudio ignorado e CPU economizada, estimada pelo custo médio do que foi decodificado"""
+        bytes_por_segundo = 2 * self.taxa
+        ignorados = (self.bytes_recebidos - self.bytes_liberados) / bytes_por_segundo
+        decodificados = self.bytes_decodificados / bytes_por_segundo
+        cpu_por_segundo = self.cpu_decodificacao / decodificados if decodificados else 0.0
+        return {
+            "audio_s": self.bytes_recebidos / bytes_por_segundo,
+            "ignorado_s": ignorados,
+            "cpu_decodificacao_s": self.cpu_decodificacao,
+            "cpu_vad_s": self.cpu_vad,
+            "cpu_economizada_s": max(0.0, ignorados * cpu_por_segundo - self.cpu_vad),
+        }
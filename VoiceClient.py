@@ -0,0 +1,100 @@
+"""Cliente sintético para o VoiceServer: simula chamadas a partir de arquivos WAV.
+
+Uso: python VoiceClient.py pergunta.wav [-n 4] [--porta 8765] [--saida respostas/]
+
+Cada sessão envia o WAV (16 kHz mono 16 bits) em tempo real, seguido de
+silêncio para o Vosk fechar a fala, e mede o tempo até a transcrição, o
+primeiro áudio e a resposta completa.
+"""
+import argparse
+import asyncio
+import os
+import struct
+import time
+import wave
+
+BLOCO_AMOSTRAS = 1600  # 100 ms
+SILENCIO_FINAL = 1.5
+
+
+async def ler_quadro(reader):
+    tipo, tamanho = struct.unpack("!cI", await reader.readexactly(5))
+    return tipo, await reader.readexactly(tamanho)
+
+
+async def enviar_audio(writer, pcm, tempo_real=True):
+    """Envia PCM em blocos de 100 ms, no ritmo de uma chamada de verdade"""
+    passo = BLOCO_AMOSTRAS * 2
+    silencio = b"\0" * int(16000 * SILENCIO_FINAL) * 2
+    for dados in (pcm, silencio):
+        for i in range(0, len(dados), passo):
+            writer.write(dados[i:i + passo])
+            await writer.drain()
+            if tempo_real:
+                await asyncio.sleep(BLOCO_AMOSTRAS / 16000)
+
+
+async def sessao(numero, pcm, args):
+    reader, writer = await asyncio.open_connection(args.host, args.porta)
+    envio = asyncio.create_task(enviar_audio(writer, pcm, not args.rapido))
+    inicio = time.perf_counter()
+    fim_fala = inicio + len(pcm) / 2 / 16000
+    marcas, audios = {}, 0
+    try:
+        while True:
+            tipo, dados = await ler_quadro(reader)
+            agora = time.perf_counter()
+            if tipo == b"T":
+                marcas["transcricao"] = agora
+                print(f"[{numero}] Usuário: {dados.decode('utf-8')}")
+            elif tipo == b"A":
+                marcas.setdefault("primeiro_audio", agora)
+                if args.saida:
+                    caminho = os.path.join(args.saida, f"sessao{numero}_{audios:02d}.wav")
+                    with open(caminho, "wb") as f:
+                        f.write(dados)
+                audios += 1
+            elif tipo == b"I":
+                # Barge-in: a ARI parou de falar; a resposta à nova fala vem em seguida
+                print(f"[{numero}] ARI (interrompida): {dados.decode('utf-8')}")
+            elif tipo == b"R":
+                marcas["resposta"] = agora
+                print(f"[{numero}] ARI: {dados.decode('utf-8')}")
+                break
+    finally:
+        envio.cancel()
+        writer.close()
+
+    referencia = inicio if args.rapido else fim_fala
+    return {nome: (t - referencia) * 1000 for nome, t in marcas.items()}
+
+
+async def principal(args):
+    with wave.open(args.wav, "rb") as wav:
+        if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise SystemExit("Esperado WAV 16 kHz mono 16 bits")
+        pcm = wav.readframes(wav.getnframes())
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+
+    resultados = await asyncio.gather(*(sessao(i, pcm, args) for i in range(args.sessoes)))
+    for nome in ("transcricao", "primeiro_audio", "resposta"):
+        valores = sorted(r[nome] for r in resultados if nome in r)
+        if valores:
+            print(f"{nome}: min {valores[0]:.0f} ms | max {valores[-1]:.0f} ms "
+                  f"({len(valores)}/{len(resultados)} sessões)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wav")
+    parser.add_argument("-n", "--sessoes", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--saida", help="diretório para gravar os áudios recebidos")
+    parser.add_argument("--rapido", action="store_true", help="envia o áudio sem esperar o tempo real")
+    asyncio.run(principal(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
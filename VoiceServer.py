@@ -0,0 +1,301 @@
+"""Servidor asyncio de voz: várias sessões compartilhando um único modelo Vosk.
+
+Uso: python VoiceServer.py [--host 0.0.0.0] [--porta 8765] [--threads-stt 4] [--formato pcm16k]
+
+Protocolo (TCP): o cliente envia áudio cru continuamente, por padrão PCM 16 kHz
+mono int16. Com --formato o servidor aceita também PCM 48 kHz ou 8 kHz, μ-law
+8 kHz de telefonia e pacotes Opus, convertidos pelo AudioIngest (ver lá).
+O servidor responde com quadros `tipo (1 byte) + tamanho (uint32 big-endian) + dados`:
+  T  transcrição final do usuário (UTF-8)
+  R  resposta completa da ARI (UTF-8)
+  A  áudio de uma frase da resposta (WAV)
+  I  resposta interrompida pelo usuário (UTF-8, o que chegou a ser enviado)
+
+O áudio continua sendo lido enquanto a ARI responde. Com BARGE_IN=1, se o
+usuário falar por cima a geração é cancelada e o cliente deve parar a
+reprodução; sem ele, uma pergunta feita durante a resposta é respondida depois.
+Nos dois casos as palavras das frases já enviadas (o eco) não contam.
+As gerações de todas as sessões disputam as vagas do agendador do LLM
+(LLM_CONCORRENCIA, LLM_PRAZO_MS em LLMScheduler.py).
+
+Teste local sem Ollama nem microfone:
+  python FakeOllama.py &
+  OLLAMA_HOST=http://127.0.0.1:11435 python VoiceServer.py &
+  python VoiceClient.py pergunta.wav -n 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from vosk import KaldiRecognizer
+
+from AnswerCache import AnswerCache, versao_conteudo
+from AudioIngest import AudioIngest, FORMATOS
+from BargeIn import BARGE_IN, PALAVRAS as PALAVRAS_BARGE_IN, palavras_do_usuario
+from ConversationMemory import ConversationMemory, resumidor_ollama
+from KnowledgeIndex import KnowledgeIndex
+from LLMScheduler import ClienteAgendado, PrazoEsgotado, RESPOSTA_OCUPADA
+from ModelRouter import RoteadorModelos, RAPIDO
+from OfflineRAG import (
+    AssistenteVirtual,
+    OfflineSpeechEngine,
+    MODELO_LLM,
+    PROMPT_SISTEMA,
+    RESPOSTA_ERRO,
+)
+from StreamingTTS import falar_stream_async
+
+BLOCO_BYTES = 8192  # 4096 amostras int16
+THREADS_STT = int(os.getenv("SERVIDOR_THREADS_STT", "4"))
+FORMATO = os.getenv("SERVIDOR_FORMATO", "pcm16k")
+
+TRANSCRICAO = b"T"
+RESPOSTA = b"R"
+AUDIO = b"A"
+INTERROMPIDA = b"I"
+
+
+class VoiceSession:
+    """Uma conexão: recognizer, histórico e saída de áudio próprios"""
+
+    def __init__(self, servidor, reader, writer):
+        self.servidor = servidor
+        self.reader = reader
+        self.writer = writer
+        self.recognizer = KaldiRecognizer(servidor.engine.model, 16000)
+        # PCM 16 kHz vai direto para o Vosk; os outros formatos passam pelo conversor da sessão
+        self.entrada = AudioIngest.do_formato(servidor.formato) if servidor.formato != "pcm16k" else None
+        self.historico = ConversationMemory(
+            PROMPT_SISTEMA,
+            resumir=resumidor_ollama(
+                servidor.modelos.modelos[RAPIDO],
+                ClienteAgendado(servidor.modelos.clientes[RAPIDO], servidor.modelos.agendador),
+            ),
+        )
+        self.loop = asyncio.get_running_loop()
+        self.resposta = None  # tarefa da resposta em andamento
+        self.enviadas = []  # frases da resposta atual já enviadas ao cliente
+
+    async def executar(self):
+        """Lê áudio até o cliente desconectar, respondendo a cada fala final"""
+        try:
+            while True:
+                dados = await self.reader.read(BLOCO_BYTES)
+                if not dados:
+                    return
+                final = await self.loop.run_in_executor(self.servidor.executor_stt, self.aceitar, dados)
+                if not final:
+                    # O PartialResult() decodifica o que está pendente: roda na thread de STT
+                    if self.respondendo() and await self.loop.run_in_executor(
+                        self.servidor.executor_stt, self.usuario_falando
+                    ):
+                        await self.interromper()
+                    continue
+                resultado = json.loads(self.recognizer.Result())
+                pergunta = OfflineSpeechEngine.limpar_transcricao(resultado.get('text', '').strip()).strip()
+                if not pergunta:
+                    continue
+                anterior = None
+                if self.respondendo():
+                    if not palavras_do_usuario(pergunta, self.enviadas):
+                        continue  # só o eco das frases enviadas
+                    if BARGE_IN:
+                        await self.interromper()
+                    else:
+                        anterior = self.resposta
+                await self.enviar(TRANSCRICAO, pergunta.encode("utf-8"))
+                self.resposta = asyncio.create_task(
+                    self.responder_depois(anterior, pergunta) if anterior else self.responder(pergunta)
+                )
+        finally:
+            if self.respondendo():
+                self.resposta.cancel()
+
+    def aceitar(self, dados):
+        """Converte o pedaço recebido (se preciso) e passa ao Vosk, na thread de STT"""
+        if self.entrada is None:
+            return self.recognizer.AcceptWaveform(dados)
+        # O binding do Vosk só aceita bytes: o tobytes é a única cópia do caminho
+        return self.recognizer.AcceptWaveform(self.entrada.converter(dados).tobytes())
+
+    def respondendo(self):
+        return self.resposta is not None and not self.resposta.done()
+
+    def usuario_falando(self):
+        """Barge-in: o parcial do Vosk já tem palavras enquanto a ARI responde
+
+        O cliente toca as frases enviadas e o microfone dele as devolve; as
+        palavras delas não contam.
+        """
+        if not BARGE_IN:
+            return False
+        parcial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        return len(palavras_do_usuario(parcial, self.enviadas)) >= PALAVRAS_BARGE_IN
+
+    async def interromper(self):
+        """Cancela a resposta em andamento e espera ela registrar o que foi enviado"""
+        if self.respondendo():
+            self.resposta.cancel()
+            await asyncio.wait([self.resposta])
+
+    async def responder_depois(self, anterior, pergunta):
+        """Sem barge-in, a pergunta feita durante uma resposta espera ela terminar"""
+        try:
+            await asyncio.wait([anterior])
+        except asyncio.CancelledError:
+            anterior.cancel()  # sessão encerrada: a fila inteira cai junto
+            raise
+        await self.responder(pergunta)
+
+    async def responder(self, pergunta):
+        """Gera a resposta em stream e envia o áudio de cada frase assim que fica pronto"""
+        fila_audio = asyncio.Queue()
+        enviadas = self.enviadas = []
+        enviador = asyncio.create_task(self.enviar_audios(fila_audio, enviadas))
+        registrada = False
+
+        try:
+            try:
+                # A versão muda se a base em disco mudar, invalidando as respostas em cache
+                indice = await self.loop.run_in_executor(None, self.servidor.atualizar_indice)
+                versao = versao_conteudo(PROMPT_SISTEMA, indice.texto)
+                resposta = self.servidor.cache.buscar(pergunta, versao)
+                if resposta:
+                    await fila_audio.put((resposta, self.renderizar(resposta)))
+                else:
+                    resposta = await self.gerar(pergunta, fila_audio)
+                    if resposta:
+                        self.servidor.cache.guardar(pergunta, resposta, versao)
+                self.historico.adicionar("user", pergunta)
+                self.historico.adicionar("assistant", resposta)
+                registrada = True
+            except PrazoEsgotado as e:
+                # As outras sessões ocupam o Ollama: frase pronta agora em vez de resposta atrasada
+                print(f"\033[1;33mLLM ocupado: {str(e)}\033[0m")
+                resposta = RESPOSTA_OCUPADA
+                await fila_audio.put((resposta, self.renderizar(resposta)))
+            except Exception as e:
+                print(f"\033[1;31mErro no modelo: {str(e)}\033[0m")
+                resposta = RESPOSTA_ERRO
+                await fila_audio.put((resposta, self.renderizar(resposta)))
+            await fila_audio.put(None)
+            await enviador
+        except asyncio.CancelledError:
+            # Barge-in: o histórico guarda só as frases que chegaram ao cliente
+            enviador.cancel()
+            resposta = " ".join(enviadas)
+            if registrada:
+                self.historico.corrigir_ultima("assistant", resposta)
+            else:
+                self.historico.adicionar("user", pergunta)
+                self.historico.adicionar("assistant", resposta)
+            await self.enviar(INTERROMPIDA, resposta.encode("utf-8"))
+            return
+        await self.enviar(RESPOSTA, resposta.encode("utf-8"))
+
+    async def gerar(self, pergunta, fila_audio):
+        """Consome o stream do Ollama agendando a síntese de cada frase pronta"""
+        contexto = self.servidor.indice.contexto(pergunta)
+        mensagens = self.historico.mensagens(
+            f"Base de conhecimento relevante:\n{contexto}" if contexto else None,
+            pergunta=pergunta,
+        )
+        # Com várias sessões o orçamento de latência pesa: sob carga o modelo forte cede ao rápido
+        modelos = self.servidor.modelos
+        rota = modelos.rotear(pergunta, self.servidor.indice.cobertura(pergunta), em_conversa=len(self.historico) > 0)
+        print(f"\033[2mModelo: {rota}\033[0m")
+        # Vaga no agendador do processo, disputada por todas as sessões; cancelada a
+        # resposta (barge-in), a vaga volta e o stream é fechado
+        texto = await falar_stream_async(
+            modelos.chat_async(rota.nivel, mensagens, rota.prioridade),
+            lambda frase: self.agendar_frase(frase, fila_audio),
+        )
+        return AssistenteVirtual.limpar_resposta(texto)
+
+    async def agendar_frase(self, frase, fila_audio):
+        frase = AssistenteVirtual.limpar_resposta(frase)
+        if frase:
+            await fila_audio.put((frase, self.renderizar(frase)))
+
+    def renderizar(self, texto):
+        """Síntese fora do loop; o motor serializa o pyttsx3 na thread dele e os acertos do cache não esperam"""
+        return self.loop.run_in_executor(None, self.servidor.engine.renderizar_voz, texto)
+
+    async def enviar_audios(self, fila_audio, enviadas):
+        """Envia os áudios na ordem das frases, conforme a síntese termina"""
+        while True:
+            item = await fila_audio.get()
+            if item is None:
+                return
+            frase, futuro = item
+            try:
+                await self.enviar(AUDIO, await futuro)
+                enviadas.append(frase)
+            except Exception as e:
+                print(f"\033[1;31mErro na síntese: {str(e)}\033[0m")
+
+    async def enviar(self, tipo, dados):
+        self.writer.write(struct.pack("!cI", tipo, len(dados)) + dados)
+        await self.writer.drain()
+
+
+class VoiceServer:
+    """Recursos compartilhados entre as sessões"""
+
+    def __init__(self, threads_stt=THREADS_STT, formato=FORMATO):
+        # Falha já na subida se o formato não existir ou faltar o decodificador (Opus)
+        AudioIngest.do_formato(formato)
+        self.formato = formato
+        # Um único modelo Vosk e um único motor TTS para todas as conexões
+        self.engine = OfflineSpeechEngine(microfone=False)
+        self.indice = KnowledgeIndex.carregar()
+        self.cache = AnswerCache()
+        # Clientes Ollama por modelo (assíncronos para as respostas, síncronos para resumos e
+        # aquecimento) e as estatísticas que decidem entre o modelo rápido e o forte
+        self.modelos = RoteadorModelos(PROMPT_SISTEMA, padrao=MODELO_LLM)
+        self.executor_stt = ThreadPoolExecutor(max_workers=threads_stt, thread_name_prefix="stt")
+        self.sessoes = 0
+
+    def atualizar_indice(self):
+        """Relê a base se algum arquivo mudou; todas as sessões passam a usar o índice novo"""
+        self.indice = self.indice.recarregar_se_alterado()
+        return self.indice
+
+    async def atender(self, reader, writer):
+        endereco = writer.get_extra_info("peername")
+        self.sessoes += 1
+        print(f"\033[1;36mSessão aberta {endereco} ({self.sessoes} ativas)\033[0m")
+        try:
+            await VoiceSession(self, reader, writer).executar()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sessoes -= 1
+            writer.close()
+            print(f"\033[1;36mSessão encerrada {endereco} ({self.sessoes} ativas)\033[0m")
+            print(f"\033[2m{self.modelos.relatorio()}\033[0m")
+
+    async def servir(self, host, porta):
+        # A primeira sessão não paga a carga do modelo nem o prefill do prompt de sistema
+        await asyncio.get_running_loop().run_in_executor(None, self.modelos.manter_quente)
+        servidor = await asyncio.start_server(self.atender, host, porta)
+        print(f"\033[1;36mServidor de voz em {host}:{porta}\033[0m")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--threads-stt", type=int, default=THREADS_STT)
+    parser.add_argument("--formato", choices=FORMATOS, default=FORMATO)
+    args = parser.parse_args()
+    asyncio.run(VoiceServer(args.threads_stt, args.formato).servir(args.host, args.porta))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Teste de carga do agendador do LLM: vários agentes disputando um Ollama só.
+
+Uso: python bench_agendador.py [--agentes 8] [--perguntas 4] [--concorrencia 2] [--prazo-ms 4000]
+                               [--tokens-por-segundo 60] [--atraso-inicial 0.3] [--pausa 1.0]
+
+O Ollama é o FakeOllama com --compartilhar: as gerações simultâneas dividem
+os tokens por segundo, como numa GPU só. Cada agente (uma thread) faz uma
+primeira pergunta longa e depois alterna continuações curtas e perguntas
+longas, com uma pausa entre elas. A mesma carga roda duas vezes: sem limite
+de concorrência (como antes do agendador) e com o agendador. Para cada
+prioridade mostra o tempo até o primeiro token contado do pedido (fila
+incluída), o tempo total e quantos pedidos receberam a resposta pronta.
+
+Os agentes são threads de um processo só, que é o caso coberto pelo
+agendador: agentes em processos separados não dividem as vagas.
+"""
+import argparse
+import math
+import os
+import random
+import threading
+import time
+
+from FakeOllama import FakeOllama
+from LLMScheduler import AgendadorLLM, PrazoEsgotado, prioridade_da_pergunta, NOMES
+from ModelRouter import RoteadorModelos, RAPIDO
+
+PERGUNTA_LONGA = ("Quais são as diferenças entre as recomendações de fluxo de caixa e as de crédito "
+                  "e qual delas faz mais sentido para uma loja pequena no fim do ano?")
+CONTINUACAO = "E onde eu vejo isso?"
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[int(p * (len(valores) - 1))] if valores else None
+
+
+def ms(valor):
+    return f"{valor * 1000:.0f}" if valor is not None else "-"
+
+
+def agente(numero, roteador, args, resultados, lock):
+    aleatorio = random.Random(numero)
+    time.sleep(aleatorio.uniform(0, args.pausa))
+    for i in range(args.perguntas):
+        pergunta = PERGUNTA_LONGA if i % 2 == 0 else CONTINUACAO
+        prioridade = prioridade_da_pergunta(pergunta, em_conversa=i > 0)
+        mensagens = [{"role": "user", "content": pergunta}]
+        inicio = time.perf_counter()
+        primeiro, expirou = None, False
+        try:
+            for _ in roteador.chat(RAPIDO, mensagens, prioridade):
+                if primeiro is None:
+                    primeiro = time.perf_counter() - inicio
+        except PrazoEsgotado:
+            expirou = True
+        total = time.perf_counter() - inicio
+        with lock:
+            resultados.append((NOMES[prioridade], primeiro, total, expirou))
+        time.sleep(aleatorio.uniform(0.5, 1.5) * args.pausa)
+
+
+def rodar(nome, agendador, args):
+    roteador = RoteadorModelos("Você é a ARI.", ativo=False, agendador=agendador)
+    resultados, lock = [], threading.Lock()
+    threads = [threading.Thread(target=agente, args=(n, roteador, args, resultados, lock))
+               for n in range(args.agentes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    print(f"\n{nome} ({duracao:.1f} s)")
+    print(f"  {'prioridade':<11}{'pedidos':>8}{'1º token p50':>14}{'p90':>7}{'p99':>7}"
+          f"{'total p50':>11}{'p90':>7}{'prontas':>9}")
+    for prioridade in ("urgente", "normal"):
+        linhas = [r for r in resultados if r[0] == prioridade]
+        primeiros = [r[1] for r in linhas if r[1] is not None]
+        totais = [r[2] for r in linhas if not r[3]]
+        prontas = sum(r[3] for r in linhas)
+        print(f"  {prioridade:<11}{len(linhas):>8}{ms(percentil(primeiros, 0.5)):>14}"
+              f"{ms(percentil(primeiros, 0.9)):>7}{ms(percentil(primeiros, 0.99)):>7}"
+              f"{ms(percentil(totais, 0.5)):>11}{ms(percentil(totais, 0.9)):>7}{prontas:>9}")
+    for linha in agendador.relatorio().splitlines():
+        print(f"  {linha}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agentes", type=int, default=8)
+    parser.add_argument("--perguntas", type=int, default=4, help="perguntas por agente")
+    parser.add_argument("--concorrencia", type=int, default=2)
+    parser.add_argument("--prazo-ms", type=float, default=4000)
+    parser.add_argument("--tokens-por-segundo", type=float, default=60, help="ritmo total do Ollama falso")
+    parser.add_argument("--atraso-inicial", type=float, default=0.3)
+    parser.add_argument("--pausa", type=float, default=1.0, help="segundos médios entre perguntas de um agente")
+    args = parser.parse_args()
+
+    ollama_falso = FakeOllama(tokens_por_segundo=args.tokens_por_segundo, atraso_inicial=args.atraso_inicial,
+                              compartilhar=True)
+    # Os clientes Ollama criados pelo RoteadorModelos leem o OLLAMA_HOST
+    os.environ["OLLAMA_HOST"] = ollama_falso.iniciar()
+
+    print(f"{args.agentes} agentes x {args.perguntas} perguntas, Ollama falso a "
+          f"{args.tokens_por_segundo:.0f} tokens/s no total")
+    rodar("Sem agendador", AgendadorLLM(concorrencia=0, prazo_s=math.inf), args)
+    print(f"  pico de {ollama_falso.pico_ativos} gerações simultâneas no Ollama")
+    ollama_falso.pico_ativos = 0
+    rodar(f"Com agendador (concorrência {args.concorrencia}, prazo {args.prazo_ms:.0f} ms)",
+          AgendadorLLM(concorrencia=args.concorrencia, prazo_s=args.prazo_ms / 1000), args)
+    print(f"  pico de {ollama_falso.pico_ativos} gerações simultâneas no Ollama")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compara o preparo do reconhecimento do Azure por pergunta: recognize_once x sessão contínua.
+
+Uso: python bench_azure_stt.py [--turnos 5] [--latencia-conexao 0.25]
+
+Roda o AzureSpeechClient contra o FakeAzureSpeech, sem credenciais nem rede:
+cada conexão nova custa --latencia-conexao e a fala é simulada em tempo real.
+Para cada modo mede as conexões abertas, o preparo por pergunta e o atraso
+entre o fim da fala e a entrega do texto final.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import FakeAzureSpeech
+import AzureRAG
+
+ATRASO_FALA = 0.05  # o usuário começa a falar logo depois de a ARI começar a ouvir
+
+
+def medir(modo, perguntas):
+    FakeAzureSpeech.reiniciar()
+    cliente = AzureRAG.AzureSpeechClient(stt_mode=modo)
+    cliente.inicializacao.aguardar()
+    preparo_inicial = len(cliente.stt_setup_times)
+
+    atrasos, intermediarios = [], []
+    for pergunta in perguntas:
+        parciais = []
+        threading.Timer(ATRASO_FALA, FakeAzureSpeech.falar, args=(pergunta,)).start()
+        inicio = time.perf_counter()
+        texto = cliente.recognize_from_microphone(parciais.append)
+        decorrido = time.perf_counter() - inicio
+        fala = len(pergunta.split()) / FakeAzureSpeech.PALAVRAS_POR_SEGUNDO + FakeAzureSpeech.SILENCIO_FINAL
+        atrasos.append(decorrido - ATRASO_FALA - fala)
+        intermediarios.append(len(parciais))
+        assert texto == pergunta, (texto, pergunta)
+
+    preparo = cliente.stt_setup_times[preparo_inicial:]
+    if modo == "continuo":
+        cliente.continuous.stop()
+    return {
+        "conexoes": FakeAzureSpeech.conexoes,
+        "preparo_ms": statistics.mean(preparo) * 1000 if preparo else 0.0,
+        "atraso_ms": statistics.mean(atrasos) * 1000,
+        "intermediarios": statistics.mean(intermediarios),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turnos", type=int, default=5)
+    parser.add_argument("--latencia-conexao", type=float, default=FakeAzureSpeech.LATENCIA_CONEXAO)
+    parser.add_argument("--perguntas", default="bench/perguntas.txt")
+    args = parser.parse_args()
+
+    AzureRAG.speechsdk = FakeAzureSpeech
+    FakeAzureSpeech.LATENCIA_CONEXAO = args.latencia_conexao
+    with open(args.perguntas, encoding="utf-8") as f:
+        perguntas = [linha.strip() for linha in f if linha.strip()][:args.turnos]
+
+    print(f"{'modo':<10}{'conexões':>10}{'preparo':>12}{'atraso':>12}{'parciais':>10}")
+    for modo in ("unico", "continuo"):
+        r = medir(modo, perguntas)
+        print(f"{modo:<10}{r['conexoes']:>10}{r['preparo_ms']:>10.0f}ms{r['atraso_ms']:>10.0f}ms"
+              f"{r['intermediarios']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Compara o endpoint padrão do Vosk com o endpoint por parcial estável.
+
+Uso: python bench_endpointing.py gravacoes/*.wav [--modelo model/pt-small-model] [--bloco 1600]
+                                 [--silencio 2] [--saida bench/endpointing.json]
+
+Os tempos são medidos em tempo de áudio, então o resultado não depende da
+velocidade da máquina: para cada arquivo mede-se quanto depois da última
+mudança do parcial (fim da fala) cada modo entrega o texto final. Os dois
+modos leem blocos do mesmo tamanho, para a diferença medida ser só a do
+endpoint e não a da granularidade da leitura. Como no bench_vad.py, cada
+gravação ganha `--silencio` segundos de fundo em cada ponta: numa gravação que
+acaba junto com a última palavra o endpoint do Vosk nunca dispara e o modo
+"vosk" só termina no fim do arquivo. Turnos em que isso ainda acontece são
+contados à parte. Grava p50/p95 das esperas e da economia em JSON.
+"""
+import argparse
+import json
+import platform
+from datetime import datetime, timezone
+
+from vosk import Model, KaldiRecognizer
+
+from Endpointing import EndpointDetector, FINAL, ESPECULAR
+from KnowledgeIndex import normalizar_texto
+from bench_latencia import percentil
+from bench_vad import carregar
+
+BLOCO = 1600  # 100 ms, o BLOCO_PARCIAL do OfflineRAG
+
+
+def ler_blocos(pcm, tamanho):
+    """Divide PCM 16 kHz mono int16 em blocos de `tamanho` amostras"""
+    for inicio in range(0, len(pcm), tamanho * 2):
+        dados = pcm[inicio:inicio + tamanho * 2]
+        yield dados, len(dados) // 2
+
+
+def decodificar(modelo, pcm, bloco, detector=None):
+    """Decodifica até o primeiro resultado final; devolve texto, instante final,
+    instante da última mudança do parcial, o parcial usado na especulação e se
+    o texto só saiu no fim do áudio"""
+    recognizer = KaldiRecognizer(modelo, 16000)
+    tempo, ultima_mudanca, parcial_anterior, especulado = 0.0, 0.0, "", None
+    for dados, amostras in ler_blocos(pcm, bloco):
+        tempo += amostras / 16000
+        if recognizer.AcceptWaveform(dados):
+            return json.loads(recognizer.Result()).get("text", ""), tempo, ultima_mudanca, especulado, False
+        parcial = json.loads(recognizer.PartialResult()).get("partial", "")
+        if parcial != parcial_anterior:
+            parcial_anterior, ultima_mudanca = parcial, tempo
+        if detector:
+            evento = detector.alimentar(parcial, tempo)
+            if evento == ESPECULAR:
+                especulado = parcial
+            elif evento == FINAL:
+                return json.loads(recognizer.FinalResult()).get("text", ""), tempo, ultima_mudanca, especulado, False
+    return json.loads(recognizer.FinalResult()).get("text", ""), tempo, ultima_mudanca, especulado, True
+
+
+def resumir(valores):
+    return {
+        "n": len(valores),
+        "p50_ms": percentil(valores, 50),
+        "p95_ms": percentil(valores, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("arquivos", nargs="+")
+    parser.add_argument("--modelo", default="model/pt-small-model")
+    parser.add_argument("--bloco", type=int, default=BLOCO, help="amostras por leitura nos dois modos")
+    parser.add_argument("--silencio", type=float, default=2.0, help="segundos de fundo em cada ponta")
+    parser.add_argument("--saida", default="bench/endpointing.json")
+    args = parser.parse_args()
+
+    modelo = Model(args.modelo)
+    turnos = []
+    for caminho in args.arquivos:
+        pcm = carregar(caminho, args.silencio)
+        texto_vosk, fim_vosk, fala_vosk, _, sem_endpoint = decodificar(modelo, pcm, args.bloco)
+        texto_parcial, fim_parcial, fala_parcial, especulado, _ = decodificar(
+            modelo, pcm, args.bloco, EndpointDetector()
+        )
+        turno = {
+            "arquivo": caminho,
+            "vosk_ms": (fim_vosk - fala_vosk) * 1000,
+            "parcial_ms": (fim_parcial - fala_parcial) * 1000,
+            "vosk_sem_endpoint": sem_endpoint,
+            "mesmo_texto": normalizar_texto(texto_vosk) == normalizar_texto(texto_parcial),
+            "especulacao_aproveitavel": bool(especulado) and normalizar_texto(especulado) == normalizar_texto(texto_parcial),
+            "transcricao": texto_parcial,
+        }
+        turno["economia_ms"] = turno["vosk_ms"] - turno["parcial_ms"]
+        turnos.append(turno)
+        aviso = " (vosk sem endpoint: fim do arquivo)" if sem_endpoint else ""
+        print(f"{caminho}: vosk {turno['vosk_ms']:.0f} ms, parcial {turno['parcial_ms']:.0f} ms "
+              f"-> economia {turno['economia_ms']:.0f} ms{aviso} | {texto_parcial!r}")
+
+    total = len(turnos)
+    resumo = {metrica: resumir([t[metrica] for t in turnos]) for metrica in ("vosk_ms", "parcial_ms", "economia_ms")}
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(),
+        "maquina": platform.node(),
+        "config": {"modelo": args.modelo, "bloco": args.bloco, "silencio_s": args.silencio},
+        "resumo": resumo,
+        "vosk_sem_endpoint": sum(t["vosk_sem_endpoint"] for t in turnos),
+        "mesmo_texto": sum(t["mesmo_texto"] for t in turnos),
+        "especulacao_aproveitavel": sum(t["especulacao_aproveitavel"] for t in turnos),
+        "turnos": turnos,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"\nArquivos: {total}, blocos de {args.bloco} amostras ({args.bloco / 16:.0f} ms), "
+          f"{args.silencio:g} s de fundo em cada ponta")
+    print(f"\n{'espera':<12}{'p50':>10}{'p95':>10}")
+    for metrica, valores in resumo.items():
+        print(f"{metrica[:-3]:<12}{valores['p50_ms']:>8.0f}ms{valores['p95_ms']:>8.0f}ms")
+    print(f"\nVosk sem endpoint (terminou no fim do arquivo): {resultado['vosk_sem_endpoint']}/{total}")
+    print(f"Transcrição igual ao modo vosk: {resultado['mesmo_texto']}/{total}")
+    print(f"Especulação aproveitável: {resultado['especulacao_aproveitavel']}/{total}")
+    print(f"\nResultados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Compara o Vosk com e sem a gramática da base de conhecimento: WER e fator de tempo real.
+
+Uso: python bench_gramatica.py [bench/fixtures] [--perguntas bench/perguntas.txt]
+                               [--modelo model/pt-small-model] [--base conhecimento]
+                               [--confianca 0.9]
+
+Cada pergunta gravada (pergunta_*.wav, 16 kHz mono) é decodificada em blocos
+de 4096 amostras, como no microfone, de três formas: vocabulário completo,
+só a gramática e a gramática com volta ao vocabulário completo quando o
+resultado tem [unk] (o que o OfflineRAG usa com GRAMATICA_VOSK=1). A referência
+é o .txt de mesmo nome ao lado do WAV ou, na falta dele, a linha
+correspondente de --perguntas. O fator de tempo real (RTF) é a CPU gasta no
+Vosk dividida pela duração do áudio. A distribuição da confiança média com a
+gramática, separada entre falas certas e erradas, serve para calibrar --confianca.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import wave
+
+from vosk import Model, KaldiRecognizer
+
+from bench_vad import distancia
+from DomainGrammar import RecognizerDominio, gramatica_da_base
+from KnowledgeIndex import normalizar_texto
+
+BLOCO = 4096
+MODOS = ("completo", "gramatica", "com_volta")
+
+
+def carregar(caminho):
+    with wave.open(caminho, "rb") as wav:
+        if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{caminho}: esperado WAV 16 kHz mono 16 bits")
+        return wav.readframes(wav.getnframes())
+
+
+def referencias(fixtures, caminho_perguntas):
+    """Texto falado em cada fixture: .txt ao lado do WAV ou a linha de --perguntas"""
+    perguntas = []
+    if os.path.exists(caminho_perguntas):
+        with open(caminho_perguntas, encoding="utf-8") as f:
+            perguntas = [linha.strip() for linha in f if linha.strip()]
+    textos = []
+    for i, caminho in enumerate(fixtures):
+        lateral = os.path.splitext(caminho)[0] + ".txt"
+        if os.path.exists(lateral):
+            with open(lateral, encoding="utf-8") as f:
+                textos.append(f.read().strip())
+        elif i < len(perguntas):
+            textos.append(perguntas[i])
+        else:
+            raise SystemExit(f"Sem referência para {caminho}")
+    return textos
+
+
+def transcrever(recognizer, pcm):
+    """Decodifica o áudio todo; devolve (texto, CPU gasta)"""
+    textos = []
+    inicio = time.process_time()
+    for posicao in range(0, len(pcm), BLOCO * 2):
+        if recognizer.AcceptWaveform(pcm[posicao:posicao + BLOCO * 2]):
+            textos.append(json.loads(recognizer.Result()).get("text", ""))
+    textos.append(json.loads(recognizer.FinalResult()).get("text", ""))
+    return " ".join(t for t in textos if t), time.process_time() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixtures", nargs="?", default="bench/fixtures")
+    parser.add_argument("--perguntas", default="bench/perguntas.txt")
+    parser.add_argument("--modelo", default="model/pt-small-model")
+    parser.add_argument("--base", default="conhecimento")
+    parser.add_argument("--confianca", type=float, default=None, help="padrão: GRAMATICA_CONFIANCA")
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(os.path.join(args.fixtures, "pergunta_*.wav")))
+    if not fixtures:
+        raise SystemExit(f"Sem fixtures em {args.fixtures}: rode python bench_latencia.py --gerar-fixtures")
+    textos = referencias(fixtures, args.perguntas)
+
+    modelo = Model(args.modelo)
+    gramatica, faltando = gramatica_da_base(modelo, args.base)
+    print(f"Gramática: {len(json.loads(gramatica)) - 1} palavras, {len(faltando)} fora do modelo"
+          + (f" ({', '.join(faltando[:10])})" if faltando else ""))
+    opcoes = {} if args.confianca is None else {"confianca_minima": args.confianca}
+
+    totais = {modo: {"erros": 0, "cpu": 0.0} for modo in MODOS}
+    palavras, audio, redecodificados = 0, 0.0, 0
+    confiancas = {"certas": [], "erradas": []}
+    for caminho, texto in zip(fixtures, textos):
+        pcm = carregar(caminho)
+        duracao = len(pcm) / 32000
+        referencia = normalizar_texto(texto).split()
+        com_volta = RecognizerDominio(modelo, gramatica, **opcoes)
+        com_volta.confiancas = []
+        recognizers = {
+            "completo": KaldiRecognizer(modelo, 16000),
+            "gramatica": KaldiRecognizer(modelo, 16000, gramatica),
+            "com_volta": com_volta,
+        }
+        linha = []
+        for modo, recognizer in recognizers.items():
+            hipotese, cpu = transcrever(recognizer, pcm)
+            erros = distancia(referencia, normalizar_texto(hipotese).split())
+            if modo == "gramatica":
+                erros_gramatica = erros
+            elif modo == "com_volta":
+                # Confiança do resultado restrito, contra os erros da gramática sozinha
+                confiancas["erradas" if erros_gramatica else "certas"].extend(recognizer.confiancas)
+            totais[modo]["erros"] += erros
+            totais[modo]["cpu"] += cpu
+            linha.append(f"{modo} {erros} erro(s) RTF {cpu / duracao:.3f} {hipotese!r}")
+        palavras, audio = palavras + len(referencia), audio + duracao
+        redecodificados += com_volta.redecodificados
+        print(f"{os.path.basename(caminho)} ({duracao:.1f} s) {texto!r}")
+        for item in linha:
+            print(f"    {item}")
+
+    print(f"\nArquivos: {len(fixtures)}, {palavras} palavras, {audio:.1f} s de áudio")
+    print(f"{'modo':<12}{'WER':>8}{'RTF':>8}")
+    for modo in MODOS:
+        t = totais[modo]
+        print(f"{modo:<12}{100 * t['erros'] / max(palavras, 1):>7.1f}%{t['cpu'] / audio:>8.3f}")
+    print(f"Redecodificadas com o vocabulário completo: {redecodificados} de {len(fixtures)}")
+    for grupo, valores in confiancas.items():
+        if valores:
+            valores.sort()
+            print(f"Confiança com gramática ({grupo}): mín {valores[0]:.2f} "
+                  f"p10 {valores[int(0.1 * (len(valores) - 1))]:.2f} "
+                  f"p50 {valores[int(0.5 * (len(valores) - 1))]:.2f}, "
+                  f"{sum(v >= 0.999 for v in valores)} de {len(valores)} em 1.0")
+
+
+if __name__ == "__main__":
+    main()
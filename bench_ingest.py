@@ -0,0 +1,136 @@
+"""Vazão do AudioIngest: segundos de áudio convertidos por segundo de CPU, por formato.
+
+Uso: python bench_ingest.py [--segundos 60] [--pacote-ms 20] [--repeticoes 3]
+
+Para cada formato de entrada (PCM 48 kHz e 8 kHz, μ-law 8 kHz, PCM 16 kHz e,
+com o opuslib instalado, Opus) gera uma fala sintética (varredura de 200 a
+3400 Hz com ruído), divide em pacotes como chegariam da rede e mede a CPU para
+convertê-los em PCM 16 kHz mono. Depois repete um trecho com o tracemalloc
+ligado para mostrar a memória alocada por pacote no regime (só os objetos
+view do NumPy, que não crescem com o tamanho do pacote), e confere
+que um tom de 1 kHz sai na frequência e no nível certos.
+"""
+import argparse
+import struct
+import time
+import tracemalloc
+
+import numpy as np
+
+from AudioIngest import AudioIngest, FORMATOS, TAXA_SAIDA
+
+
+def sinal(taxa, segundos):
+    """Varredura 200-3400 Hz com ruído, em int16"""
+    t = np.arange(int(taxa * segundos)) / taxa
+    fase = 2 * np.pi * (200 * t + (3400 - 200) * t ** 2 / (2 * segundos))
+    ruido = np.random.default_rng(0).normal(0, 0.05, len(t))
+    return (np.clip(0.5 * np.sin(fase) + ruido, -1, 1) * 32767).astype("<i2")
+
+
+def codificar_mulaw(pcm):
+    """Codificador G.711 μ-law (só para gerar a entrada do teste)"""
+    x = pcm.astype(np.int32)
+    sinal_bit = np.where(x < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(x), 32635) + 0x84
+    expoente = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (expoente + 3)) & 0x0F
+    return (~(sinal_bit | (expoente << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def pacotes_opus(pcm, taxa, pacote_ms):
+    """Pacotes Opus com o prefixo de tamanho do protocolo, ou None sem opuslib"""
+    try:
+        import opuslib
+    except ImportError:
+        return None
+    encoder = opuslib.Encoder(taxa, 1, opuslib.APPLICATION_VOIP)
+    quadros = taxa * pacote_ms // 1000
+    pacotes = []
+    for i in range(0, len(pcm) - quadros + 1, quadros):
+        pacote = encoder.encode(pcm[i:i + quadros].tobytes(), quadros)
+        pacotes.append(struct.pack("!H", len(pacote)) + pacote)
+    return pacotes
+
+
+def pacotes(formato, segundos, pacote_ms):
+    """Pacotes de rede do formato, como bytes"""
+    codificacao, taxa = FORMATOS[formato]
+    pcm = sinal(taxa, segundos)
+    if codificacao == "opus":
+        return pacotes_opus(pcm, taxa, pacote_ms)
+    dados = codificar_mulaw(pcm).tobytes() if codificacao == "mulaw" else pcm.tobytes()
+    passo = len(dados) * pacote_ms // (segundos * 1000)
+    passo -= passo % (1 if codificacao == "mulaw" else 2)
+    return [dados[i:i + passo] for i in range(0, len(dados), passo)]
+
+
+def medir(formato, lista, repeticoes):
+    """Menor CPU entre as repetições e amostras produzidas"""
+    melhor, produzidas = None, 0
+    for _ in range(repeticoes):
+        ingest = AudioIngest.do_formato(formato)
+        produzidas = 0
+        inicio = time.process_time()
+        for pacote in lista:
+            produzidas += len(ingest.converter(pacote))
+        gasto = time.process_time() - inicio
+        melhor = gasto if melhor is None else min(melhor, gasto)
+    return melhor, produzidas
+
+
+def alocacao_por_pacote(formato, lista):
+    """Pico de memória alocada (bytes) ao converter um pacote, depois do aquecimento"""
+    ingest = AudioIngest.do_formato(formato)
+    for pacote in lista[:50]:
+        ingest.converter(pacote)
+    tracemalloc.start()
+    pico = 0
+    for pacote in lista[50:550]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        ingest.converter(pacote)
+        pico = max(pico, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return pico
+
+
+def conferir_tom(formato):
+    """Frequência e amplitude de um tom de 1 kHz depois da conversão"""
+    codificacao, taxa = FORMATOS[formato]
+    if codificacao == "opus":
+        return None
+    t = np.arange(taxa) / taxa
+    tom = (np.sin(2 * np.pi * 1000 * t) * 10000).astype("<i2")
+    dados = codificar_mulaw(tom).tobytes() if codificacao == "mulaw" else tom.tobytes()
+    saida = AudioIngest.do_formato(formato).converter(dados)[TAXA_SAIDA // 50:].astype(np.float64)
+    espectro = np.abs(np.fft.rfft(saida * np.hanning(len(saida))))
+    frequencia = espectro.argmax() * TAXA_SAIDA / len(saida)
+    return frequencia, np.sqrt(2 * np.mean(saida ** 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segundos", type=int, default=60)
+    parser.add_argument("--pacote-ms", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.segundos} s de áudio em pacotes de {args.pacote_ms} ms\n")
+    print(f"{'formato':<10}{'áudio s/CPU s':>15}{'µs/pacote':>11}{'saída':>10}{'alocado/pacote':>16}  tom 1 kHz")
+    for formato in ("pcm48k", "pcm8k", "mulaw8k", "pcm16k", "opus"):
+        lista = pacotes(formato, args.segundos, args.pacote_ms)
+        if lista is None:
+            print(f"{formato:<10}  sem opuslib, pulado")
+            continue
+        gasto, produzidas = medir(formato, lista, args.repeticoes)
+        vazao = args.segundos / gasto if gasto else float("inf")
+        alocado = alocacao_por_pacote(formato, lista)
+        tom = conferir_tom(formato)
+        tom = f"{tom[0]:.0f} Hz, amplitude {tom[1]:.0f}/10000" if tom else "-"
+        print(f"{formato:<10}{vazao:>15.0f}{gasto / len(lista) * 1e6:>11.1f}"
+              f"{produzidas / TAXA_SAIDA:>9.1f}s{alocado:>14d} B  {tom}")
+
+
+if __name__ == "__main__":
+    main()
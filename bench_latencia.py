@@ -0,0 +1,282 @@
+"""Benchmark de latência ponta a ponta do agente offline.
+
+Uso:
+  python bench_latencia.py --gerar-fixtures          # renderiza bench/perguntas.txt em WAV
+  python bench_latencia.py [bench/fixtures] [--repeticoes 3] [--tokens-por-segundo 25]
+                           [--saida bench/resultados.json]
+
+Cada WAV é tocado no OfflineSpeechEngine no lugar do microfone (sem PyAudio),
+o Ollama é substituído pelo FakeOllama local e a fala sintetizada é gravada em
+arquivo em vez de ir para as caixas de som. Mede, por turno:
+  stt_final       fim do áudio da pergunta -> texto final do Vosk
+  primeiro_token  pedido ao LLM -> primeiro token
+  primeiro_audio  fim do áudio da pergunta -> primeiro áudio da resposta
+  turno_total     fim do áudio da pergunta -> último áudio da resposta entregue
+e grava p50/p95/p99 em JSON para comparar execuções.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+
+from FakeOllama import FakeOllama
+
+METRICAS = ("stt_final", "primeiro_token", "primeiro_audio", "turno_total")
+
+
+class WavStream:
+    """Substitui o stream do PyAudio lendo de um WAV, no ritmo do tempo real"""
+
+    def __init__(self, caminho, tempo_real=True):
+        self.wav = wave.open(caminho, "rb")
+        if self.wav.getframerate() != 16000 or self.wav.getnchannels() != 1 or self.wav.getsampwidth() != 2:
+            self.wav.close()
+            raise ValueError(f"{caminho}: esperado WAV 16 kHz mono 16 bits (rode --gerar-fixtures de novo)")
+        self.taxa = 16000
+        self.tempo_real = tempo_real
+        self.fim_audio = None
+        self.proximo = time.perf_counter()
+
+    def read(self, quadros, exception_on_overflow=False):
+        dados = self.wav.readframes(quadros)
+        if len(dados) < quadros * 2:
+            if self.fim_audio is None:
+                self.fim_audio = time.perf_counter()
+            # Depois da pergunta vem silêncio, como num microfone aberto
+            dados += b"\0" * (quadros * 2 - len(dados))
+        if self.tempo_real:
+            self.proximo += quadros / self.taxa
+            time.sleep(max(0.0, self.proximo - time.perf_counter()))
+        return dados
+
+    def close(self):
+        self.wav.close()
+
+
+class SaidaGravada:
+    """Imita a interface de saída do PyAudio usada por tocar_wav, gravando em WAV"""
+
+    def __init__(self):
+        self.arquivo = None
+        self.caminho = None
+        self.primeiro_audio = None
+        self.ultimo_audio = None
+
+    def nova_gravacao(self, caminho):
+        self.fechar()
+        self.caminho = caminho
+        self.primeiro_audio = self.ultimo_audio = None
+
+    def fechar(self):
+        if self.arquivo:
+            self.arquivo.close()
+            self.arquivo = None
+
+    def get_format_from_width(self, largura):
+        return largura
+
+    def open(self, format, channels, rate, output=True, **kwargs):
+        if self.arquivo is None:
+            self.arquivo = wave.open(self.caminho, "wb")
+            self.arquivo.setsampwidth(format)
+            self.arquivo.setnchannels(channels)
+            self.arquivo.setframerate(rate)
+        return self
+
+    def write(self, quadros):
+        agora = time.perf_counter()
+        if self.primeiro_audio is None:
+            self.primeiro_audio = agora
+        self.ultimo_audio = agora
+        self.arquivo.writeframes(quadros)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def percentil(valores, p):
+    """Percentil com interpolação linear"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicao = (len(ordenados) - 1) * p / 100
+    base = int(posicao)
+    proximo = min(base + 1, len(ordenados) - 1)
+    return ordenados[base] + (ordenados[proximo] - ordenados[base]) * (posicao - base)
+
+
+def converter_para_16k(caminho):
+    """Regrava um WAV 16 bits em 16 kHz mono, o formato do microfone do agente"""
+    from AudioIngest import AudioIngest
+
+    with wave.open(caminho, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{caminho}: esperado WAV de 16 bits")
+        taxa, canais = wav.getframerate(), wav.getnchannels()
+        dados = wav.readframes(wav.getnframes())
+    ingest = AudioIngest("pcm", taxa, canais)
+    # Zeros no fim empurram para fora as amostras presas no filtro
+    pcm = ingest.converter(dados + bytes(ingest.taps * ingest.bytes_quadro)).tobytes()
+    with wave.open(caminho, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(pcm)
+
+
+def gerar_fixtures(destino, perguntas="bench/perguntas.txt"):
+    """Renderiza as perguntas de referência com o TTS do próprio agente, em 16 kHz mono"""
+    from OfflineRAG import OfflineSpeechEngine
+
+    os.makedirs(destino, exist_ok=True)
+    engine = OfflineSpeechEngine(microfone=False)
+    with open(perguntas, encoding="utf-8") as f:
+        linhas = [linha.strip() for linha in f if linha.strip()]
+
+    arquivos = [os.path.join(destino, f"pergunta_{i:02d}.wav") for i in range(len(linhas))]
+
+    def gravar(tts):
+        for pergunta, arquivo in zip(linhas, arquivos):
+            tts.save_to_file(pergunta, arquivo)
+        tts.runAndWait()
+    engine.no_tts(gravar)
+    # O pyttsx3 grava na taxa nativa do motor de voz, não em 16 kHz
+    for arquivo in arquivos:
+        converter_para_16k(arquivo)
+    print(f"\033[1;36m{len(linhas)} fixtures gravadas em {destino}\033[0m")
+
+
+def executar(args):
+    # O cliente padrão do ollama lê OLLAMA_HOST na importação: sobe o servidor falso antes
+    ollama_falso = FakeOllama(
+        tokens_por_segundo=args.tokens_por_segundo, atraso_inicial=args.atraso_inicial
+    )
+    os.environ["OLLAMA_HOST"] = ollama_falso.iniciar()
+
+    from AnswerCache import AnswerCache
+    from AudioCache import AudioCache
+    from OfflineRAG import AssistenteVirtual, OfflineSpeechEngine
+
+    class EngineMedido(OfflineSpeechEngine):
+        def capturar_audio(self, ao_parcial_estavel=None):
+            texto = super().capturar_audio(ao_parcial_estavel)
+            self.marcas["stt_final"] = time.perf_counter()
+            self.marcas["transcricao"] = texto
+            return texto
+
+    class AssistenteMedido(AssistenteVirtual):
+        def iniciar_stream(self, pergunta):
+            self.engine.marcas["llm_enviado"] = time.perf_counter()
+            for pedaco in super().iniciar_stream(pergunta):
+                self.engine.marcas.setdefault("primeiro_token", time.perf_counter())
+                yield pedaco
+
+    arquivos = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")))
+    if not arquivos:
+        raise SystemExit(f"Nenhum WAV em {args.fixtures}; rode com --gerar-fixtures")
+
+    engine = EngineMedido(microfone=False)
+    saida = SaidaGravada()
+    engine.audio = saida
+    assistente = AssistenteMedido(engine)
+    diretorio_audio = tempfile.mkdtemp(prefix="bench_audio_")
+    if not args.com_cache:
+        # Sem cache: toda resposta passa pelo LLM e todo áudio pelo TTS
+        assistente.cache = AnswerCache(max_itens=0)
+        engine.cache_audio = AudioCache(diretorio_audio, max_bytes=0)
+    os.makedirs(args.gravacoes, exist_ok=True)
+
+    turnos = []
+    for repeticao in range(args.repeticoes):
+        for arquivo in arquivos:
+            stream = WavStream(arquivo, not args.rapido)
+            engine.stream = stream
+            # O recognizer do próprio motor (criar_recognizer: SetWords e gramática), como no microfone
+            engine.recognizer.Reset()
+            engine.marcas = {}
+            nome = os.path.splitext(os.path.basename(arquivo))[0]
+            saida.nova_gravacao(os.path.join(args.gravacoes, f"{nome}_r{repeticao}.wav"))
+
+            assistente.processar_comando()
+            fim = saida.ultimo_audio or time.perf_counter()
+            stream.close()
+
+            marcas = engine.marcas
+            # Se o Vosk fechou a fala antes do fim do arquivo, a referência é o texto final
+            fim_audio = stream.fim_audio or marcas.get("stt_final", fim)
+            turno = {"arquivo": arquivo, "repeticao": repeticao, "transcricao": marcas.get("transcricao", "")}
+            if "stt_final" in marcas:
+                turno["stt_final"] = marcas["stt_final"] - fim_audio
+            if "primeiro_token" in marcas:
+                turno["primeiro_token"] = marcas["primeiro_token"] - marcas["llm_enviado"]
+            if saida.primeiro_audio:
+                turno["primeiro_audio"] = saida.primeiro_audio - fim_audio
+                turno["turno_total"] = fim - fim_audio
+            turnos.append(turno)
+    saida.fechar()
+
+    resumo = {}
+    for metrica in METRICAS:
+        valores = [t[metrica] * 1000 for t in turnos if metrica in t]
+        resumo[metrica] = {
+            "n": len(valores),
+            "p50_ms": percentil(valores, 50),
+            "p95_ms": percentil(valores, 95),
+            "p99_ms": percentil(valores, 99),
+        }
+
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(),
+        "maquina": platform.node(),
+        "config": {
+            "fixtures": args.fixtures,
+            "repeticoes": args.repeticoes,
+            "tokens_por_segundo": args.tokens_por_segundo,
+            "atraso_inicial": args.atraso_inicial,
+            "tempo_real": not args.rapido,
+            "com_cache": args.com_cache,
+            "endpointing": os.getenv("ENDPOINTING", "vosk"),
+        },
+        "resumo": resumo,
+        "turnos": turnos,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'métrica':<16}{'n':>4}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for metrica, valores in resumo.items():
+        if valores["n"]:
+            print(f"{metrica:<16}{valores['n']:>4}{valores['p50_ms']:>8.0f}ms"
+                  f"{valores['p95_ms']:>8.0f}ms{valores['p99_ms']:>8.0f}ms")
+    print(f"\nResultados em {args.saida}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixtures", nargs="?", default="bench/fixtures")
+    parser.add_argument("--gerar-fixtures", action="store_true")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--tokens-por-segundo", type=float, default=25.0)
+    parser.add_argument("--atraso-inicial", type=float, default=0.2)
+    parser.add_argument("--rapido", action="store_true", help="não espera o tempo real do áudio")
+    parser.add_argument("--com-cache", action="store_true", help="mantém os caches de resposta e de áudio")
+    parser.add_argument("--gravacoes", default="bench/saida", help="onde gravar a fala sintetizada")
+    parser.add_argument("--saida", default="bench/resultados.json")
+    args = parser.parse_args()
+
+    if args.gerar_fixtures:
+        gerar_fixtures(args.fixtures)
+    else:
+        executar(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Simula a degradação do Azure e mostra o roteador desviando para o offline e voltando.
+
+Uso: python bench_roteamento.py [bench/fixtures] [--turnos-por-fase 6] [--espera 10] [--hedge]
+
+O Azure é o FakeAzureSpeech (sem credenciais nem rede) e o offline é o Vosk/
+pyttsx3 de verdade, ouvindo as fixtures de `bench_latencia.py --gerar-fixtures`
+no lugar do microfone. As fases são: normal, lento (fim de fala e síntese do
+Azure acima do limite do roteador), fora (serviço indisponível) e volta. Para
+cada turno mostra quem transcreveu, o atraso do STT, quem sintetizou e quanto
+a síntese levou; no fim, o relatório do roteador.
+"""
+import argparse
+import glob
+import os
+import tempfile
+import threading
+import time
+import wave
+
+import FakeAzureSpeech
+import AzureRAG
+import SpeechRouter
+from AudioCache import AudioCache
+from OfflineRAG import OfflineSpeechEngine
+from SpeechRouter import BackendAzure, BackendOffline, RoteadorFala
+
+ATRASO_FALA = 0.3  # o usuário começa a falar logo depois de a ARI começar a ouvir
+NORMAL = {"SILENCIO_FINAL": 0.5, "LATENCIA_SINTESE": 0.15, "INDISPONIVEL": False}
+FASES = (
+    ("normal", NORMAL),
+    ("lento", {"SILENCIO_FINAL": 2.0, "LATENCIA_SINTESE": 2.0, "INDISPONIVEL": False}),
+    ("fora", {**NORMAL, "INDISPONIVEL": True}),
+    ("volta", NORMAL),
+)
+
+
+class MicrofoneSimulado:
+    """Microfone ao vivo: cada leitura devolve o trecho da fala atual que coincide com o relógio"""
+
+    def __init__(self, taxa=16000):
+        self.taxa = taxa
+        self.pcm = b""
+        self.inicio = 0.0
+
+    def tocar(self, pcm):
+        self.pcm, self.inicio = pcm, time.perf_counter()
+
+    def read(self, quadros, exception_on_overflow=False):
+        time.sleep(quadros / self.taxa)
+        fim = int((time.perf_counter() - self.inicio) * self.taxa) * 2
+        inicio = max(0, fim - quadros * 2)
+        dados = self.pcm[inicio:fim]
+        return dados + b"\0" * (quadros * 2 - len(dados))
+
+
+def falar(microfone, pcm, texto):
+    """A mesma fala chega ao microfone do Vosk e ao Azure falso"""
+    microfone.tocar(pcm)
+    FakeAzureSpeech.falar(texto)
+
+
+def sintetizados(roteador):
+    """Sínteses bem-sucedidas por backend, para saber quem atendeu a última"""
+    return {nome: e.chamadas - e.falhas for (nome, operacao), e in roteador.estatisticas.items()
+            if operacao == "tts"}
+
+
+def carregar(caminho):
+    with wave.open(caminho, "rb") as wav:
+        return wav.readframes(wav.getnframes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixtures", nargs="?", default="bench/fixtures")
+    parser.add_argument("--perguntas", default="bench/perguntas.txt")
+    parser.add_argument("--turnos-por-fase", type=int, default=6)
+    parser.add_argument("--espera", type=float, default=10.0, help="segundos fora da rota antes do teste de volta")
+    parser.add_argument("--hedge", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.perguntas, encoding="utf-8") as f:
+        perguntas = [linha.strip() for linha in f if linha.strip()]
+    fixtures = sorted(glob.glob(os.path.join(args.fixtures, "pergunta_*.wav")))
+    if not fixtures:
+        raise SystemExit(f"Sem fixtures em {args.fixtures}: rode python bench_latencia.py --gerar-fixtures")
+    falas = [(carregar(caminho), texto) for caminho, texto in zip(fixtures, perguntas)]
+
+    AzureRAG.speechsdk = FakeAzureSpeech
+    SpeechRouter.ESPERA_S = args.espera
+    temporario = tempfile.mkdtemp(prefix="bench_roteamento_")
+    microfone = MicrofoneSimulado()
+
+    offline = OfflineSpeechEngine(microfone=False)
+    offline.stream = microfone
+    offline.cache_audio = AudioCache(os.path.join(temporario, "offline"))
+    azure = AzureRAG.AzureSpeechClient(stt_mode="continuo")
+    azure.audio_cache = AudioCache(os.path.join(temporario, "azure"))
+    roteador = RoteadorFala([BackendAzure(azure), BackendOffline(offline)], hedge=args.hedge)
+    offline.inicializacao.aguardar()
+    azure.inicializacao.aguardar()
+
+    print(f"{'fase':<8}{'turno':>6}  {'stt':<9}{'atraso':>9}  {'texto':<6}{'tts':<9}{'síntese':>9}")
+    turno = 0
+    for fase, ajustes in FASES:
+        for nome, valor in ajustes.items():
+            setattr(FakeAzureSpeech, nome, valor)
+        for _ in range(args.turnos_por_fase):
+            pcm, texto = falas[turno % len(falas)]
+            threading.Timer(ATRASO_FALA, falar, args=(microfone, pcm, texto)).start()
+            try:
+                transcricao = roteador.reconhecer()
+                stt, atraso = transcricao.backend, transcricao.atraso
+                acertou = "ok" if transcricao.texto.strip() == texto else "difere"
+            except RuntimeError:
+                stt, atraso, acertou = "falhou", None, "-"
+            # Espera o fim da fala simulada nos dois backends para o próximo turno não ouvir o resto desta
+            duracao = max(len(pcm) / 32000,
+                          len(texto.split()) / FakeAzureSpeech.PALAVRAS_POR_SEGUNDO + FakeAzureSpeech.SILENCIO_FINAL)
+            time.sleep(max(0.0, duracao - (time.perf_counter() - microfone.inicio)))
+
+            antes = sintetizados(roteador)
+            inicio = time.perf_counter()
+            roteador.sintetizar(f"Resposta de teste número {turno}.")
+            sintese = time.perf_counter() - inicio
+            tts = next(nome for nome, n in sintetizados(roteador).items() if n > antes[nome])
+            atraso_ms = f"{atraso * 1000:.0f} ms" if atraso is not None else "-"
+            print(f"{fase:<8}{turno:>6}  {stt:<9}{atraso_ms:>9}  {acertou:<6}{tts:<9}{sintese * 1000:>6.0f} ms")
+            turno += 1
+        if fase == "fora":
+            # Dá tempo para o teste de volta acontecer na próxima fase
+            time.sleep(args.espera)
+
+    print(roteador.relatorio())
+    azure.continuous.stop()
+
+
+if __name__ == "__main__":
+    main()
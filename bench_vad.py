@@ -0,0 +1,105 @@
+"""Mede a CPU economizada pelo VAD e se a transcrição continua a mesma.
+
+Uso: python bench_vad.py gravacoes/*.wav [--modelo model/pt-small-model] [--silencio 5]
+
+Cada arquivo é decodificado duas vezes, como no microfone (blocos de 4096
+amostras): com todo o áudio indo para o Vosk e com o VADGate na frente.
+Antes e depois da fala entram `--silencio` segundos de ruído de fundo
+gravado no próprio arquivo (ou zeros), simulando a pausa entre turnos.
+"""
+import argparse
+import json
+import time
+import wave
+
+from vosk import Model, KaldiRecognizer
+
+from KnowledgeIndex import normalizar_texto
+from VoiceActivity import VADGate
+
+BLOCO = 4096
+
+
+def carregar(caminho, silencio):
+    """PCM do arquivo com `silencio` segundos de fundo em cada ponta"""
+    with wave.open(caminho, "rb") as wav:
+        if wav.getframerate() != 16000 or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{caminho}: esperado WAV 16 kHz mono 16 bits")
+        pcm = wav.readframes(wav.getnframes())
+    # Os primeiros 100 ms costumam ser só o ruído da sala
+    fundo = pcm[:3200] or b"\0\0"
+    repeticoes = int(silencio * 32000) // len(fundo) + 1
+    pausa = (fundo * repeticoes)[:int(silencio * 32000)]
+    return pausa + pcm + pausa
+
+
+def transcrever(modelo, pcm, vad=None):
+    """Decodifica tudo e devolve (texto, CPU gasta no Vosk + VAD)"""
+    recognizer = KaldiRecognizer(modelo, 16000)
+    textos, cpu = [], 0.0
+    for posicao in range(0, len(pcm), BLOCO * 2):
+        dados = pcm[posicao:posicao + BLOCO * 2]
+        fim_fala = False
+        if vad:
+            dados, fim_fala = vad.filtrar(dados)
+        inicio = time.process_time()
+        if dados and recognizer.AcceptWaveform(dados):
+            textos.append(json.loads(recognizer.Result()).get("text", ""))
+        elif fim_fala:
+            textos.append(json.loads(recognizer.FinalResult()).get("text", ""))
+        gasto = time.process_time() - inicio
+        cpu += gasto
+        if vad and dados:
+            vad.contabilizar(len(dados), gasto)
+    textos.append(json.loads(recognizer.FinalResult()).get("text", ""))
+    if vad:
+        cpu += vad.cpu_vad
+    return " ".join(t for t in textos if t), cpu
+
+
+def distancia(referencia, hipotese):
+    """Distância de edição em palavras"""
+    anterior = list(range(len(hipotese) + 1))
+    for i, palavra in enumerate(referencia, 1):
+        atual = [i]
+        for j, outra in enumerate(hipotese, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (palavra != outra)))
+        anterior = atual
+    return anterior[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("arquivos", nargs="+")
+    parser.add_argument("--modelo", default="model/pt-small-model")
+    parser.add_argument("--silencio", type=float, default=5.0, help="segundos de pausa em cada ponta")
+    args = parser.parse_args()
+
+    modelo = Model(args.modelo)
+    cpu_sem, cpu_com, erros, palavras, audio, ignorado = 0.0, 0.0, 0, 0, 0.0, 0.0
+    for caminho in args.arquivos:
+        pcm = carregar(caminho, args.silencio)
+        texto_sem, gasto_sem = transcrever(modelo, pcm)
+        vad = VADGate()
+        texto_com, gasto_com = transcrever(modelo, pcm, vad)
+
+        referencia = normalizar_texto(texto_sem).split()
+        diferencas = distancia(referencia, normalizar_texto(texto_com).split())
+        relatorio = vad.relatorio()
+        cpu_sem, cpu_com = cpu_sem + gasto_sem, cpu_com + gasto_com
+        erros, palavras = erros + diferencas, palavras + len(referencia)
+        audio, ignorado = audio + relatorio["audio_s"], ignorado + relatorio["ignorado_s"]
+        print(f"{caminho}: CPU {gasto_sem:.2f} s -> {gasto_com:.2f} s, "
+              f"{relatorio['ignorado_s']:.1f}/{relatorio['audio_s']:.1f} s ignorados, "
+              f"{diferencas} palavra(s) diferente(s) | {texto_com!r}")
+
+    print(f"\nArquivos: {len(args.arquivos)}")
+    print(f"Áudio ignorado pelo VAD: {ignorado:.1f} de {audio:.1f} s ({100 * ignorado / audio:.0f}%)")
+    print(f"CPU: {cpu_sem:.2f} s sem VAD, {cpu_com:.2f} s com VAD "
+          f"(economia de {100 * (1 - cpu_com / cpu_sem):.0f}%)" if cpu_sem else "CPU: -")
+    print(f"Diferença na transcrição: {erros}/{palavras} palavras "
+          f"({100 * erros / palavras if palavras else 0:.1f}% WER contra a decodificação sem VAD)")
+
+
+if __name__ == "__main__":
+    main()
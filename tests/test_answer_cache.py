@@ -0,0 +1,68 @@
+import AnswerCache as modulo
+from AnswerCache import AnswerCache, chave_pergunta, versao_conteudo
+
+
+def test_chave_ignora_acento_caixa_vicios_e_ordem():
+    assert chave_pergunta("Hum, o que É a ARI?") == chave_pergunta("uhm que é ARI o")
+    assert chave_pergunta("Como acessar a ARI") == "acessar ari como"
+    assert chave_pergunta("uhm ah") == ""
+
+
+def test_versao_muda_com_qualquer_parte():
+    assert versao_conteudo("prompt", "base") == versao_conteudo("prompt", "base")
+    assert versao_conteudo("prompt", "base") != versao_conteudo("prompt", "base editada")
+    assert versao_conteudo("ab", "c") != versao_conteudo("a", "bc")
+
+
+def test_acerto_e_falha():
+    cache = AnswerCache()
+    assert cache.buscar("O que é a ARI?", "v1") is None
+    cache.guardar("O que é a ARI?", "Uma solução do BB.", "v1")
+    assert cache.buscar("o que e a ari", "v1") == "Uma solução do BB."
+    assert cache.estatisticas() == {"acertos": 1, "falhas": 1, "taxa_acerto": 0.5, "itens": 1}
+
+
+def test_nova_versao_esvazia_o_cache():
+    cache = AnswerCache()
+    cache.guardar("qual o horário", "Das 8h às 18h.", "v1")
+    assert cache.buscar("qual o horário", "v2") is None
+    assert cache.estatisticas()["itens"] == 0
+    # A versão antiga não volta a valer
+    assert cache.buscar("qual o horário", "v1") is None
+
+
+def test_ttl_expira(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(modulo.time, "monotonic", lambda: agora[0])
+    cache = AnswerCache(ttl=60)
+    cache.guardar("qual o horário", "Das 8h às 18h.", "v1")
+    agora[0] += 59
+    assert cache.buscar("qual o horário", "v1") == "Das 8h às 18h."
+    agora[0] += 2
+    assert cache.buscar("qual o horário", "v1") is None
+    assert cache.estatisticas()["itens"] == 0
+
+
+def test_descarta_o_menos_usado():
+    cache = AnswerCache(max_itens=2)
+    cache.guardar("pergunta um", "1", "v")
+    cache.guardar("pergunta dois", "2", "v")
+    cache.buscar("pergunta um", "v")  # passa a ser a mais recente
+    cache.guardar("pergunta tres", "3", "v")
+    assert cache.buscar("pergunta dois", "v") is None
+    assert cache.buscar("pergunta um", "v") == "1"
+    assert cache.buscar("pergunta tres", "v") == "3"
+
+
+def test_pergunta_so_com_vicios_nao_e_guardada():
+    cache = AnswerCache()
+    cache.guardar("uhm", "resposta", "v")
+    assert cache.estatisticas()["itens"] == 0
+
+
+def test_similaridade_aceita_pergunta_parecida():
+    cache = AnswerCache(similaridade=0.6)
+    cache.guardar("como acessar a ARI pelo aplicativo", "Pelo Painel PJ.", "v")
+    assert cache.buscar("como acessar ARI no aplicativo", "v") == "Pelo Painel PJ."
+    assert cache.buscar("como cancelar a ARI", "v") is None
+    assert AnswerCache().buscar("como acessar ARI no aplicativo", "v") is None
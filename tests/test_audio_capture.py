@@ -0,0 +1,95 @@
+from AudioCapture import CallbackCapture, RingBuffer
+
+
+class AudioFalso:
+    def open(self, **opcoes):
+        return None
+
+
+def test_ler_devolve_os_bytes_na_ordem_mesmo_dando_a_volta():
+    buffer = RingBuffer(8, 4)
+    buffer.escrever(b"abcdefgh")
+    assert bytes(buffer.ler(4)) == b"abcd"
+    buffer.escrever(b"ijkl")
+    assert bytes(buffer.ler(4)) == b"efgh"
+    assert bytes(buffer.ler(4)) == b"ijkl"
+    assert buffer.descartados == 0
+
+
+def test_ler_sem_dados_suficientes_devolve_none_no_timeout():
+    buffer = RingBuffer(8, 4)
+    buffer.escrever(b"ab")
+    assert buffer.ler(4, timeout=0.01) is None
+
+
+def test_consumidor_atrasado_perde_o_audio_mais_antigo_e_conta_a_perda():
+    buffer = RingBuffer(8, 4)
+    buffer.escrever(b"abcdef")
+    buffer.escrever(b"ghijkl")
+    assert buffer.descartados == 4
+    assert buffer.disponivel() == 8
+    assert bytes(buffer.ler(4)) == b"efgh"
+
+
+def test_estouro_nao_corrompe_o_que_ja_foi_entregue():
+    buffer = RingBuffer(8, 4)
+    buffer.escrever(b"abcdefgh")
+    lido = buffer.ler(4)
+    buffer.escrever(b"ijklmnop")  # consumidor parado: o escritor passa por cima de tudo
+    assert bytes(lido) == b"abcd"
+    assert buffer.descartados == 4
+    assert bytes(buffer.ler(4)) == b"ijkl"
+
+
+def test_bloco_maior_que_a_capacidade_guarda_so_o_final():
+    buffer = RingBuffer(4, 4)
+    buffer.escrever(b"abcdefgh")
+    assert buffer.descartados == 4
+    assert bytes(buffer.ler(4)) == b"efgh"
+
+
+def test_copiar_desde_nao_consome():
+    buffer = RingBuffer(8, 4)
+    buffer.escrever(b"abcdef")
+    dados, posicao = buffer.copiar_desde(2, timeout=0)
+    assert (dados, posicao) == (b"cdef", 6)
+    assert buffer.disponivel() == 6
+
+
+def test_reter_ultimos_descarta_o_pendente_sem_contar_como_perda():
+    buffer = RingBuffer(16, 4)
+    buffer.escrever(b"abcdefghij")
+    assert buffer.reter_ultimos(4) == 6
+    assert buffer.descartados == 0
+    assert bytes(buffer.ler(4)) == b"ghij"
+
+
+def test_reter_ultimos_nao_volta_para_antes_de_desde():
+    buffer = RingBuffer(16, 4)
+    buffer.escrever(b"abcdefghij")
+    assert buffer.reter_ultimos(8, desde=7) == 7
+    assert buffer.disponivel() == 3
+
+
+def test_reter_ultimos_com_pouco_pendente_nao_descarta_nada():
+    buffer = RingBuffer(16, 4)
+    buffer.escrever(b"abc")
+    assert buffer.reter_ultimos(8) == 0
+    assert buffer.disponivel() == 3
+
+
+def test_escuta_comeca_depois_do_eco_da_fala_do_agente():
+    captura = CallbackCapture(AudioFalso(), taxa=1000, reter_ms=1000)
+    captura.eco = 0
+    captura.buffer.escrever(bytes(1000))  # ARI falando
+    captura.marcar_fim_reproducao()
+    captura.buffer.escrever(b"\x01" * 400)  # usuário depois do fim da fala
+    captura.iniciar_escuta()
+    assert captura.buffer.disponivel() == 400
+
+
+def test_escuta_sem_reproducao_mantem_o_audio_retido():
+    captura = CallbackCapture(AudioFalso(), taxa=1000, reter_ms=1000)
+    captura.buffer.escrever(bytes(3000))
+    captura.iniciar_escuta()
+    assert captura.buffer.disponivel() == 2000
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from AudioIngest import TABELA_MULAW, TAXA_SAIDA, AudioIngest
+
+
+def tom(taxa, segundos, frequencia=1000, amplitude=10000):
+    t = np.arange(int(taxa * segundos)) / taxa
+    return np.rint(amplitude * np.sin(2 * np.pi * frequencia * t)).astype("<i2")
+
+
+def converter_em_pedacos(ingest, dados, tamanhos):
+    saida, inicio = [], 0
+    for tamanho in tamanhos:
+        # A view devolvida só vale até a próxima chamada
+        saida.append(ingest.converter(dados[inicio:inicio + tamanho]).copy())
+        inicio += tamanho
+    saida.append(ingest.converter(dados[inicio:]).copy())
+    return np.concatenate(saida)
+
+
+@pytest.mark.parametrize("taxa", [8000, 44100, 48000])
+def test_pedacos_e_bloco_unico_dao_a_mesma_saida(taxa):
+    dados = np.random.default_rng(1).integers(-20000, 20000, taxa, dtype=np.int16).tobytes()
+    inteiro = AudioIngest("pcm", taxa).converter(dados).copy()
+    # Tamanhos irregulares, com quadros cortados ao meio e um pacote maior que a reserva inicial
+    tamanhos = [1, 321, 2 * taxa // 5 + 1, 17, 640, 3]
+    em_pedacos = converter_em_pedacos(AudioIngest("pcm", taxa), dados, tamanhos)
+    np.testing.assert_array_equal(em_pedacos, inteiro)
+
+
+@pytest.mark.parametrize("taxa", [8000, 44100])
+def test_tom_de_1_khz_mantem_frequencia_e_amplitude(taxa):
+    saida = AudioIngest("pcm", taxa).converter(tom(taxa, 1.0).tobytes()).astype(np.float64)
+    assert abs(len(saida) - TAXA_SAIDA) < TAXA_SAIDA // 50  # o atraso do filtro segura o final
+    estavel = saida[TAXA_SAIDA // 10:-TAXA_SAIDA // 10]  # sem o transitório das bordas
+    espectro = np.abs(np.fft.rfft(estavel * np.hanning(len(estavel))))
+    pico = np.argmax(espectro) * TAXA_SAIDA / len(estavel)
+    assert pico == pytest.approx(1000, abs=TAXA_SAIDA / len(estavel))
+    assert np.sqrt(np.mean(estavel ** 2)) * np.sqrt(2) == pytest.approx(10000, rel=0.01)
+
+
+def test_tabela_mulaw_segue_o_g711():
+    esperado = {0x00: -32124, 0x80: 32124, 0x70: -120, 0xFE: 8, 0xFF: 0, 0x7F: 0}
+    for codigo, amostra in esperado.items():
+        assert TABELA_MULAW[codigo] == amostra
+
+
+def test_mulaw_8k_sai_em_16k():
+    ingest = AudioIngest.do_formato("mulaw8k")
+    saida = ingest.converter(bytes([0xFF]) * 8000)
+    assert saida.dtype == np.int16
+    assert abs(len(saida) - 16000) < 16000 // 50
+    assert not saida.any()
@@ -0,0 +1,60 @@
+import struct
+import threading
+
+from AudioCapture import RingBuffer
+from BargeIn import BargeInMonitor, palavras_do_usuario
+
+TAXA = 16000
+
+
+class CapturaFalsa:
+    taxa = TAXA
+
+    def __init__(self):
+        self.buffer = RingBuffer(TAXA * 2 * 10, 8192 * 2)
+
+
+def tom(amplitude, ms):
+    """PCM com nível constante (onda quadrada de 1 kHz)"""
+    periodo = [amplitude] * 8 + [-amplitude] * 8
+    return struct.pack(f"<{TAXA * ms // 1000}h", *(periodo * (TAXA * ms // 1000 // 16)))
+
+
+def vigiar(monitor, captura, blocos, tocando=True):
+    detectado = threading.Event()
+    monitor.iniciar(detectado.set, ruido_db=10.0)
+    monitor.tocando = tocando
+    for bloco in blocos:
+        captura.buffer.escrever(bloco)
+    detectado.wait(0.5)
+    monitor.parar()
+    return detectado.is_set()
+
+
+def test_eco_das_frases_faladas_nao_conta():
+    faladas = ["A ARI recomenda cursos.", "Posso ajudar em algo mais?"]
+    assert palavras_do_usuario("posso ajudar", faladas) == []
+    assert palavras_do_usuario("ajudar espera aí", faladas) == ["espera", "aí"]
+
+
+def test_sem_reproducao_qualquer_palavra_conta():
+    assert palavras_do_usuario("espera aí", []) == ["espera", "aí"]
+
+
+def test_voz_da_ari_no_microfone_nao_interrompe():
+    captura = CapturaFalsa()
+    monitor = BargeInMonitor(captura)
+    assert not vigiar(monitor, captura, [tom(3000, 64) for _ in range(30)])
+
+
+def test_usuario_bem_acima_do_eco_interrompe():
+    captura = CapturaFalsa()
+    monitor = BargeInMonitor(captura)
+    blocos = [tom(300, 64) for _ in range(8)] + [tom(20000, 64) for _ in range(8)]
+    assert vigiar(monitor, captura, blocos)
+
+
+def test_fora_da_reproducao_o_piso_e_o_ruido_de_fundo():
+    captura = CapturaFalsa()
+    monitor = BargeInMonitor(captura)
+    assert vigiar(monitor, captura, [tom(3000, 64) for _ in range(8)], tocando=False)
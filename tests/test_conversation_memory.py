@@ -0,0 +1,107 @@
+import threading
+
+from ConversationMemory import ConversationMemory, contar_tokens, resumo_extrativo
+
+
+def conversa(memoria, turnos, tamanho=40):
+    for i in range(turnos):
+        memoria.adicionar("user", f"pergunta {i} " + "x" * tamanho)
+        memoria.adicionar("assistant", f"resposta {i} " + "y" * tamanho)
+    if memoria.compactando:
+        memoria.compactando.join()
+
+
+def test_abaixo_do_orcamento_nao_resume():
+    chamadas = []
+    memoria = ConversationMemory("sistema", max_tokens=10_000, resumir=lambda *a: chamadas.append(a))
+    conversa(memoria, 6)
+    assert chamadas == []
+    assert len(memoria) == 12
+    assert memoria.resumo == ""
+
+
+def test_acima_do_orcamento_resume_e_mantem_os_turnos_recentes():
+    recebidos = []
+
+    def resumir(resumo, trechos):
+        recebidos.append((resumo, trechos))
+        return "resumo novo"
+
+    memoria = ConversationMemory("sistema", max_tokens=60, turnos_recentes=2, resumir=resumir)
+    conversa(memoria, 3)
+    assert memoria.resumo == "resumo novo"
+    assert len(memoria) == 4
+    assert memoria.mensagens_turnos[0]["content"].startswith("pergunta 1")
+    resumo, trechos = recebidos[0]
+    assert resumo == ""
+    assert trechos.splitlines()[0].startswith("Usuário: pergunta 0")
+    assert trechos.splitlines()[1].startswith("ARI: resposta 0")
+
+
+def test_falha_no_resumo_cai_no_extrativo():
+    def resumir(resumo, trechos):
+        raise RuntimeError("ollama fora")
+
+    memoria = ConversationMemory("sistema", max_tokens=60, turnos_recentes=1, resumir=resumir)
+    conversa(memoria, 2, tamanho=100)
+    assert memoria.resumo.startswith("Usuário: pergunta 0")
+    assert len(memoria) == 2
+
+
+def test_falas_que_chegam_durante_o_resumo_nao_se_perdem():
+    liberar, iniciou = threading.Event(), threading.Event()
+
+    def resumir(resumo, trechos):
+        iniciou.set()
+        liberar.wait(5)
+        return "resumo"
+
+    memoria = ConversationMemory("sistema", max_tokens=60, turnos_recentes=1, resumir=resumir)
+    memoria.adicionar("user", "a" * 200)
+    memoria.adicionar("assistant", "b" * 200)
+    memoria.adicionar("user", "c" * 200)
+    memoria.adicionar("assistant", "d" * 200)
+    assert iniciou.wait(5)
+    memoria.adicionar("user", "nova pergunta")
+    liberar.set()
+    memoria.compactando.join()
+    assert [m["content"][0] for m in memoria.mensagens_turnos] == ["c", "d", "n"]
+
+
+def test_mensagens_poe_resumo_no_inicio_e_contexto_antes_da_pergunta():
+    memoria = ConversationMemory("sistema")
+    memoria.resumo = "falou do PIX"
+    memoria.adicionar("user", "oi")
+    memoria.adicionar("assistant", "olá")
+    mensagens = memoria.mensagens("trechos da base", pergunta="e o boleto?")
+    assert [m["content"] for m in mensagens] == [
+        "sistema", "Resumo da conversa até aqui: falou do PIX", "oi", "olá", "trechos da base", "e o boleto?",
+    ]
+    # A pergunta passada à parte não é gravada no histórico
+    assert len(memoria) == 2
+
+
+def test_corrigir_ultima_troca_so_a_fala_mais_recente():
+    memoria = ConversationMemory("sistema")
+    memoria.adicionar("assistant", "primeira")
+    memoria.adicionar("user", "pergunta")
+    memoria.adicionar("assistant", "segunda completa")
+    assert memoria.corrigir_ultima("assistant", "segunda")
+    assert [m["content"] for m in memoria.mensagens_turnos] == ["primeira", "pergunta", "segunda"]
+    assert not ConversationMemory("sistema").corrigir_ultima("assistant", "x")
+
+
+def test_orcamento_de_tokens():
+    assert contar_tokens("") == 1
+    assert contar_tokens("a" * 400) == 101
+    memoria = ConversationMemory("s" * 40)
+    memoria.resumo = "r" * 40
+    memoria.adicionar("user", "u" * 40)
+    assert memoria.tokens() == contar_tokens("r" * 40 + "s" * 40 + "u" * 40)
+    assert memoria.tokens([{"role": "user", "content": "abcd"}]) == 2
+
+
+def test_resumo_extrativo_limita_o_tamanho():
+    resumo = resumo_extrativo("antigo", "Usuário: " + "x" * 500 + "\n\nARI: ok")
+    assert resumo == "antigo Usuário: " + "x" * 111 + " ARI: ok"
+    assert len(resumo_extrativo("r" * 2000, "a")) == 1200
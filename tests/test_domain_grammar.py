@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import DomainGrammar
+from DomainGrammar import RecognizerDominio
+
+
+class KaldiFalso:
+    """Devolve sempre o mesmo resultado; a gramática decide qual"""
+
+    def __init__(self, modelo, taxa, gramatica=None):
+        self.restrito = gramatica is not None
+        self.recebido = bytearray()
+        self.resets = 0
+
+    def SetWords(self, ativo):
+        pass
+
+    def AcceptWaveform(self, dados):
+        self.recebido += dados
+        return False
+
+    def FinalResult(self):
+        if not self.restrito:
+            return json.dumps({"text": "livre", "result": [{"word": "livre", "conf": 0.9}]})
+        return json.dumps(RESULTADO_RESTRITO)
+
+    def Reset(self):
+        self.recebido.clear()
+        self.resets += 1
+
+
+RESULTADO_RESTRITO = {}
+
+
+@pytest.fixture
+def recognizer(monkeypatch):
+    monkeypatch.setattr(DomainGrammar, "KaldiRecognizer", KaldiFalso)
+    return RecognizerDominio(None, "[]")
+
+
+def restrito(*palavras):
+    RESULTADO_RESTRITO.clear()
+    RESULTADO_RESTRITO.update({
+        "text": " ".join(p for p, _ in palavras),
+        "result": [{"word": p, "conf": c} for p, c in palavras],
+    })
+
+
+def test_palavra_desconhecida_volta_ao_vocabulario_completo(recognizer):
+    restrito(("cursos", 1.0), ("[unk]", 1.0))
+    recognizer.AcceptWaveform(b"\x01\x02")
+    assert json.loads(recognizer.FinalResult())["text"] == "livre"
+    assert recognizer.redecodificados == 1
+
+
+def test_sem_unk_fica_o_resultado_da_gramatica_mesmo_com_confianca_baixa(recognizer):
+    recognizer.confiancas = []
+    restrito(("cursos", 0.4), ("ari", 0.5))
+    recognizer.AcceptWaveform(b"\x01\x02")
+    assert json.loads(recognizer.FinalResult())["text"] == "cursos ari"
+    assert recognizer.redecodificados == 0
+    assert recognizer.confiancas == [pytest.approx(0.45)]
+
+
+def test_confiancas_so_sao_guardadas_quando_pedidas(recognizer):
+    restrito(("cursos", 0.4))
+    for _ in range(3):
+        recognizer.FinalResult()
+    assert recognizer.confiancas is None
+    assert recognizer.resultados == 3
+
+
+def test_confianca_minima_configurada_tambem_dispara_a_volta(monkeypatch):
+    monkeypatch.setattr(DomainGrammar, "KaldiRecognizer", KaldiFalso)
+    recognizer = RecognizerDominio(None, "[]", confianca_minima=0.7)
+    restrito(("cursos", 0.4))
+    assert json.loads(recognizer.FinalResult())["text"] == "livre"
+
+
+def test_reset_limpa_os_dois_recognizers(recognizer):
+    recognizer.AcceptWaveform(b"\x01\x02")
+    recognizer.livre.AcceptWaveform(b"\x03")
+    recognizer.Reset()
+    assert recognizer.restrito.resets == recognizer.livre.resets == 1
+    assert not recognizer.fala and not recognizer.livre.recebido
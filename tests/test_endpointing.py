@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from Endpointing import ESPECULAR, FINAL, EndpointDetector, SpeculativeGeneration
+
+
+def alimentar(detector, parciais, passo=0.125):
+    """Um parcial a cada `passo` segundos de áudio; devolve (tempo, evento) dos eventos"""
+    eventos = []
+    for i, parcial in enumerate(parciais):
+        evento = detector.alimentar(parcial, (i + 1) * passo)
+        if evento:
+            eventos.append(((i + 1) * passo, evento))
+    return eventos
+
+
+def test_especula_e_encerra_pela_estabilidade_do_parcial():
+    detector = EndpointDetector(silencio_ms=450, especular_ms=200)
+    parciais = ["qual", "qual o"] + ["qual o saldo"] * 5
+    assert alimentar(detector, parciais) == [(0.625, ESPECULAR), (0.875, FINAL)]
+
+
+def test_parcial_que_muda_reinicia_a_contagem():
+    detector = EndpointDetector(silencio_ms=300, especular_ms=200)
+    parciais = ["qual", "qual", "qual", "qual o", "qual o", "qual o", "qual o"]
+    # Especulou em "qual"; a mudança permite especular de novo com o parcial novo
+    assert alimentar(detector, parciais) == [(0.375, ESPECULAR), (0.75, ESPECULAR), (0.875, FINAL)]
+
+
+def test_silencio_sem_fala_nao_encerra():
+    detector = EndpointDetector(silencio_ms=100, especular_ms=50)
+    assert alimentar(detector, [""] * 20) == []
+
+
+def test_reiniciar_esquece_a_fala_anterior():
+    detector = EndpointDetector(silencio_ms=200, especular_ms=100)
+    alimentar(detector, ["oi", "oi", "oi"])
+    detector.reiniciar()
+    assert detector.alimentar("oi", 5.0) is None
+    assert detector.alimentar("oi", 5.125) == ESPECULAR
+
+
+def test_especulacao_aproveitada_entrega_o_stream_inteiro():
+    especulacao = SpeculativeGeneration("Qual o saldo", lambda texto: iter([texto, "!"]))
+    assert especulacao.confere("qual o saldo?")
+    assert not especulacao.confere("qual o saldo do mês")
+    assert list(especulacao.consumir()) == ["Qual o saldo", "!"]
+
+
+def test_especulacao_repassa_o_erro_do_stream():
+    def falhar(texto):
+        raise ConnectionError("ollama fora")
+
+    with pytest.raises(ConnectionError):
+        list(SpeculativeGeneration("oi", falhar).consumir())
+
+
+def test_cancelar_fecha_o_stream():
+    fechado, liberar = threading.Event(), threading.Event()
+
+    def stream(texto):
+        try:
+            while True:
+                liberar.wait(5)
+                yield "token"
+        finally:
+            fechado.set()
+
+    especulacao = SpeculativeGeneration("oi", stream)
+    especulacao.cancelar()
+    liberar.set()
+    assert fechado.wait(5)
@@ -0,0 +1,92 @@
+from KnowledgeIndex import KnowledgeIndex, Trecho, dividir_em_secoes, tokenizar
+
+DOCUMENTO = """O que é a ARI:
+A ARI é a Área de Recomendações Inteligentes para pequenos empreendedores.
+
+Como acessar a ARI:
+Entre no aplicativo e abra o Painel PJ.
+* O acesso é gratuito.
+
+Antecipação de recebíveis:
+Converte vendas futuras no cartão em capital imediato.
+"""
+
+
+def indice():
+    return KnowledgeIndex(dividir_em_secoes(DOCUMENTO))
+
+
+def test_divide_pelos_titulos():
+    trechos = dividir_em_secoes(DOCUMENTO)
+    assert [t.titulo for t in trechos] == ["O que é a ARI", "Como acessar a ARI", "Antecipação de recebíveis"]
+    assert trechos[1].texto == "Entre no aplicativo e abra o Painel PJ.\n* O acesso é gratuito."
+
+
+def test_tokenizar_tira_acento_stopwords_e_junta_plural():
+    assert tokenizar("As recomendações da ARI") == ["recom", "ari"]
+    assert tokenizar("recomendação") == tokenizar("recomendações")
+
+
+def test_buscar_ordena_pelo_trecho_mais_relevante():
+    resultados = indice().buscar("como eu acesso o painel?")
+    assert resultados[0][1].titulo == "Como acessar a ARI"
+    pontuacoes = [p for p, _ in resultados]
+    assert pontuacoes == sorted(pontuacoes, reverse=True)
+
+
+def test_buscar_descarta_trechos_sem_termos_da_pergunta():
+    resultados = indice().buscar("antecipar recebíveis do cartão")
+    assert [t.titulo for _, t in resultados] == ["Antecipação de recebíveis"]
+    assert indice().buscar("previsão do tempo amanhã") == []
+    assert indice().buscar("o que é") == []  # só stopwords
+
+
+def test_titulo_pesa_mais_que_o_corpo():
+    trechos = [Trecho("Crédito", "Linhas para empresas.", ""), Trecho("Empresas", "Crédito para empresas.", "")]
+    assert KnowledgeIndex(trechos).buscar("crédito")[0][1].titulo == "Crédito"
+
+
+def test_termo_raro_pesa_mais_que_termo_comum():
+    trechos = [
+        Trecho("", "ARI ajuda empresas", ""),
+        Trecho("", "ARI mostra o PIX", ""),
+        Trecho("", "ARI explica o fluxo", ""),
+    ]
+    resultados = KnowledgeIndex(trechos).buscar("ARI PIX")
+    assert resultados[0][1].texto == "ARI mostra o PIX"
+    assert resultados[0][0] > 2 * resultados[1][0]
+
+
+def test_cobertura_e_contexto():
+    base = indice()
+    assert base.cobertura("antecipação de recebíveis") == 1.0
+    assert base.cobertura("recebíveis em criptomoedas") == 0.5
+    assert base.cobertura("e aí") == 0.0
+    assert base.contexto("painel", k=1) == "Como acessar a ARI:\nEntre no aplicativo e abra o Painel PJ.\n* O acesso é gratuito."
+
+
+def test_recarrega_quando_o_arquivo_muda(tmp_path):
+    arquivo = tmp_path / "base.txt"
+    arquivo.write_text("Horário:\nAtendimento das 8h às 18h.\n", encoding="utf-8")
+    base = KnowledgeIndex.carregar(str(tmp_path))
+    assert base.recarregar_se_alterado() is base
+
+    (tmp_path / "extra.md").write_text("Taxas:\nSem tarifa mensal.\n", encoding="utf-8")
+    nova = base.recarregar_se_alterado()
+    assert nova is not base
+    assert nova.buscar("tarifa")[0][1].titulo == "Taxas"
+
+
+def test_falha_ao_recarregar_mantem_a_base_anterior(tmp_path):
+    arquivo = tmp_path / "base.txt"
+    arquivo.write_text("Horário:\nAtendimento das 8h às 18h.\n", encoding="utf-8")
+    base = KnowledgeIndex.carregar(str(tmp_path))
+
+    arquivo.write_bytes(b"Hor\xe1rio:\nmeio gravado")  # latin-1 no lugar de UTF-8
+    assert base.recarregar_se_alterado() is base
+    arquivo.unlink()
+    assert base.recarregar_se_alterado() is base
+    assert base.buscar("atendimento")[0][1].titulo == "Horário"
+
+    arquivo.write_text("Taxas:\nSem tarifa mensal.\n", encoding="utf-8")
+    assert base.recarregar_se_alterado().buscar("tarifa")[0][1].titulo == "Taxas"
@@ -0,0 +1,102 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+import ModelRouter
+from LLMScheduler import FUNDO, NORMAL, URGENTE, AgendadorLLM, PrazoEsgotado, prioridade_da_pergunta
+
+
+def test_primeiro_pedido_recebe_a_vaga_na_hora():
+    agendador = AgendadorLLM(concorrencia=1)
+    pedido = agendador.entrar()
+    assert pedido.concedido.is_set()
+    assert agendador.em_geracao == 1
+
+
+def test_fila_atende_por_prioridade_e_depois_pelo_prazo():
+    agendador = AgendadorLLM(concorrencia=1, prazo_s=10)
+    atual = agendador.entrar()
+    fundo = agendador.entrar(prioridade=FUNDO)
+    normal_tarde = agendador.entrar(prioridade=NORMAL, prazo_s=20)
+    normal_cedo = agendador.entrar(prioridade=NORMAL, prazo_s=5)
+    urgente = agendador.entrar(prioridade=URGENTE)
+
+    for esperado in (urgente, normal_cedo, normal_tarde, fundo):
+        agendador.sair(atual)
+        assert esperado.concedido.is_set()
+        assert agendador.em_geracao == 1
+        atual = esperado
+
+
+def test_pedido_vencido_na_fila_nao_recebe_a_vaga():
+    agendador = AgendadorLLM(concorrencia=1)
+    ocupando = agendador.entrar()
+    vencido = agendador.entrar(prazo_s=0)
+    seguinte = agendador.entrar(prazo_s=10)
+    time.sleep(0.01)
+    agendador.sair(ocupando)
+    assert not vencido.concedido.is_set()
+    assert seguinte.concedido.is_set()
+
+
+def test_admitir_sem_vaga_ate_o_prazo_levanta_prazo_esgotado():
+    agendador = AgendadorLLM(concorrencia=1)
+    agendador.entrar()
+    with pytest.raises(PrazoEsgotado):
+        agendador.admitir(prazo_s=0.01)
+    assert agendador.expirados[NORMAL] == 1
+    assert sum(agendador.esperando.values()) == 0
+
+
+def test_admitir_async_cancelado_na_fila_libera_o_lugar():
+    agendador = AgendadorLLM(concorrencia=1)
+
+    async def cenario():
+        ocupando = agendador.entrar()
+        tarefa = asyncio.create_task(agendador.admitir_async(prazo_s=math.inf))
+        await asyncio.sleep(0.01)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+        agendador.sair(ocupando)
+
+    asyncio.run(cenario())
+    assert agendador.em_geracao == 0
+    assert sum(agendador.esperando.values()) == 0
+
+
+def test_continuacao_curta_de_conversa_e_urgente():
+    assert prioridade_da_pergunta("e o prazo?", em_conversa=True) == URGENTE
+    assert prioridade_da_pergunta("e o prazo?", em_conversa=False) == NORMAL
+
+
+class ClienteFalso:
+    async def chat_async(self, mensagens):
+        for pedaco in ["A ARI ", "responde ", "devagar."]:
+            await asyncio.sleep(0.05)
+            yield {"message": {"content": pedaco}}
+
+
+def test_chat_async_cancelado_no_meio_do_stream_devolve_a_vaga(monkeypatch):
+    agendador = AgendadorLLM(concorrencia=1)
+    roteador = ModelRouter.RoteadorModelos("", agendador=agendador)
+    monkeypatch.setattr(roteador, "clientes", {nivel: ClienteFalso() for nivel in roteador.modelos})
+    recebidos = []
+
+    async def consumir():
+        async for pedaco in roteador.chat_async(ModelRouter.RAPIDO, []):
+            recebidos.append(pedaco)
+
+    async def cenario():
+        tarefa = asyncio.create_task(consumir())
+        await asyncio.sleep(0.07)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+
+    asyncio.run(cenario())
+    assert len(recebidos) == 1
+    assert agendador.em_geracao == 0
+    assert roteador.em_andamento[ModelRouter.RAPIDO] == 0
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+import SpeechRouter
+from SpeechRouter import BackendFala, EstatisticasBackend, RoteadorFala
+
+
+class BackendFalso(BackendFala):
+    def __init__(self, nome, sintetizar=None, reconhecer=None):
+        self.nome = nome
+        self.sintetizar_com = sintetizar or (lambda texto: f"{nome}:{texto}".encode())
+        self.reconhecer_com = reconhecer or (lambda: SpeechRouter.Transcricao(nome, None, 0.1, nome))
+        self.chamadas = 0
+        self.escutas = 0
+
+    def reconhecer(self, ao_parcial_estavel=None, parar=None):
+        self.escutas += 1
+        return self.reconhecer_com()
+
+    def sintetizar(self, texto):
+        self.chamadas += 1
+        return self.sintetizar_com(texto)
+
+
+def test_falhas_seguidas_tiram_o_backend_da_rota():
+    estatisticas = EstatisticasBackend(limite_s=1.0)
+    assert estatisticas.registrar(False) is None
+    assert estatisticas.registrar(False) is None
+    assert estatisticas.registrar(False) == "3 falhas seguidas"
+    assert not estatisticas.disponivel()
+
+
+def test_sucesso_zera_as_falhas_seguidas():
+    estatisticas = EstatisticasBackend(limite_s=1.0)
+    for ok in (False, False, True, False):
+        assert estatisticas.registrar(ok, 0.1 if ok else None) is None
+    assert estatisticas.disponivel()
+
+
+def test_p90_acima_do_limite_desvia_so_com_amostras_suficientes():
+    estatisticas = EstatisticasBackend(limite_s=1.0)
+    for _ in range(SpeechRouter.MINIMO_AMOSTRAS - 1):
+        assert estatisticas.registrar(True, 2.0) is None
+    assert estatisticas.registrar(True, 2.0) == "p90 2000 ms"
+
+
+def test_taxa_de_erro_acima_do_maximo_desvia():
+    estatisticas = EstatisticasBackend(limite_s=1.0)
+    motivos = [estatisticas.registrar(ok, 0.1 if ok else None) for ok in (True, True, True, True, False, False)]
+    assert motivos == [None] * 5 + ["taxa de erro 33%"]
+
+
+def test_teste_de_volta_decide_se_o_backend_retorna(monkeypatch):
+    estatisticas = EstatisticasBackend(limite_s=1.0)
+    for _ in range(3):
+        estatisticas.registrar(False)
+    monkeypatch.setattr(estatisticas, "fora_ate", 0.0)  # espera encerrada
+    assert estatisticas.registrar(True, 3.0) == "ainda lento (3000 ms)"
+    monkeypatch.setattr(estatisticas, "fora_ate", 0.0)
+    assert estatisticas.registrar(True, 0.2) is None
+    assert estatisticas.disponivel()
+    assert not estatisticas.em_prova
+
+
+def test_tts_cai_para_o_proximo_backend_quando_o_preferido_falha():
+    def falhar(texto):
+        raise RuntimeError("sem rede")
+
+    roteador = RoteadorFala([BackendFalso("azure", falhar), BackendFalso("offline")])
+    assert roteador.sintetizar("oi") == b"offline:oi"
+
+
+def test_tts_travado_nao_segura_as_frases_seguintes(monkeypatch):
+    monkeypatch.setattr(SpeechRouter, "TIMEOUT_TTS_S", 0.05)
+    liberar = threading.Event()
+    travado = BackendFalso("azure", lambda texto: liberar.wait(5) and f"azure:{texto}".encode())
+    offline = BackendFalso("offline")
+    roteador = RoteadorFala([travado, offline])
+    try:
+        assert roteador.sintetizar("um") == b"offline:um"
+        # A thread do azure ainda está presa: a próxima frase nem espera por ela
+        assert roteador.sintetizar("dois") == b"offline:dois"
+        assert travado.chamadas == 1
+        liberar.set()
+        roteador.travadas["azure"].result(1)
+        assert roteador.sintetizar("tres") == b"azure:tres"
+    finally:
+        liberar.set()
+
+
+def test_silencio_no_stt_nao_abre_o_disjuntor_nem_escuta_de_novo():
+    azure = BackendFalso("azure", reconhecer=lambda: None)  # NoMatch: nada entendido
+    offline = BackendFalso("offline")
+    roteador = RoteadorFala([azure, offline])
+    for _ in range(SpeechRouter.FALHAS_SEGUIDAS + 2):
+        assert roteador.reconhecer() is None
+    assert roteador.estatisticas[("azure", "stt")].disponivel()
+    assert roteador.estatisticas[("azure", "stt")].falhas == 0
+    assert offline.escutas == 0
+
+
+def test_todos_os_backends_falhando_levanta_erro():
+    def falhar(texto):
+        raise RuntimeError("quebrado")
+
+    roteador = RoteadorFala([BackendFalso("azure", falhar)])
+    with pytest.raises(RuntimeError, match="Nenhum backend de TTS"):
+        roteador.sintetizar("oi")
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+from StreamingTTS import FIM_DE_FRASE, SentenceSegmenter, SpeechQueue, falar_stream, falar_stream_async
+
+
+def segmentar(pedacos, **opcoes):
+    segmentador = SentenceSegmenter(**opcoes)
+    frases = []
+    for pedaco in pedacos:
+        frases.extend(segmentador.alimentar(pedaco))
+    return frases, segmentador.finalizar()
+
+
+def test_fim_de_frase_exige_o_espaco_seguinte():
+    assert FIM_DE_FRASE.search("Custa 1.5 mil") is None
+    assert FIM_DE_FRASE.search("Pronto.") is None
+    assert FIM_DE_FRASE.search("Pronto. Agora") is not None
+    assert FIM_DE_FRASE.search('Ele disse "sim!" e') is not None
+    assert FIM_DE_FRASE.search("Espere… Já") is not None
+
+
+def test_frases_saem_token_a_token():
+    frases, resto = segmentar(["A ARI ", "ajuda empresas", ". Ela ", "usa dados do PIX", "! E mais"])
+    assert frases == ["A ARI ajuda empresas.", "Ela usa dados do PIX!"]
+    assert resto == ["E mais"]
+
+
+def test_numero_decimal_nao_quebra_a_frase():
+    frases, resto = segmentar(["O ticket médio subiu 1.", "5 por cento no mês. Fim"])
+    assert frases == ["O ticket médio subiu 1.5 por cento no mês."]
+    assert resto == ["Fim"]
+
+
+def test_frase_curta_junta_com_a_seguinte():
+    frases, _ = segmentar(["Sim. Você pode antecipar recebíveis. "])
+    assert frases == ["Sim. Você pode antecipar recebíveis."]
+
+
+def test_bloco_think_nao_e_falado():
+    frases, resto = segmentar(["<think>Vou pensar. ", "Mais um pouco. </th", "ink>Resposta final aqui. Ok"])
+    assert frases == ["Resposta final aqui."]
+    assert resto == ["Ok"]
+    _, resto = segmentar(["Começo da resposta <think>pensamento sem fim"])
+    assert resto == ["Começo da resposta"]
+
+
+def test_paragrafo_fecha_a_frase():
+    frases, resto = segmentar(["Primeiro item da lista\n", "\nsegundo item"])
+    assert frases == ["Primeiro item da lista"]
+    assert resto == ["segundo item"]
+
+
+def test_fila_fala_na_ordem_e_aguardar_espera_o_fim():
+    faladas = []
+    fila = SpeechQueue(faladas.append)
+    for frase in ("um", "dois", "três"):
+        fila.enfileirar(frase)
+    fila.aguardar()
+    assert faladas == ["um", "dois", "três"]
+    assert fila.faladas == ["um", "dois", "três"]
+
+
+def test_interromper_descarta_as_frases_pendentes():
+    comecou, liberar = threading.Event(), threading.Event()
+
+    def sintetizar(texto):
+        comecou.set()
+        liberar.wait(5)
+
+    fila = SpeechQueue(sintetizar)
+    fila.nova_resposta()
+    fila.enfileirar("primeira")
+    fila.enfileirar("segunda")
+    assert comecou.wait(5)
+    fila.interromper()
+    liberar.set()
+    fila.aguardar()
+    # A frase em reprodução foi cortada: não conta como ouvida
+    assert fila.faladas == []
+    fila.nova_resposta()
+    fila.enfileirar("nova")
+    fila.aguardar()
+    assert fila.faladas == ["nova"]
+
+
+class StreamFalso:
+    def __init__(self, pedacos):
+        self.pedacos = [{"message": {"content": p}} for p in pedacos]
+        self.fechado = False
+
+    def __iter__(self):
+        return iter(self.pedacos)
+
+    def close(self):
+        self.fechado = True
+
+
+def test_falar_stream_entrega_as_frases_e_devolve_o_texto():
+    faladas = []
+    texto = falar_stream(StreamFalso(["A ARI ajuda empresas. ", "Ela usa dados"]), faladas.append)
+    assert faladas == ["A ARI ajuda empresas.", "Ela usa dados"]
+    assert texto == "A ARI ajuda empresas. Ela usa dados"
+
+
+def test_falar_stream_interrompido_fecha_o_stream_sem_falar_o_resto():
+    interrompido = threading.Event()
+    faladas = []
+
+    def falar(frase):
+        faladas.append(frase)
+        interrompido.set()
+
+    stream = StreamFalso(["Primeira frase pronta. ", "Segunda frase. ", "Terceira"])
+    texto = falar_stream(stream, falar, interrompido)
+    assert stream.fechado
+    assert faladas == ["Primeira frase pronta."]
+    assert texto == "Primeira frase pronta. "
+
+
+def test_falar_stream_async_fecha_o_stream():
+    fechado = []
+
+    async def stream():
+        try:
+            for pedaco in ["Uma frase completa. ", "Fim"]:
+                yield {"message": {"content": pedaco}}
+        finally:
+            fechado.append(True)
+
+    faladas = []
+
+    async def falar(frase):
+        faladas.append(frase)
+
+    texto = asyncio.run(falar_stream_async(stream(), falar))
+    assert texto == "Uma frase completa. Fim"
+    assert faladas == ["Uma frase completa.", "Fim"]
+    assert fechado == [True]